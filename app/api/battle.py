@@ -1,40 +1,60 @@
 """バトル関連API"""
 
-from fastapi import APIRouter, HTTPException, Query
-from .models import AttackRequest, AttackResponse, FinishRequest, FinishResponse, AttackResultData
+from fastapi import APIRouter, Depends, HTTPException, Query
+from .deps import get_claude_controller, get_file_manager
+from .models import AttackRequest, AttackResponse, FinishRequest, FinishResponse
+from .responses import FastJSONResponse
 from ..services.claude_controller import ClaudeController
-from ..services.file_manager import FileManager
+from ..services.file_manager import AsyncFileManager
+from ..services.mcp_manager import mcp_manager
+from ..services.attack_cache import attack_cache
+from ..services.battle_events import ATTACK_REQUESTED, battle_events
+from ..core.exceptions import SchedulerBusyError
 
-router = APIRouter(prefix="/battle", tags=["battle"])
+router = APIRouter(prefix="/battle", tags=["battle"], default_response_class=FastJSONResponse)
 
 @router.post("/attack", response_model=AttackResponse)
-async def attack(request: AttackRequest):
-    """攻撃を実行する"""
+async def attack(
+    request: AttackRequest,
+    async_mode: bool = Query(False, alias="async", description="結果を待たずに仮の結果を返す（従来の2段階の動作。結果は相関IDでMCP結果として受け取る）"),
+    claude_controller: ClaudeController = Depends(get_claude_controller)
+):
+    """攻撃を実行する（結果が届くまで待って返す）"""
     try:
-        claude_controller = ClaudeController()
-        result = await claude_controller.process_attack(
+        correlation_id = request.correlationId or mcp_manager.generate_correlation_id()
+        # バトルセッションを使わない攻撃はバトルIDなしで記録する
+        battle_events.append(ATTACK_REQUESTED, None, correlation_id=correlation_id, prompt=request.prompt,
+                             me=request.me.model_dump(), enemy=request.enemy.model_dump(), wait=not async_mode)
+        response = await claude_controller.process_attack(
             request.prompt,
             request.me,
-            request.enemy
+            request.enemy,
+            correlation_id,
+            wait=not async_mode
         )
         
-        if result:
-            return AttackResponse(result=result)
+        if response:
+            return response
         else:
             raise HTTPException(status_code=500, detail="攻撃処理に失敗しました")
             
+    except HTTPException:
+        raise
+    except SchedulerBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         print(f"攻撃処理エラー: {e}")
         raise HTTPException(status_code=500, detail="攻撃処理中にエラーが発生しました")
 
 @router.post("/finish", response_model=FinishResponse)
-async def finish_battle(request: FinishRequest):
+async def finish_battle(
+    request: FinishRequest,
+    file_manager: AsyncFileManager = Depends(get_file_manager)
+):
     """勝負を決着する（勝者の決め台詞を返す）"""
     try:
-        file_manager = FileManager()
-        
         # summon_idからステータスを読み込み
-        stats = file_manager.load_stats(request.summonId)
+        stats = await file_manager.load_stats(request.summonId)
         if not stats:
             raise HTTPException(status_code=404, detail="召喚獣が見つかりません")
         
@@ -51,3 +71,8 @@ async def finish_battle(request: FinishRequest):
     except Exception as e:
         print(f"決着処理エラー: {e}")
         raise HTTPException(status_code=500, detail="決着処理中にエラーが発生しました")
+
+@router.get("/cache", operation_id='get_attack_cache_stats')
+async def get_attack_cache_stats():
+    """攻撃結果キャッシュの統計（ヒット率・件数など）を取得する"""
+    return attack_cache.stats()
@@ -0,0 +1,198 @@
+"""バトルセッションAPI（サーバー側でバトルの状態を保持する）"""
+
+import asyncio
+from typing import Any, Dict, Iterable, Iterator
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import iterate_in_threadpool
+
+from .deps import get_claude_controller, get_file_manager
+from .models import (
+    AttackResultData, BattleAttackRequest, BattleAttackResponse, BattleCreateRequest, BattleState, CreatureStats
+)
+from .responses import FastJSONResponse
+from ..services.battle_events import (
+    ATTACK_REQUESTED, BATTLE_CREATED, BATTLE_DELETED, EXPORT_CHUNK_SIZE, battle_events, encode_event
+)
+from ..services.battle_sessions import BattleSession, battle_sessions
+from ..services.claude_controller import ClaudeController
+from ..services.file_manager import AsyncFileManager
+from ..services.mcp_manager import mcp_manager
+from ..core.constants import Timing
+from ..core.exceptions import SchedulerBusyError
+
+router = APIRouter(prefix="/battles", tags=["battles"], default_response_class=FastJSONResponse)
+
+
+def to_state(session: BattleSession) -> BattleState:
+    """バトルセッションをレスポンス用の状態にする"""
+    return BattleState(
+        battleId=session.battle_id,
+        names=[creature["name"] for creature in session.creatures],
+        hp=session.hp,
+        maxHp=session.max_hp,
+        turn=session.turn,
+        currentTurn=session.current + 1,
+        winner=session.winner + 1 if session.winner is not None else None,
+        pendingCorrelationId=session.pending,
+        lastResult=session.last_result
+    )
+
+
+def get_session(battle_id: str) -> BattleSession:
+    session = battle_sessions.get(battle_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="バトルが見つかりません")
+    return session
+
+
+@router.post("", response_model=BattleState, status_code=201)
+async def create_battle(
+    request: BattleCreateRequest,
+    file_manager: AsyncFileManager = Depends(get_file_manager)
+):
+    """バトルを作成する（召喚IDを指定した場合はサーバーでステータスを読み込む）"""
+    if request.summonIds:
+        creatures = []
+        for summon_id in request.summonIds:
+            stats = await file_manager.load_stats(summon_id)
+            if not stats:
+                raise HTTPException(status_code=404, detail=f"召喚獣が見つかりません: {summon_id}")
+            creatures.append(CreatureStats(**stats).model_dump())
+        summon_ids = list(request.summonIds)
+    elif request.creatures:
+        creatures = [creature.model_dump() for creature in request.creatures]
+        summon_ids = [None, None]
+    else:
+        raise HTTPException(status_code=400, detail="summonIds か creatures を指定してください")
+
+    session = battle_sessions.create(creatures, summon_ids)
+    battle_events.append(BATTLE_CREATED, session.battle_id, creatures=creatures, summon_ids=summon_ids,
+                         hp=list(session.hp))
+    return to_state(session)
+
+
+@router.get("/{battle_id}", response_model=BattleState)
+async def get_battle(battle_id: str):
+    """バトルの状態を取得する"""
+    return to_state(get_session(battle_id))
+
+
+@router.post("/{battle_id}/attack", response_model=BattleAttackResponse)
+async def attack_in_battle(
+    battle_id: str,
+    request: BattleAttackRequest,
+    async_mode: bool = Query(False, alias="async", description="結果を待たずに仮の結果を返す（結果は届いた時点でサーバー側で適用する）"),
+    claude_controller: ClaudeController = Depends(get_claude_controller)
+):
+    """現在のターンの召喚獣で攻撃し、結果のダメージをサーバー側で適用する"""
+    session = get_session(battle_id)
+    if session.finished:
+        raise HTTPException(status_code=409, detail="バトルは決着しています")
+
+    correlation_id = request.correlationId or mcp_manager.generate_correlation_id()
+    me, enemy = session.combatants()
+    battle_sessions.begin_attack(session, correlation_id)
+    battle_events.append(ATTACK_REQUESTED, battle_id, correlation_id=correlation_id, prompt=request.prompt,
+                         attacker=session.current, turn=session.turn, wait=not async_mode)
+    try:
+        response = await claude_controller.process_attack(
+            request.prompt,
+            CreatureStats(**me),
+            CreatureStats(**enemy),
+            correlation_id,
+            wait=not async_mode,
+            affinity=f"battle:{battle_id}"
+        )
+    except SchedulerBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    if not response:
+        raise HTTPException(status_code=500, detail="攻撃処理に失敗しました")
+
+    # MCP結果として届いた攻撃結果は保存時に適用済み。キャッシュから返した結果はここで適用する
+    mcp_type = response.mcpResult.get("result_type") if response.mcpResult else "attack"
+    if not response.pending and mcp_type == "attack":
+        battle_sessions.record_result(correlation_id, response.result.model_dump())
+
+    # 適用済みなら適用した結果を返す（非同期モードでも待っている間に届くことがある）
+    applied = session.last_result is not None and session.last_result["correlation_id"] == correlation_id
+    return BattleAttackResponse(
+        battle=to_state(session),
+        result=AttackResultData(**session.last_result) if applied else response.result,
+        correlationId=correlation_id,
+        pending=not applied
+    )
+
+
+@router.delete("/{battle_id}", status_code=204)
+async def delete_battle(battle_id: str):
+    """バトルを削除する"""
+    if not battle_sessions.delete(battle_id):
+        raise HTTPException(status_code=404, detail="バトルが見つかりません")
+    battle_events.append(BATTLE_DELETED, battle_id)
+    return Response(status_code=204)
+
+
+def encode_chunks(events: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """イベントをNDJSONにし、ある程度の大きさにまとめて返す（スレッドプールで読み込むため）"""
+    chunk = bytearray()
+    for event in events:
+        chunk += encode_event(event)
+        if len(chunk) >= EXPORT_CHUNK_SIZE:
+            yield bytes(chunk)
+            chunk = bytearray()
+    if chunk:
+        yield bytes(chunk)
+
+
+@router.get("/{battle_id}/events", operation_id='stream_battle_events')
+async def stream_battle_events(
+    battle_id: str,
+    request: Request,
+    follow: bool = Query(False, description="記録済みのイベントの後、決着・削除されるまで新しいイベントを配信し続ける"),
+    from_seq: int = Query(0, ge=0, description="この seq 以降のイベントだけを返す")
+):
+    """バトルのイベントをNDJSONでストリーミングする（削除・期限切れになったバトルも記録が残っていれば返す）"""
+    # 購読してから記録済みのイベントを読むことで、読み込み中に追記されたイベントも取りこぼさない
+    events = battle_events.subscribe(battle_id) if follow else None
+    last_seq = battle_events.last_seq
+    await asyncio.get_running_loop().run_in_executor(None, battle_events.flush)
+
+    async def event_stream():
+        try:
+            async for chunk in iterate_in_threadpool(
+                encode_chunks(battle_events.read(battle_id, from_seq, last_seq))
+            ):
+                yield chunk
+            if events is None:
+                return
+            session = battle_sessions.get(battle_id)
+            while not await request.is_disconnected():
+                if (session is None or session.finished) and events.empty():
+                    # 決着・削除済みなら、記録済みのイベントを読む間に届いたものだけを返して終了
+                    return
+                try:
+                    event = await asyncio.wait_for(events.get(), Timing.MCP_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    continue
+                if event["seq"] <= last_seq or event["seq"] < from_seq:
+                    continue
+                yield encode_event(event)
+                if event["type"] == BATTLE_DELETED or event.get("winner") is not None:
+                    return
+        finally:
+            if events is not None:
+                battle_events.unsubscribe(events)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("", operation_id='get_battle_session_stats')
+async def get_battle_session_stats():
+    """バトルセッションの統計（件数・期限切れなど）を取得する"""
+    return battle_sessions.stats()
@@ -0,0 +1,52 @@
+"""APIの依存関係（FastAPIのDependsで注入するサービス）
+
+コントローラーなどのサービスはアプリケーションの起動時（lifespan）に1度だけ作成して
+app.state に置き、リクエストごとには作り直さない。キャッシュや送信バックエンドの
+接続状態はすべてのリクエストで共有される。
+"""
+
+from fastapi import FastAPI, Request
+
+from ..services.claude_controller import ClaudeController
+from ..services.dispatch_backends import get_dispatch_backend
+from ..services.file_manager import AsyncFileManager, async_file_manager
+from ..services.job_scheduler import JobScheduler, job_scheduler
+
+
+class Services:
+    """アプリケーション全体で共有するサービス"""
+
+    def __init__(self):
+        self.files = async_file_manager
+        self.scheduler = job_scheduler
+        self.claude_controller = ClaudeController(get_dispatch_backend())
+
+
+def init_services(app: FastAPI) -> Services:
+    """サービスを作成して app.state に登録する（lifespan から呼び出す）"""
+    services = Services()
+    app.state.services = services
+    return services
+
+
+def get_services(request: Request) -> Services:
+    """共有サービスを取得する（lifespan を通らずに起動された場合はここで作成する）"""
+    services = getattr(request.app.state, "services", None)
+    if services is None:
+        services = init_services(request.app)
+    return services
+
+
+def get_claude_controller(request: Request) -> ClaudeController:
+    """Claude制御サービスを取得する"""
+    return get_services(request).claude_controller
+
+
+def get_file_manager(request: Request) -> AsyncFileManager:
+    """非同期版のファイル管理サービスを取得する"""
+    return get_services(request).files
+
+
+def get_job_scheduler(request: Request) -> JobScheduler:
+    """送信バックエンドのジョブスケジューラーを取得する"""
+    return get_services(request).scheduler
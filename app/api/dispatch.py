@@ -0,0 +1,13 @@
+"""ディスパッチ状態API"""
+
+from fastapi import APIRouter
+
+from ..services.dispatch_backends import get_dispatch_backend
+from ..services.job_scheduler import job_scheduler
+
+router = APIRouter(prefix="/dispatch", tags=["dispatch"])
+
+@router.get("/status", operation_id='get_dispatch_status')
+async def get_dispatch_status():
+    """プロンプト送信バックエンドの状態（GUIディスパッチャーのキュー深さ・処理時間、ジョブスケジューラーのキューなど）を取得する"""
+    return {**get_dispatch_backend().status(), "scheduler": job_scheduler.stats()}
@@ -0,0 +1,28 @@
+"""イベントログAPI（バトルのイベントログの一括エクスポート）"""
+
+import asyncio
+
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+
+from ..services.battle_events import battle_events
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+@router.get("/export", operation_id='export_battle_events')
+async def export_battle_events(
+    from_seq: int = Query(0, ge=0, description="この seq 以降のイベントだけを返す")
+):
+    """イベントログのセグメントを古い順にNDJSONのままストリーミングする（全体をメモリに読み込まない）"""
+    await asyncio.get_running_loop().run_in_executor(None, battle_events.flush)
+    # 同期のイテレーターはスレッドプールで読み込まれる
+    return StreamingResponse(
+        battle_events.export(from_seq),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="battle_events.ndjson"'}
+    )
+
+@router.get("", operation_id='get_event_log_stats')
+async def get_event_log_stats():
+    """イベントログの統計（seq・セグメント数・書き出し回数など）を取得する"""
+    return battle_events.stats()
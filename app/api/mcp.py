@@ -1,12 +1,16 @@
 """MCP APIエンドポイント"""
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
+import asyncio
 
 from .models import ClaudeResult, ClaudeResultResponse, AttackResultData, AttackResultResponse, FinishCommentData, FinishCommentResponse
+from .responses import FastJSONResponse, dumps
 from ..services.mcp_manager import mcp_manager
+from ..core.constants import Timing
 
-router = APIRouter(tags=["MCP"])
+router = APIRouter(tags=["MCP"], default_response_class=FastJSONResponse)
 
 @router.post("/mcp/results/attack", response_model=AttackResultResponse, operation_id='save_attack_result')
 async def save_attack_result(request: AttackResultData):
@@ -24,6 +28,7 @@ async def save_attack_result(request: AttackResultData):
         return AttackResultResponse(
             success=True,
             execution_id=result["execution_id"],
+            correlation_id=result["correlation_id"],
             result_type=result["result_type"],  # Claude Desktopから送信された値を使用
             timestamp=result["timestamp"],
             message="攻撃結果を正常に保存しました",
@@ -55,6 +60,7 @@ async def save_finish_result(request: FinishCommentData):
         return FinishCommentResponse(
             success=True,
             execution_id=result["execution_id"],
+            correlation_id=result["correlation_id"],
             result_type=result["result_type"],  # Claude Desktopから送信された値を使用
             timestamp=result["timestamp"],
             message="決着コメント結果を正常に保存しました",
@@ -71,10 +77,16 @@ async def save_finish_result(request: FinishCommentData):
         )
 
 @router.get("/mcp/result")
-async def get_current_mcp_result():
+async def get_current_mcp_result(
+    correlation_id: Optional[str] = Query(None, description="相関ID（省略時は最も古い結果）"),
+    wait: float = Query(0, ge=0, le=Timing.MCP_LONG_POLL_MAX_WAIT, description="結果が届くまで待機する最大秒数（ロングポーリング）")
+):
     """現在キューされているMCP結果を取得（取得後削除）"""
     try:
-        result = mcp_manager.get_current_result()
+        if wait > 0:
+            result = await mcp_manager.wait_for_result(correlation_id, wait)
+        else:
+            result = mcp_manager.get_current_result(correlation_id)
         if result is None:
             raise HTTPException(
                 status_code=404,
@@ -90,10 +102,12 @@ async def get_current_mcp_result():
         )
 
 @router.get("/mcp/result/status")
-async def get_mcp_result_status():
+async def get_mcp_result_status(
+    correlation_id: Optional[str] = Query(None, description="相関ID（省略時はいずれかの結果）")
+):
     """MCP結果キューの状態を確認"""
     try:
-        has_result = mcp_manager.has_result()
+        has_result = mcp_manager.has_result(correlation_id)
         return {
             "has_result": has_result,
             "message": "結果がキューされています" if has_result else "キューは空です"
@@ -104,11 +118,45 @@ async def get_mcp_result_status():
             detail=f"MCP結果状態確認に失敗しました: {str(e)}"
         )
 
+@router.get("/mcp/result/stream", operation_id='stream_mcp_results')
+async def stream_mcp_results(
+    request: Request,
+    correlation_id: Optional[str] = Query(None, description="相関ID（省略時はすべての結果）")
+):
+    """MCP結果をServer-Sent Eventsでプッシュ配信する"""
+    queue = mcp_manager.subscribe(correlation_id)
+    
+    async def event_stream():
+        try:
+            yield ": connected\n\n"
+            while not await request.is_disconnected():
+                try:
+                    result = await asyncio.wait_for(queue.get(), Timing.MCP_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    # 接続維持のためのハートビート
+                    yield ": heartbeat\n\n"
+                    continue
+                yield b"event: result\ndata: " + dumps(result) + b"\n\n"
+        finally:
+            await mcp_manager.release(queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/mcp/result/{execution_id}")
-async def get_mcp_result_by_id(execution_id: str):
+async def get_mcp_result_by_id(
+    execution_id: str,
+    wait: float = Query(0, ge=0, le=Timing.MCP_LONG_POLL_MAX_WAIT, description="結果が届くまで待機する最大秒数（ロングポーリング）")
+):
     """特定の実行IDのMCP結果を取得（取得後削除）"""
     try:
-        result = mcp_manager.get_result(execution_id)
+        if wait > 0:
+            result = await mcp_manager.wait_for_execution(execution_id, wait)
+        else:
+            result = mcp_manager.get_result(execution_id)
         if result is None:
             raise HTTPException(
                 status_code=404,
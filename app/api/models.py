@@ -10,6 +10,7 @@ class SummonStatus(str, Enum):
     GENERATING = "generating"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
 
 class CreatureStats(BaseModel):
     """召喚獣ステータス"""
@@ -23,12 +24,36 @@ class SummonRequest(BaseModel):
     """召喚リクエスト"""
     prompt: str = Field(..., min_length=1, max_length=500, description="召喚呪文")
     victoryComment: Optional[str] = Field(None, max_length=200, description="勝利コメント")
+    allowReuse: bool = Field(True, description="似た呪文の召喚獣があれば再利用を許可する")
 
 class SummonResponse(BaseModel):
     """召喚レスポンス"""
     summonId: str = Field(..., description="召喚ID")
     status: SummonStatus = Field(..., description="召喚状態")
     message: str = Field(..., description="メッセージ")
+    similarSummonId: Optional[str] = Field(None, description="似た呪文で召喚済みの召喚ID")
+    similarity: Optional[float] = Field(None, description="呪文の類似度（0〜1）")
+
+class MeshInfo(BaseModel):
+    """メッシュのメタデータ（mesh.json）"""
+    triangles: int = Field(..., description="三角形数")
+    bbox_min: List[float] = Field(..., description="バウンディングボックスの最小点")
+    bbox_max: List[float] = Field(..., description="バウンディングボックスの最大点")
+    center: List[float] = Field(..., description="バウンディングボックスの中心")
+    centroid: List[float] = Field(..., description="表面の重心")
+    surface_area: float = Field(..., description="表面積")
+
+class ModelLOD(BaseModel):
+    """モデルの詳細度（LOD）"""
+    level: int = Field(..., description="LODレベル（0が元のモデル）")
+    ratio: float = Field(..., description="元の三角形数に対する目標割合")
+    path: str = Field(..., description="モデルファイルパス")
+    triangles: int = Field(..., description="三角形数")
+    bytes: int = Field(..., description="ファイルサイズ")
+    qmesh: Optional[str] = Field(None, description="量子化インデックス形式（.qmesh）のファイルパス")
+    qmesh_bytes: Optional[int] = Field(None, description=".qmeshのファイルサイズ")
+    bbox_min: Optional[List[float]] = Field(None, description="バウンディングボックスの最小点")
+    bbox_max: Optional[List[float]] = Field(None, description="バウンディングボックスの最大点")
 
 class SummonStatusResponse(BaseModel):
     """召喚状態レスポンス"""
@@ -36,16 +61,53 @@ class SummonStatusResponse(BaseModel):
     status: SummonStatus = Field(..., description="召喚状態")
     models: Optional[str] = Field(None, description="モデルファイルパス")
     stats: Optional[CreatureStats] = Field(None, description="召喚獣ステータス")
+    lods: Optional[List[ModelLOD]] = Field(None, description="詳細度別のモデル（生成前はなし）")
+    mesh: Optional[MeshInfo] = Field(None, description="model.stl のメタデータ")
+    queuePosition: Optional[int] = Field(None, description="生成キューの順番（0は生成中、キューにない場合はなし）")
+    etaSeconds: Optional[float] = Field(None, description="生成完了までの目安時間（秒）")
 
 class AttackRequest(BaseModel):
     """攻撃リクエスト"""
     prompt: str = Field(..., min_length=1, max_length=200, description="攻撃呪文")
     me: CreatureStats = Field(..., description="自分の召喚獣")
     enemy: CreatureStats = Field(..., description="敵の召喚獣")
+    correlationId: Optional[str] = Field(None, description="相関ID（MCP結果の受け取りに使用、省略時はサーバーで生成）")
 
 class AttackResponse(BaseModel):
     """攻撃レスポンス"""
-    result: 'AttackResultData' = Field(..., description="攻撃結果")
+    result: 'AttackResultData' = Field(..., description="攻撃結果（pending の場合は仮の結果）")
+    correlationId: Optional[str] = Field(None, description="MCP結果の相関ID")
+    pending: bool = Field(False, description="結果が未着（相関IDでMCP結果を待つ必要がある）かどうか")
+    mcpResult: Optional[Dict[str, Any]] = Field(None, description="受け取ったMCP結果（攻撃以外の形式の結果も含む）")
+
+class BattleCreateRequest(BaseModel):
+    """バトル作成リクエスト（召喚IDか召喚獣のステータスのどちらかを2体分指定）"""
+    summonIds: Optional[List[str]] = Field(None, min_length=2, max_length=2, description="召喚獣1・2の召喚ID")
+    creatures: Optional[List[CreatureStats]] = Field(None, min_length=2, max_length=2, description="召喚獣1・2のステータス")
+
+class BattleState(BaseModel):
+    """バトルの状態（召喚獣1・2の順。currentTurn・winner は 1 か 2）"""
+    battleId: str = Field(..., description="バトルID")
+    names: List[str] = Field(..., description="召喚獣名")
+    hp: List[int] = Field(..., description="現在のHP")
+    maxHp: List[int] = Field(..., description="最大HP")
+    turn: int = Field(..., description="適用済みの攻撃の数")
+    currentTurn: int = Field(..., description="次に攻撃する召喚獣")
+    winner: Optional[int] = Field(None, description="勝者（決着していなければnull）")
+    pendingCorrelationId: Optional[str] = Field(None, description="結果待ちの攻撃の相関ID")
+    lastResult: Optional['AttackResultData'] = Field(None, description="最後に適用した攻撃結果")
+
+class BattleAttackRequest(BaseModel):
+    """バトルIDを指定した攻撃リクエスト"""
+    prompt: str = Field(..., min_length=1, max_length=200, description="攻撃呪文")
+    correlationId: Optional[str] = Field(None, description="相関ID（省略時はサーバーで生成）")
+
+class BattleAttackResponse(BaseModel):
+    """バトルIDを指定した攻撃のレスポンス"""
+    battle: BattleState = Field(..., description="攻撃結果を適用した後のバトルの状態（pending の場合は適用前）")
+    result: 'AttackResultData' = Field(..., description="攻撃結果（pending の場合は仮の結果）")
+    correlationId: str = Field(..., description="MCP結果の相関ID")
+    pending: bool = Field(False, description="結果が未着かどうか（届いた時点でサーバー側で適用される）")
 
 class FinishRequest(BaseModel):
     """勝負決着リクエスト"""
@@ -66,6 +128,7 @@ class SummonListItem(BaseModel):
 class SummonListResponse(BaseModel):
     """召喚獣リストレスポンス"""
     summons: List[SummonListItem] = Field(..., description="召喚獣リスト")
+    total: int = Field(0, description="召喚獣の総数")
 
 class BattleAction(BaseModel):
     """バトルアクション"""
@@ -127,6 +190,7 @@ class AttackResultData(BaseModel):
     comment: str = Field(..., description="攻撃を放ったときの実況コメント")
     attacker: AttackParticipant = Field(..., description="攻撃者情報")
     defender: AttackParticipant = Field(..., description="防御者情報")
+    correlation_id: Optional[str] = Field(None, description="プロンプトで指定された相関ID（そのまま返すこと）")
     
     @property
     def damage(self) -> int:
@@ -137,6 +201,7 @@ class AttackResultResponse(BaseModel):
     """攻撃結果保存のレスポンス"""
     success: bool = Field(..., description="処理成功フラグ")
     execution_id: str = Field(..., description="実行UUID")
+    correlation_id: Optional[str] = Field(None, description="相関ID")
     result_type: str = Field(..., description="結果タイプ")
     timestamp: str = Field(..., description="処理時刻")
     message: str = Field(..., description="処理メッセージ")
@@ -145,11 +210,13 @@ class AttackResultResponse(BaseModel):
 class FinishCommentData(BaseModel):
     """決着コメントデータ"""
     comment: str = Field(..., description="決着時のコメント")
+    correlation_id: Optional[str] = Field(None, description="プロンプトで指定された相関ID（そのまま返すこと）")
 
 class FinishCommentResponse(BaseModel):
     """決着コメント保存のレスポンス"""
     success: bool = Field(..., description="処理成功フラグ")
     execution_id: str = Field(..., description="実行UUID")
+    correlation_id: Optional[str] = Field(None, description="相関ID")
     result_type: str = Field(..., description="結果タイプ")
     timestamp: str = Field(..., description="処理時刻")
     message: str = Field(..., description="処理メッセージ")
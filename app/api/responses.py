@@ -0,0 +1,68 @@
+"""高速なJSONレスポンス
+
+orjson があれば orjson で、なければ標準の json（区切り文字を詰めた形式）でエンコードする。
+変更の少ない一覧レスポンスは EncodedPayload としてエンコード済みのバイト列
+（必要ならgzip圧縮版も）を保持し、ETagで再検証できるようにする。
+"""
+
+import gzip
+import hashlib
+import json
+from typing import Any, Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+
+from ..services.asset_files import accepted_encodings
+
+try:
+    import orjson
+except ImportError:  # orjsonは任意
+    orjson = None
+
+# これより小さい本文は圧縮しない
+GZIP_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+
+
+def dumps(content: Any) -> bytes:
+    """JSONをUTF-8のバイト列にエンコードする"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """orjsonでエンコードするJSONResponse"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class EncodedPayload:
+    """エンコード済みのJSONレスポンス本文（gzip版は初回要求時に作成）"""
+
+    __slots__ = ("body", "etag", "_gzipped")
+
+    def __init__(self, content: Any):
+        self.body = dumps(content)
+        self.etag = f'"{hashlib.blake2b(self.body, digest_size=8).hexdigest()}"'
+        self._gzipped: Optional[bytes] = None
+
+    @property
+    def gzipped(self) -> bytes:
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=GZIP_LEVEL, mtime=0)
+        return self._gzipped
+
+    def to_response(self, request_headers: Headers) -> Response:
+        """リクエストに応じて304・gzip・非圧縮のいずれかで応答する"""
+        headers = {"etag": self.etag, "cache-control": "no-cache", "vary": "Accept-Encoding"}
+        if_none_match = request_headers.get("if-none-match", "")
+        if self.etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+
+        if len(self.body) >= GZIP_MIN_SIZE and "gzip" in accepted_encodings(request_headers.get("accept-encoding", "")):
+            headers["content-encoding"] = "gzip"
+            return Response(self.gzipped, media_type="application/json", headers=headers)
+        return Response(self.body, media_type="application/json", headers=headers)
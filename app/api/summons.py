@@ -1,107 +1,139 @@
 """召喚関連API"""
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from pathlib import Path
 import uuid
 import asyncio
-import json
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 from .models import (
     SummonRequest, SummonResponse, SummonStatusResponse, SummonStatus, CreatureStats,
-    SummonListResponse, SummonListItem
+    SummonListResponse
 )
+from .deps import get_claude_controller, get_file_manager, get_job_scheduler
+from .responses import EncodedPayload, FastJSONResponse
 from ..services.claude_controller import ClaudeController
-from ..services.file_manager import FileManager
+from ..services.file_manager import AsyncFileManager
+from ..services.job_scheduler import JobScheduler
+from ..services.summon_catalog import summon_catalog
+from ..services.prompt_index import prompt_index
+from ..services.mesh_lod import mesh_lod_service
+from ..core.config import settings
+from ..core.exceptions import SchedulerBusyError
 
-router = APIRouter(prefix="/summons", tags=["summoning"])
+router = APIRouter(prefix="/summons", tags=["summoning"], default_response_class=FastJSONResponse)
+
+# エンコード済みの一覧レスポンス (offset, limit) -> (カタログのバージョン, 本文)
+_list_payloads: Dict[Tuple[int, int], Tuple[int, EncodedPayload]] = {}
+LIST_PAYLOAD_CACHE_SIZE = 64
+
+# プロンプトの送信後、ファイルの書き込みを待っている召喚 summon_id -> 待機タスク
+_generating: Dict[str, asyncio.Task] = {}
 
 @router.get("", response_model=SummonListResponse)
-async def get_summons_list():
-    """召喚獣リストを取得する"""
-    file_manager = FileManager()
-    summons = []
-    
-    # assetsディレクトリ内のすべての召喚獣をスキャン
-    if file_manager.assets_dir.exists():
-        for summon_dir in file_manager.assets_dir.iterdir():
-            if summon_dir.is_dir():
-                summon_id = summon_dir.name
-                status_str = file_manager.load_summon_status(summon_id)
-                
-                try:
-                    status = SummonStatus(status_str)
-                except ValueError:
-                    if status_str == "completed":
-                        status = SummonStatus.COMPLETED
-                    else:
-                        status = SummonStatus.FAILED
-                
-                # 召喚獣の詳細情報を取得
-                name = "不明な召喚獣"
-                description = "説明なし"
-                models_path = None
-                
-                if status == SummonStatus.COMPLETED:
-                    stats_path = file_manager.get_stats_path(summon_id)
-                    if stats_path.exists():
-                        try:
-                            with open(stats_path, 'r', encoding='utf-8') as f:
-                                stats_data = json.load(f)
-                                name = stats_data.get("name", name)
-                                description = stats_data.get("description", description)
-                                models_path = f"assets/{summon_id}/model.stl"
-                        except Exception as e:
-                            print(f"ステータス読み込みエラー {summon_id}: {e}")
-                
-                summons.append(SummonListItem(
-                    summonId=summon_id,
-                    name=name,
-                    description=description,
-                    status=status,
-                    models=models_path
-                ))
+async def get_summons_list(
+    request: Request,
+    offset: int = Query(0, ge=0, description="取得開始位置"),
+    limit: int = Query(summon_catalog.DEFAULT_PAGE_SIZE, ge=1, le=1000, description="取得件数（total を見て offset をずらして続きを取得する）")
+):
+    """召喚獣リストを取得する（インメモリカタログから返す）
     
-    # 作成日時順にソート（新しい順）
-    summons.sort(key=lambda x: x.summonId, reverse=True)
-    return SummonListResponse(summons=summons)
+    エンコード済みの本文をカタログのバージョンごとにキャッシュし、
+    召喚獣が追加・変更・削除されるまで同じバイト列（gzip版・ETag付き）を返す。
+    """
+    key = (offset, limit)
+    cached = _list_payloads.get(key)
+    if cached is None or cached[0] != summon_catalog.version:
+        # 召喚ID（UUID文字列）の降順でページ分のみ取得（作成順ではない）
+        records, total, version = summon_catalog.page_with_version(offset, limit)
+        payload = EncodedPayload({
+            "summons": [
+                {
+                    "summonId": record.summon_id,
+                    "name": record.name,
+                    "description": record.description,
+                    "status": record.status.value,
+                    "models": record.model_path
+                }
+                for record in records
+            ],
+            "total": total
+        })
+        if len(_list_payloads) >= LIST_PAYLOAD_CACHE_SIZE:
+            _list_payloads.clear()
+        _list_payloads[key] = cached = (version, payload)
+    return cached[1].to_response(request.headers)
 
 @router.post("", response_model=SummonResponse)
 async def create_summon(
     request: SummonRequest, 
-    background_tasks: BackgroundTasks
+    claude_controller: ClaudeController = Depends(get_claude_controller),
+    file_manager: AsyncFileManager = Depends(get_file_manager),
+    scheduler: JobScheduler = Depends(get_job_scheduler)
 ):
-    """召喚獣を生成する"""
+    """召喚獣を生成する（生成はジョブスケジューラーのキューで順番に実行する）"""
     summon_id = str(uuid.uuid4())
-    file_manager = FileManager()
+    
+    # 似た呪文で召喚済みの召喚獣を探す
+    similar = None
+    if request.allowReuse and settings.SUMMON_REUSE_MODE != "off":
+        similar = prompt_index.find_similar(request.prompt, settings.SUMMON_REUSE_THRESHOLD)
     
     # ファイルベースで状態を保存
-    file_manager.save_summon_status(summon_id, SummonStatus.PENDING.value)
+    await file_manager.save_summon_status(summon_id, SummonStatus.PENDING.value)
+    await file_manager.save_summon_prompt(summon_id, request.prompt, similar[0] if similar else None)
     
-    # バックグラウンドタスクで召喚処理を実行
-    background_tasks.add_task(
-        process_summon, 
-        summon_id, 
-        request.prompt
-    )
+    if similar and settings.SUMMON_REUSE_MODE == "clone":
+        # 生成せずに既存の召喚獣を新しい召喚IDへ複製
+        similar_id, similarity = similar
+        if await file_manager.clone_summon(similar_id, summon_id):
+            await file_manager.save_summon_status(summon_id, SummonStatus.COMPLETED.value)
+            # 元の召喚獣のLODを引き継げなかった場合は生成を開始する
+            await mesh_lod_service.get_lods_async(summon_id)
+            return SummonResponse(
+                summonId=summon_id,
+                status=SummonStatus.COMPLETED,
+                message=f"似た呪文の召喚獣を呼び出しました（類似度 {similarity:.2f}）",
+                similarSummonId=similar_id,
+                similarity=round(similarity, 3)
+            )
+    
+    # スケジューラーのキューにプロンプトの送信を追加（満杯なら登録を取り消して429を返す）
+    try:
+        sent = scheduler.submit(
+            summon_id,
+            "summon",
+            lambda: send_summon(summon_id, request.prompt, claude_controller, file_manager)
+        )
+    except SchedulerBusyError as e:
+        await file_manager.cleanup_summon(summon_id)
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    
+    # 生成完了の待機はスケジューラーの枠の外で行う（待っている間も攻撃を実行できる）
+    _generating[summon_id] = asyncio.ensure_future(process_summon(summon_id, sent, claude_controller, file_manager))
     
+    # offerモードでは生成を開始しつつ、似た召喚獣を候補として返す
     return SummonResponse(
         summonId=summon_id,
         status=SummonStatus.PENDING,
-        message="召喚処理を開始しました"
+        message="召喚処理を開始しました",
+        similarSummonId=similar[0] if similar else None,
+        similarity=round(similar[1], 3) if similar else None
     )
 
 @router.get("/{summon_id}", response_model=SummonStatusResponse)
-async def get_summon_status(summon_id: str):
+async def get_summon_status(
+    summon_id: str,
+    file_manager: AsyncFileManager = Depends(get_file_manager),
+    scheduler: JobScheduler = Depends(get_job_scheduler)
+):
     """召喚状態を取得する"""
-    file_manager = FileManager()
-    
-    # ファイルベースで召喚IDの存在をチェック
-    if not file_manager.summon_exists(summon_id):
+    # 存在確認・状態・ステータス・メッシュ情報をまとめて読み込む
+    detail = await file_manager.load_summon_detail(summon_id)
+    if detail is None:
         raise HTTPException(status_code=404, detail="召喚IDが見つかりません")
     
-    # ファイルベースで状態を取得
-    status_str = file_manager.load_summon_status(summon_id)
+    status_str = detail["status"]
     
     try:
         status = SummonStatus(status_str)
@@ -113,48 +145,80 @@ async def get_summon_status(summon_id: str):
             status = SummonStatus.FAILED
     
     # 完了状態の場合、ファイルとステータスを確認
-    if status == SummonStatus.COMPLETED:
-        model_path = file_manager.get_model_path(summon_id)
-        stats_path = file_manager.get_stats_path(summon_id)
-        
-        if model_path.exists() and stats_path.exists():
-            with open(stats_path, 'r', encoding='utf-8') as f:
-                stats_data = json.load(f)
-                stats = CreatureStats(**stats_data)
-            
-            return SummonStatusResponse(
-                summonId=summon_id,
-                status=status,
-                models=f"assets/{summon_id}/model.stl",
-                stats=stats
-            )
+    if status == SummonStatus.COMPLETED and detail["stats"] is not None:
+        return SummonStatusResponse(
+            summonId=summon_id,
+            status=status,
+            models=f"assets/{summon_id}/model.stl",
+            stats=CreatureStats(**detail["stats"]),
+            lods=await mesh_lod_service.get_lods_async(summon_id),
+            mesh=detail["mesh"]
+        )
     
+    # 生成待ち・生成中はキューの順番と完了までの目安時間も返す
+    eta = scheduler.eta(summon_id)
     return SummonStatusResponse(
         summonId=summon_id,
-        status=status
+        status=status,
+        queuePosition=scheduler.position(summon_id),
+        etaSeconds=round(eta, 1) if eta is not None else None
     )
 
-async def process_summon(summon_id: str, prompt: str):
-    """召喚処理を実行する（バックグラウンドタスク）"""
-    file_manager = FileManager()
+@router.delete("/{summon_id}", response_model=SummonResponse)
+async def cancel_summon(
+    summon_id: str,
+    file_manager: AsyncFileManager = Depends(get_file_manager),
+    scheduler: JobScheduler = Depends(get_job_scheduler)
+):
+    """生成待ち・生成中の召喚を取り消す"""
+    if not scheduler.cancel(summon_id):
+        waiting = _generating.get(summon_id)
+        if waiting is None:
+            if not await file_manager.summon_exists(summon_id):
+                raise HTTPException(status_code=404, detail="召喚IDが見つかりません")
+            status_str = await file_manager.load_summon_status(summon_id)
+            raise HTTPException(status_code=409, detail=f"取り消せない状態です: {status_str}")
+        # 送信済みでファイルの書き込みを待っている召喚
+        waiting.cancel()
     
+    await file_manager.save_summon_status(summon_id, SummonStatus.CANCELLED.value)
+    return SummonResponse(
+        summonId=summon_id,
+        status=SummonStatus.CANCELLED,
+        message="召喚を取り消しました"
+    )
+
+async def send_summon(summon_id: str, prompt: str, claude_controller: ClaudeController,
+                      file_manager: AsyncFileManager) -> str:
+    """召喚のプロンプトを送信し、相関IDを返す（ジョブスケジューラーのジョブ）"""
+    # 状態を更新
+    await file_manager.save_summon_status(summon_id, SummonStatus.GENERATING.value)
+    
+    # ディレクトリを作成
+    await file_manager.create_summon_directory(summon_id)
+    
+    # Claudeに召喚リクエストを送信（貼り付けが終わればスケジューラーの枠と送信先を解放する）
+    return await claude_controller.send_summon(prompt, summon_id)
+
+async def process_summon(summon_id: str, sent: asyncio.Future, claude_controller: ClaudeController,
+                         file_manager: AsyncFileManager):
+    """送信ジョブの完了後、召喚獣のファイルが書き込まれるまで待って状態を更新する"""
     try:
-        # ファイルベースで状態を更新
-        file_manager.save_summon_status(summon_id, SummonStatus.GENERATING.value)
-        
-        claude_controller = ClaudeController()
-        
-        # ディレクトリを作成
-        file_manager.create_summon_directory(summon_id)
+        # キューでの取り消しはそのまま待機の取り消しになる
+        correlation_id = await asyncio.shield(sent)
         
-        # Claudeに召喚リクエストを送信
-        result = await claude_controller.generate_summon(prompt, summon_id)
+        # 今回の送信の相関IDが書かれたstatus.jsonだけを完了とする
+        result = await claude_controller.wait_for_summon(summon_id, correlation_id)
         
         if result:
-            file_manager.save_summon_status(summon_id, SummonStatus.COMPLETED.value)
+            await file_manager.save_summon_status(summon_id, SummonStatus.COMPLETED.value)
+            # 軽量な表示用モデル（LOD）をバックグラウンドで生成
+            mesh_lod_service.schedule(summon_id)
         else:
-            file_manager.save_summon_status(summon_id, SummonStatus.FAILED.value)
+            await file_manager.save_summon_status(summon_id, SummonStatus.FAILED.value)
             
     except Exception as e:
         print(f"召喚処理エラー: {e}")
-        file_manager.save_summon_status(summon_id, SummonStatus.FAILED.value)
\ No newline at end of file
+        await file_manager.save_summon_status(summon_id, SummonStatus.FAILED.value)
+    finally:
+        _generating.pop(summon_id, None)
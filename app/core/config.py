@@ -8,23 +8,28 @@ class Settings:
     """アプリケーション設定クラス"""
     
     def __init__(self):
-        """設定初期化"""
+        """設定初期化（ファイルの読み込みのみ。ディレクトリの作成は prepare で行う）"""
         # ディレクトリ設定
         self.CONFIG_DIR = Path("config")
         self.STATIC_DIR = Path("static")
         self.ASSETS_DIR = Path("assets")
+        self.CONFIG_FILE = self.CONFIG_DIR / "app_config.json"
         
-        # 必要なディレクトリを作成
+        # 設定ファイルを読み込み
+        self._load_config()
+    
+    def prepare(self):
+        """必要なディレクトリと、なければデフォルトの設定ファイルを作成する（起動時に呼び出す）"""
         self.ASSETS_DIR.mkdir(exist_ok=True)
         self.CONFIG_DIR.mkdir(exist_ok=True)
         self.STATIC_DIR.mkdir(exist_ok=True)
-        
-        # 設定ファイルを読み込み
-        self._load_config()
+        if not self.CONFIG_FILE.exists():
+            with open(self.CONFIG_FILE, 'w', encoding='utf-8') as f:
+                json.dump(self._default_config, f, ensure_ascii=False, indent=2)
     
     def _load_config(self):
         """設定ファイルを読み込む"""
-        config_file = self.CONFIG_DIR / "app_config.json"
+        config_file = self.CONFIG_FILE
         
         # デフォルト設定
         default_config = {
@@ -43,17 +48,109 @@ class Settings:
                 "allow_credentials": True,
                 "allow_methods": ["*"],
                 "allow_headers": ["*"]
+            },
+            "mcp_results": {
+                "ttl_seconds": 600,
+                "max_results": 1000,
+                "max_bytes": 10485760,
+                "journal": True
+            },
+            "dispatch": {
+                "backend": "desktop",
+                "desktop": {
+                    "health_interval": 30,
+                    "agent_timeout": 10,
+                    "sticky_size": 1024,
+                    "failure_threshold": 3,
+                    "recovery_timeout": 30
+                },
+                "http": {
+                    "url": "http://localhost:8080/v1/chat/completions",
+                    "model": None,
+                    "api_key_env": "DISPATCH_API_KEY",
+                    "timeout": 120
+                },
+                "stub": {
+                    "summon_latency": 2.0,
+                    "attack_latency": 0.5
+                }
+            },
+            "attack_cache": {
+                "policy": "always",
+                "ttl_seconds": 86400,
+                "max_entries": 2000,
+                "variety": 0.2,
+                "max_variants": 3,
+                "persist": True,
+                "path": "data/attack_cache.json"
+            },
+            "summon_reuse": {
+                "mode": "clone",
+                "threshold": 0.8,
+                "ngram": 2
+            },
+            "mesh_lod": {
+                "enabled": True,
+                "ratios": [0.25, 0.05],
+                "min_triangles": 500,
+                "workers": 2,
+                "qmesh": True,
+                "qmesh_normals": True
+            },
+            "assets": {
+                "precompress": True
+            },
+            "metadata_store": {
+                "path": "data/metadata.db",
+                "batch_size": 256,
+                "synchronous": "NORMAL"
+            },
+            "file_io": {
+                "max_workers": 8
+            },
+            "startup": {
+                "fast": False
+            },
+            "scheduler": {
+                "concurrency": {"desktop": 1, "http": 4, "stub": 8},
+                "max_queue": 20,
+                "estimates": {"summon": 10, "attack": 5}
+            },
+            "battle": {
+                "result_timeout": 30,
+                "session_ttl_seconds": 3600,
+                "max_sessions": 10000,
+                "snapshot_interval": 60,
+                "snapshot_path": "data/battle_sessions.json"
+            },
+            "desktop_timing": {
+                "adaptive": True,
+                "verify_paste": True,
+                "clipboard": "auto",
+                "clipboard_timeout": 1.0,
+                "gui_pause": 0.02,
+                "min_delay": 0.02,
+                "max_delay": 2.0,
+                "max_attempts": 3,
+                "decrease": 0.9,
+                "increase": 2.0
+            },
+            "event_log": {
+                "enabled": True,
+                "dir": "data/events",
+                "segment_bytes": 8388608,
+                "max_segments": 64,
+                "batch_size": 256
             }
         }
         
-        # 設定ファイルが存在する場合は読み込み、なければデフォルトを作成
+        # 設定ファイルが存在する場合は読み込み、なければデフォルト（prepare でファイルを作成）
+        self._default_config = default_config
         if config_file.exists():
             with open(config_file, 'r', encoding='utf-8') as f:
                 config = json.load(f)
         else:
             config = default_config
-            with open(config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
         
         # 設定を属性に展開
         self.APP_NAME = config["app"]["name"]
@@ -69,6 +166,92 @@ class Settings:
         self.ALLOW_METHODS = config["cors"]["allow_methods"]
         self.ALLOW_HEADERS = config["cors"]["allow_headers"]
         
+        # MCP結果ストア設定（古い設定ファイルにはないためデフォルトで補完）
+        mcp_results = {**default_config["mcp_results"], **config.get("mcp_results", {})}
+        self.MCP_RESULT_TTL = mcp_results["ttl_seconds"]
+        self.MCP_RESULT_MAX_RESULTS = mcp_results["max_results"]
+        self.MCP_RESULT_MAX_BYTES = mcp_results["max_bytes"]
+        self.MCP_RESULT_JOURNAL = mcp_results["journal"]
+        
+        # プロンプト送信バックエンド設定（desktop / http / stub）
+        self.DISPATCH_CONFIG = {**default_config["dispatch"], **config.get("dispatch", {})}
+        self.DISPATCH_BACKEND = self.DISPATCH_CONFIG["backend"]
+        
+        # 攻撃結果キャッシュ設定（always / probabilistic / never。
+        # path: 永続化ファイル。/assets で公開されるため assets/ の下には置かない）
+        attack_cache = {**default_config["attack_cache"], **config.get("attack_cache", {})}
+        self.ATTACK_CACHE_POLICY = attack_cache["policy"]
+        self.ATTACK_CACHE_TTL = attack_cache["ttl_seconds"]
+        self.ATTACK_CACHE_MAX_ENTRIES = attack_cache["max_entries"]
+        self.ATTACK_CACHE_VARIETY = attack_cache["variety"]
+        self.ATTACK_CACHE_MAX_VARIANTS = attack_cache["max_variants"]
+        self.ATTACK_CACHE_PERSIST = attack_cache["persist"]
+        self.ATTACK_CACHE_PATH = Path(attack_cache["path"])
+        
+        # 類似した召喚呪文の再利用設定（clone / offer / off）
+        summon_reuse = {**default_config["summon_reuse"], **config.get("summon_reuse", {})}
+        self.SUMMON_REUSE_MODE = summon_reuse["mode"]
+        self.SUMMON_REUSE_THRESHOLD = summon_reuse["threshold"]
+        self.SUMMON_REUSE_NGRAM = summon_reuse["ngram"]
+        
+        # メッシュLOD生成設定（ratiosは元の三角形数に対する割合）
+        mesh_lod = {**default_config["mesh_lod"], **config.get("mesh_lod", {})}
+        self.MESH_LOD_ENABLED = mesh_lod["enabled"]
+        self.MESH_LOD_RATIOS = mesh_lod["ratios"]
+        self.MESH_LOD_MIN_TRIANGLES = mesh_lod["min_triangles"]
+        self.MESH_LOD_WORKERS = mesh_lod["workers"]
+        # 量子化インデックス形式（.qmesh）の出力と、オクタヘドラル法線の有無
+        self.MESH_LOD_QMESH = mesh_lod["qmesh"]
+        self.MESH_LOD_QMESH_NORMALS = mesh_lod["qmesh_normals"]
+        
+        # アセット配信設定（完成時に .gz / .br を作成する）
+        assets = {**default_config["assets"], **config.get("assets", {})}
+        self.ASSETS_PRECOMPRESS = assets["precompress"]
+        
+        # メタデータストア設定（召喚状態・ステータス・MCP結果を保存するSQLite）
+        metadata_store = {**default_config["metadata_store"], **config.get("metadata_store", {})}
+        self.METADATA_DB_PATH = Path(metadata_store["path"])
+        self.METADATA_BATCH_SIZE = metadata_store["batch_size"]
+        self.METADATA_SYNCHRONOUS = metadata_store["synchronous"]
+        
+        # ファイルI/O設定（APIハンドラーのファイルアクセスを実行するスレッド数の上限）
+        file_io = {**default_config["file_io"], **config.get("file_io", {})}
+        self.FILE_IO_MAX_WORKERS = file_io["max_workers"]
+        
+        # 起動設定（fast: 類似検索インデックスと攻撃キャッシュの読み込みを待たずに起動する）
+        startup = {**default_config["startup"], **config.get("startup", {})}
+        self.STARTUP_FAST = startup["fast"]
+        
+        # ジョブスケジューラー設定（送信バックエンドごとの同時実行数、待機中のジョブの上限、
+        # 実績がないときの種別ごとの実行時間の目安（秒））
+        scheduler = {**default_config["scheduler"], **config.get("scheduler", {})}
+        self.SCHEDULER_CONCURRENCY = scheduler["concurrency"]
+        self.SCHEDULER_MAX_QUEUE = scheduler["max_queue"]
+        self.SCHEDULER_ESTIMATES = scheduler["estimates"]
+        
+        # バトル設定（result_timeout: 攻撃APIが送信後にMCP結果を待つ最大秒数、
+        # session_ttl_seconds / max_sessions: サーバー側のバトルセッションの保持期間と上限、
+        # snapshot_interval: バトルセッションのスナップショットを保存する間隔（秒））
+        battle = {**default_config["battle"], **config.get("battle", {})}
+        self.ATTACK_RESULT_TIMEOUT = battle["result_timeout"]
+        self.BATTLE_SESSION_TTL = battle["session_ttl_seconds"]
+        self.BATTLE_MAX_SESSIONS = battle["max_sessions"]
+        self.BATTLE_SNAPSHOT_INTERVAL = battle["snapshot_interval"]
+        self.BATTLE_SNAPSHOT_PATH = Path(battle["snapshot_path"])
+        
+        # Claude Desktopへの貼り付けのタイミング設定（adaptive: 貼り付けの確認結果から待ち時間を調整する、
+        # clipboard: auto / tk / pyperclip、gui_pause: pyautoguiの操作ごとの待ち時間（秒））
+        self.DESKTOP_TIMING = {**default_config["desktop_timing"], **config.get("desktop_timing", {})}
+        
+        # バトルのイベントログ設定（segment_bytes: 1セグメントの上限バイト数、
+        # max_segments: 残すセグメント数（0なら削除しない）、batch_size: 1回にまとめて書き出す最大件数）
+        event_log = {**default_config["event_log"], **config.get("event_log", {})}
+        self.EVENT_LOG_ENABLED = event_log["enabled"]
+        self.EVENT_LOG_DIR = Path(event_log["dir"])
+        self.EVENT_LOG_SEGMENT_BYTES = event_log["segment_bytes"]
+        self.EVENT_LOG_MAX_SEGMENTS = event_log["max_segments"]
+        self.EVENT_LOG_BATCH_SIZE = event_log["batch_size"]
+        
         # Claude Desktop設定ファイルパス
         self.CLAUDE_CONFIG_FILE = self.CONFIG_DIR / "claude_desktop_config.json"
 
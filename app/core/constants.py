@@ -3,22 +3,26 @@
 # 時間関連定数（秒）
 class Timing:
     """タイミング関連の定数"""
+    # 貼り付けの待ち時間の初期値（実行中は dispatch_timing が調整する）
     CLAUDE_CLICK_DELAY = 0.5
     CLAUDE_WAIT_DELAY = 2.0
-    CLIPBOARD_DELAY = 0.5
     PASTE_DELAY = 0.8
+    CLIPBOARD_DELAY = 0.5  # 貼り付けを確認できなかった場合の固定待ち時間での送信に使用
+    MOUSE_RESTORE_DELAY = 0.2  # Enterキー押下後、マウス座標を戻すまでの待ち時間
     
     # 召喚関連
     SUMMON_MAX_WAIT_TIME = 300  # 5分
-    SUMMON_CHECK_INTERVAL = 5   # 5秒
+    SUMMON_WATCH_POLL_INTERVAL = 0.5  # inotifyが使えない場合のポーリング間隔（秒）
+    CATALOG_REFRESH_INTERVAL = 5  # 召喚獣カタログの差分更新間隔（秒）
     
     # バトル関連
-    ATTACK_RESPONSE_WAIT = 3
     FINISH_RESPONSE_WAIT = 2
     
     # MCP関連
     MCP_POLL_INTERVAL = 1000  # 1秒（ミリ秒）
     MCP_MAX_ATTEMPTS = 30
+    MCP_STREAM_HEARTBEAT = 15  # プッシュ配信のハートビート間隔（秒）
+    MCP_LONG_POLL_MAX_WAIT = 60  # ロングポーリングの最大待機時間（秒）
 
 
 # プロンプトテンプレート
@@ -27,6 +31,7 @@ class PromptTemplates:
     
     SUMMON_TEMPLATE = """
 召喚呪文「{prompt}」から召喚獣を生成してください。
+相関ID: {correlation_id}
 
 以下の形式でSTLファイルとJSONステータスを作成してください：
 
@@ -63,9 +68,10 @@ print(f"STLファイルを保存し、モデルを削除しました: {{file_pat
 
 2. JSONファイル：
    - ファイル名: assets/{summon_id}/status.json
-   - 以下の形式で作成：
+   - 以下の形式で作成（correlation_idは上記の相関IDをそのまま入れてください）：
    ```json
    {{
+     "correlation_id": "{correlation_id}",
      "name": "召喚獣名",
      "hp": 数値(1-1000),
      "specialMove": "必殺技名",
@@ -84,11 +90,13 @@ print(f"STLファイルを保存し、モデルを削除しました: {{file_pat
 攻撃者: {attacker_name} (HP: {attacker_hp}, 必殺技: {attacker_special})
 防御者: {defender_name} (HP: {defender_hp}, 必殺技: {defender_special})
 攻撃呪文: 「{attack_prompt}」
+相関ID: {correlation_id}
 
-以下のJSON形式で攻撃結果を返してください:
+以下のJSON形式で攻撃結果を返してください（correlation_idは上記の相関IDをそのまま入れてください）:
 ```json
     {{
     "result_type": "attack",
+    "correlation_id": "{correlation_id}",
     "comment": "攻撃を放ったときの実況コメント",
     "attacker": {{
         "damage": 攻撃者のダメージ数値（正の値は回復、負の値はダメージ）
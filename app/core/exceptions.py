@@ -25,11 +25,29 @@ class MCPError(MysticCovenantException):
     pass
 
 
+class DispatchError(MysticCovenantException):
+    """プロンプト送信バックエンド関連エラー"""
+    pass
+
+
+class SchedulerBusyError(DispatchError):
+    """ジョブスケジューラーのキューが満杯（retry_after 秒後に再試行）"""
+    
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
 class FileManagerError(MysticCovenantException):
     """ファイル管理関連エラー"""
     pass
 
 
+class MeshError(MysticCovenantException):
+    """メッシュファイル関連エラー（書き込み途中・破損など）"""
+    pass
+
+
 class ConfigurationError(MysticCovenantException):
     """設定関連エラー"""
     pass
\ No newline at end of file
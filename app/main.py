@@ -5,6 +5,9 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse
 from fastapi_mcp import FastApiMCP
 from pydantic import BaseModel
+from contextlib import asynccontextmanager
+import asyncio
+import mimetypes
 import uvicorn
 from pathlib import Path
 
@@ -12,22 +15,118 @@ from .core.config import settings
 from .api.models import SummonRequest, SummonResponse, AttackRequest, AttackResponse, FinishRequest, FinishResponse
 from .api.summons import router as summons_router
 from .api.battle import router as battle_router
+from .api.battles import router as battles_router
 from .api.mcp import router as mcp_router
+from .api.dispatch import router as dispatch_router
+from .api.events import router as events_router
+from .api.deps import init_services
+from .core.constants import Timing
+from .services.summon_catalog import summon_catalog
+from .services.summon_watcher import summon_watcher
+from .services.mcp_manager import mcp_manager
+from .services.desktop_dispatcher import desktop_dispatcher
+from .services.job_scheduler import job_scheduler
+from .services.dispatch_backends import get_dispatch_backend
+from .services.attack_cache import attack_cache
+from .services.battle_events import battle_events
+from .services.battle_sessions import battle_sessions
+from .services.dispatch_timing import dispatch_timing
+from .services.prompt_index import prompt_index
+from .services.mesh_lod import mesh_lod_service
+from .services.asset_files import AssetStaticFiles
+from .services.metadata_store import metadata_store
+from .services.file_manager import async_file_manager
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """アプリケーションの起動・終了処理
+    
+    インポート時にはファイルシステムに触れず、サービスの初期化はすべてここで行う。
+    """
+    loop = asyncio.get_running_loop()
+    # 必要なディレクトリとデフォルトの設定ファイルを作成
+    settings.prepare()
+    # 初回起動時は assets/ のJSONメタデータをSQLiteへ取り込む
+    if await loop.run_in_executor(None, metadata_store.needs_migration):
+        imported = await loop.run_in_executor(None, metadata_store.import_assets, settings.ASSETS_DIR)
+        print(f"メタデータをSQLiteへ移行しました: {imported}")
+    # 召喚獣カタログを構築し、ディスク上の変更を差分で取り込む
+    await loop.run_in_executor(None, summon_catalog.build)
+    refresh_task = asyncio.create_task(
+        summon_catalog.run_refresh_loop(Timing.CATALOG_REFRESH_INTERVAL)
+    )
+    # 未取得のMCP結果をジャーナルから復元
+    await loop.run_in_executor(None, mcp_manager.restore)
+    # 完成済みの召喚呪文の類似検索インデックスと攻撃結果キャッシュ（なくても動作する）を並行して読み込む
+    warmup = asyncio.gather(
+        loop.run_in_executor(None, prompt_index.build),
+        loop.run_in_executor(None, attack_cache.load),
+        return_exceptions=True
+    )
+    # 前回のバトルセッションをスナップショットから復元し、期限切れの破棄と定期保存を開始
+    restored = await loop.run_in_executor(None, battle_sessions.load)
+    if restored:
+        print(f"バトルセッションを復元しました: {restored}件")
+    sessions_task = asyncio.create_task(battle_sessions.run_maintenance(settings.BATTLE_SNAPSHOT_INTERVAL))
+    if not settings.STARTUP_FAST:
+        await warmup
+    # APIへ注入するサービス（コントローラーなど）を1度だけ作成
+    init_services(app)
+    # 送信バックエンドを開始し、送信先の数（正常なClaude Desktopの数）に合わせて同時実行数を設定
+    backend = get_dispatch_backend()
+    capacity = await loop.run_in_executor(None, backend.capacity)
+    if capacity:
+        job_scheduler.resize(capacity)
+    await backend.start(job_scheduler.resize)
+    # 召喚ファイルの監視を開始
+    await summon_watcher.start()
+    try:
+        yield
+    finally:
+        # 待機中・実行中の召喚・攻撃ジョブを取り消してから各サービスを停止する
+        await job_scheduler.shutdown()
+        await backend.stop()
+        await summon_watcher.stop()
+        refresh_task.cancel()
+        sessions_task.cancel()
+        mcp_manager.store.flush()
+        # 高速起動モードで読み込み中のキャッシュを途中の状態で保存しない
+        await warmup
+        await loop.run_in_executor(None, attack_cache.save)
+        await loop.run_in_executor(None, battle_sessions.save)
+        # バッファ中のバトルのイベントを書き出す
+        await loop.run_in_executor(None, battle_events.close)
+        # 調整した貼り付けの待ち時間を次回の起動へ引き継ぐ
+        await loop.run_in_executor(None, dispatch_timing.save)
+        await loop.run_in_executor(None, desktop_dispatcher.shutdown)
+        mesh_lod_service.shutdown()
+        async_file_manager.shutdown()
+
 
 app = FastAPI(
     title=settings.APP_NAME,
     description=settings.APP_DESCRIPTION,
-    version=settings.APP_VERSION
+    version=settings.APP_VERSION,
+    lifespan=lifespan
 )
 
+# 量子化メッシュ（.qmesh）はバイナリとして配信
+mimetypes.add_type("application/octet-stream", ".qmesh")
+
 # 静的ファイルのマウント
-app.mount("/static", StaticFiles(directory=str(settings.STATIC_DIR)), name="static")
-app.mount("/assets", StaticFiles(directory=str(settings.ASSETS_DIR)), name="assets")
+# （ディレクトリは起動時に settings.prepare で作成するため、ここでは存在を確認しない）
+app.mount("/static", StaticFiles(directory=str(settings.STATIC_DIR), check_dir=False), name="static")
+# 召喚獣アセットはETag・immutableキャッシュ・事前圧縮・Rangeに対応した配信
+app.mount("/assets", AssetStaticFiles(directory=str(settings.ASSETS_DIR), check_dir=False), name="assets")
 
 # APIルーターの登録
 app.include_router(summons_router, prefix="/api")
 app.include_router(battle_router, prefix="/api")
+app.include_router(battles_router, prefix="/api")
 app.include_router(mcp_router, prefix="/api")
+app.include_router(dispatch_router, prefix="/api")
+app.include_router(events_router, prefix="/api")
 
 @app.get("/", response_class=HTMLResponse)
 async def root():
@@ -54,7 +153,9 @@ async def health_check():
     """ヘルスチェック"""
     return {"status": "ok", "message": "召喚獣バトルAPIは正常に動作しています"}
 
-mcp =FastApiMCP(app)
+# ストリーミング系・運用系のエンドポイントはMCPツールとして公開しない
+mcp =FastApiMCP(app, exclude_operations=["stream_mcp_results", "get_dispatch_status", "get_attack_cache_stats", "get_battle_session_stats",
+                                         "stream_battle_events", "export_battle_events", "get_event_log_stats"])
 mcp.mount()
 
 if __name__ == "__main__":
@@ -0,0 +1,194 @@
+"""召喚獣アセットの配信
+
+/assets 用の StaticFiles 拡張。
+
+- 内容のハッシュによる強いETag
+- 完成済み召喚獣のモデルファイルは Cache-Control: immutable
+- 完成時に作成した .gz / .br を Accept-Encoding に応じて配信
+- Rangeリクエスト（StarletteのFileResponseが処理）
+- 大きなファイルはサーバーが対応していれば http.response.pathsend
+  （ゼロコピー送信）、そうでなければ大きめのチャンクで送信
+"""
+
+import gzip
+import hashlib
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+try:
+    import brotli
+except ImportError:  # brotliは任意
+    brotli = None
+
+# 完成後は変更されないモデルファイル
+IMMUTABLE_SUFFIXES = (".stl", ".qmesh")
+# 事前圧縮の対象
+COMPRESSIBLE_SUFFIXES = (".stl", ".qmesh")
+# 圧縮しても元の9割以上の大きさなら事前圧縮ファイルを残さない
+MIN_COMPRESSION_GAIN = 0.9
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+LARGE_FILE_SIZE = 1024 * 1024
+LARGE_FILE_CHUNK_SIZE = 1024 * 1024
+
+# (Content-Encodingの値, 拡張子)。優先順
+ENCODINGS: List[Tuple[str, str]] = [("br", ".br"), ("gzip", ".gz")]
+
+
+def precompress(path: Path) -> List[str]:
+    """ファイルの .gz（brotliがあれば .br も）を作成する
+
+    Returns:
+        作成したContent-Encodingのリスト
+    """
+    if path.suffix not in COMPRESSIBLE_SUFFIXES or not path.exists():
+        return []
+    data = path.read_bytes()
+    created = []
+    candidates = [("gzip", ".gz", lambda raw: gzip.compress(raw, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        candidates.insert(0, ("br", ".br", lambda raw: brotli.compress(raw, quality=9)))
+
+    for encoding, suffix, compress in candidates:
+        variant = path.with_name(path.name + suffix)
+        compressed = compress(data)
+        if len(compressed) > len(data) * MIN_COMPRESSION_GAIN:
+            if variant.exists():
+                variant.unlink()
+            continue
+        temp_path = variant.with_name(variant.name + ".tmp")
+        temp_path.write_bytes(compressed)
+        # 元ファイルと同じ更新時刻にして、元が更新されたら古い圧縮版を使わないようにする
+        shutil.copystat(path, temp_path)
+        temp_path.replace(variant)
+        created.append(encoding)
+    return created
+
+
+def accepted_encodings(accept_encoding: str) -> List[str]:
+    """Accept-Encodingヘッダーから受け入れ可能なエンコーディングを取り出す"""
+    accepted = []
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.append(token)
+    return accepted
+
+
+class AssetStaticFiles(StaticFiles):
+    """召喚獣アセット用の StaticFiles"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # パス -> (更新時刻, サイズ, 内容のハッシュ)
+        self._hashes: Dict[str, Tuple[int, int, str]] = {}
+        self._hash_lock = threading.Lock()
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        # 304の判定は独自のETagを付けた後に get_response で行う
+        return FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await super().get_response(path, scope)
+        if not isinstance(response, FileResponse) or response.status_code != 200:
+            return response
+
+        request_headers = Headers(scope=scope)
+        full_path = Path(response.path)
+        stat_result = response.stat_result or await anyio.to_thread.run_sync(os.stat, full_path)
+        content_hash = await anyio.to_thread.run_sync(self._content_hash, full_path, stat_result)
+
+        cache_control = REVALIDATE_CACHE_CONTROL
+        if full_path.suffix in IMMUTABLE_SUFFIXES and self._is_completed(path):
+            cache_control = IMMUTABLE_CACHE_CONTROL
+
+        # 事前圧縮版を選ぶ（Rangeリクエストは元のファイルで応答する）
+        served_path, served_stat, encoding = full_path, stat_result, None
+        if full_path.suffix in COMPRESSIBLE_SUFFIXES and "range" not in request_headers:
+            variant = await anyio.to_thread.run_sync(
+                self._select_variant, full_path, stat_result, request_headers.get("accept-encoding", "")
+            )
+            if variant is not None:
+                encoding, served_path, served_stat = variant
+
+        headers = {
+            "etag": f'"{content_hash}-{encoding}"' if encoding else f'"{content_hash}"',
+            "cache-control": cache_control,
+            "accept-ranges": "bytes"
+        }
+        if full_path.suffix in COMPRESSIBLE_SUFFIXES:
+            headers["vary"] = "Accept-Encoding"
+        if encoding:
+            headers["content-encoding"] = encoding
+
+        file_response = FileResponse(
+            served_path,
+            stat_result=served_stat,
+            headers=headers,
+            media_type=response.media_type
+        )
+        if served_stat.st_size >= LARGE_FILE_SIZE:
+            file_response.chunk_size = LARGE_FILE_CHUNK_SIZE
+        if self.is_not_modified(file_response.headers, request_headers):
+            return NotModifiedResponse(file_response.headers)
+        return file_response
+
+    def _content_hash(self, full_path: Path, stat_result: os.stat_result) -> str:
+        key = str(full_path)
+        with self._hash_lock:
+            cached = self._hashes.get(key)
+        if cached is not None and cached[:2] == (stat_result.st_mtime_ns, stat_result.st_size):
+            return cached[2]
+
+        digest = hashlib.blake2b(digest_size=16)
+        with open(full_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(LARGE_FILE_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        content_hash = digest.hexdigest()
+        with self._hash_lock:
+            self._hashes[key] = (stat_result.st_mtime_ns, stat_result.st_size, content_hash)
+        return content_hash
+
+    @staticmethod
+    def _select_variant(full_path: Path, stat_result: os.stat_result,
+                        accept_encoding: str) -> Optional[Tuple[str, Path, os.stat_result]]:
+        accepted = accepted_encodings(accept_encoding)
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            variant = full_path.with_name(full_path.name + suffix)
+            try:
+                variant_stat = variant.stat()
+            except OSError:
+                continue
+            if variant_stat.st_mtime_ns == stat_result.st_mtime_ns:
+                return encoding, variant, variant_stat
+        return None
+
+    @staticmethod
+    def _is_completed(path: str) -> bool:
+        from ..api.models import SummonStatus
+        from .summon_catalog import summon_catalog
+
+        summon_id = path.replace("\\", "/").split("/", 1)[0]
+        record = summon_catalog.get(summon_id)
+        return record is not None and record.status == SummonStatus.COMPLETED
@@ -0,0 +1,273 @@
+"""攻撃結果キャッシュ
+
+同じ召喚獣の組み合わせが同じ攻撃呪文を使った場合に、Claudeへ再送せず
+過去の攻撃結果（AttackResultData相当）を返すためのLRU+TTLキャッシュ。
+
+ヒット方針（config/app_config.json の attack_cache.policy）:
+- always:        キャッシュがあれば常に使う
+- probabilistic: variety の確率でClaudeに再送し、結果をバリエーションとして追加する
+- never:         キャッシュを使わない
+"""
+
+import hashlib
+import json
+import random
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..core.config import settings
+
+
+POLICY_ALWAYS = "always"
+POLICY_PROBABILISTIC = "probabilistic"
+POLICY_NEVER = "never"
+
+
+def normalize_prompt(prompt: str) -> str:
+    """攻撃呪文を正規化する（全角半角・大文字小文字・空白の違いを無視）"""
+    text = unicodedata.normalize("NFKC", prompt).casefold()
+    return " ".join(text.split()).strip("!?！？。、.,")
+
+
+def creature_identity(creature: Any) -> List[Any]:
+    """キャッシュキーに使う召喚獣の属性
+
+    HPはバトル中に減っていくため含めない（同じ召喚獣同士なら同じキーになる）。
+    """
+    return [creature.name, creature.specialMove, creature.description]
+
+
+class _CacheEntry:
+    """キャッシュエントリ（同じキーに対する攻撃結果のバリエーション）"""
+
+    __slots__ = ("variants", "created_at", "hits")
+
+    def __init__(self, variants: List[Dict[str, Any]], created_at: float, hits: int = 0):
+        self.variants = variants
+        self.created_at = created_at
+        self.hits = hits
+
+
+class AttackCache:
+    """攻撃結果のLRU+TTLキャッシュ
+
+    バトルの攻撃はClaudeの応答を非同期にMCP結果として受け取るため、
+    キャッシュミス時は相関IDとキャッシュキーを対応付けておき、
+    その相関IDの攻撃結果が保存された時点でキャッシュに登録する。
+    """
+
+    def __init__(self, policy: str = POLICY_ALWAYS, ttl: float = 3600, max_entries: int = 2000,
+                 variety: float = 0.2, max_variants: int = 3, persist_path: Optional[Path] = None,
+                 legacy_path: Optional[Path] = None):
+        self.policy = policy
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.variety = variety
+        self.max_variants = max_variants
+        self.persist_path = persist_path
+        self.legacy_path = legacy_path  # 以前の保存先（見つかれば persist_path へ移す）
+
+        # 永続化のため作成時刻は壁時計時刻で持つ
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._pending: "OrderedDict[str, tuple]" = OrderedDict()  # 相関ID -> (キー, 登録時刻)
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._bypassed = 0
+        self._stored = 0
+        self._evicted = 0
+        self._expired = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.policy != POLICY_NEVER
+
+    @staticmethod
+    def make_key(attack_prompt: str, attacker: Any, defender: Any) -> str:
+        """召喚獣の組み合わせと正規化した攻撃呪文からキーを作成"""
+        material = json.dumps(
+            [creature_identity(attacker), creature_identity(defender), normalize_prompt(attack_prompt)],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    # ------------------------------------------------------------------
+    # 参照・登録
+    # ------------------------------------------------------------------
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """キャッシュから攻撃結果を取得する（方針によりミス扱いにすることがある）"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._get_entry(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            if (self.policy == POLICY_PROBABILISTIC and len(entry.variants) < self.max_variants
+                    and random.random() < self.variety):
+                # バリエーションを増やすためClaudeに再送させる
+                self._bypassed += 1
+                return None
+            entry.hits += 1
+            self._hits += 1
+            self._entries.move_to_end(key)
+            return dict(random.choice(entry.variants))
+
+    def expect(self, correlation_id: str, key: str):
+        """相関IDの攻撃結果が届いたらキーに登録するよう予約する"""
+        if not self.enabled or not correlation_id:
+            return
+        with self._lock:
+            self._pending[correlation_id] = (key, time.time())
+            self._pending.move_to_end(correlation_id)
+            # 結果が届かなかった予約は件数上限・TTLで破棄
+            deadline = time.time() - self.ttl
+            while self._pending and (len(self._pending) > self.max_entries
+                                     or next(iter(self._pending.values()))[1] < deadline):
+                self._pending.popitem(last=False)
+
+    def record_result(self, correlation_id: Optional[str], result: Dict[str, Any]) -> bool:
+        """MCP結果として届いた攻撃結果を予約済みのキーに登録する"""
+        if not correlation_id or not self.enabled:
+            return False
+        with self._lock:
+            pending = self._pending.pop(correlation_id, None)
+            if pending is None:
+                return False
+            self._store(pending[0], self._attack_fields(result))
+            return True
+
+    def put(self, key: str, result: Dict[str, Any]):
+        """攻撃結果を直接登録する"""
+        with self._lock:
+            self._store(key, self._attack_fields(result))
+
+    def clear(self):
+        """キャッシュを空にする"""
+        with self._lock:
+            self._entries.clear()
+            self._pending.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """ヒット率などの統計を返す"""
+        with self._lock:
+            lookups = self._hits + self._misses + self._bypassed
+            return {
+                "policy": self.policy,
+                "entries": len(self._entries),
+                "variants": sum(len(entry.variants) for entry in self._entries.values()),
+                "pending": len(self._pending),
+                "hits": self._hits,
+                "misses": self._misses,
+                "bypassed": self._bypassed,
+                "stored": self._stored,
+                "evicted": self._evicted,
+                "expired": self._expired,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0
+            }
+
+    # ------------------------------------------------------------------
+    # 永続化
+    # ------------------------------------------------------------------
+    def load(self) -> int:
+        """永続化ファイルからキャッシュを読み込む"""
+        if self.persist_path is None:
+            return 0
+        self._migrate()
+        if not self.persist_path.exists():
+            return 0
+        try:
+            with open(self.persist_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"攻撃キャッシュ読み込みエラー: {e}")
+            return 0
+
+        deadline = time.time() - self.ttl
+        with self._lock:
+            for item in data.get("entries", []):
+                if item["created_at"] < deadline:
+                    continue
+                self._entries[item["key"]] = _CacheEntry(item["variants"], item["created_at"], item.get("hits", 0))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return len(self._entries)
+
+    def save(self):
+        """キャッシュを永続化ファイルへ書き出す"""
+        if self.persist_path is None:
+            return
+        with self._lock:
+            entries = [
+                {"key": key, "variants": entry.variants, "created_at": entry.created_at, "hits": entry.hits}
+                for key, entry in self._entries.items()
+            ]
+        try:
+            self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.persist_path.with_suffix(".tmp")
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({"entries": entries}, f, ensure_ascii=False)
+            temp_path.replace(self.persist_path)
+        except Exception as e:
+            print(f"攻撃キャッシュ保存エラー: {e}")
+
+    def _migrate(self):
+        """以前の保存先（公開される assets/ の下）にあるキャッシュを persist_path へ移す"""
+        if self.legacy_path is None or not self.legacy_path.exists() or self.persist_path.exists():
+            return
+        try:
+            self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+            self.legacy_path.replace(self.persist_path)
+            print(f"攻撃キャッシュを移動しました: {self.legacy_path} -> {self.persist_path}")
+        except Exception as e:
+            print(f"攻撃キャッシュ移動エラー: {e}")
+
+    # ------------------------------------------------------------------
+    # 内部処理（ロック取得済みで呼び出す）
+    # ------------------------------------------------------------------
+    def _get_entry(self, key: str) -> Optional[_CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is not None and time.time() - entry.created_at > self.ttl:
+            del self._entries[key]
+            self._expired += 1
+            return None
+        return entry
+
+    def _store(self, key: str, result: Dict[str, Any]):
+        entry = self._get_entry(key)
+        if entry is None:
+            self._entries[key] = _CacheEntry([result], time.time())
+        else:
+            entry.variants.append(result)
+            del entry.variants[:-self.max_variants]
+            self._entries.move_to_end(key)
+        self._stored += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evicted += 1
+
+    @staticmethod
+    def _attack_fields(result: Dict[str, Any]) -> Dict[str, Any]:
+        """相関IDなど攻撃ごとの値を除いた攻撃結果"""
+        return {
+            "comment": result["comment"],
+            "attacker": result["attacker"],
+            "defender": result["defender"]
+        }
+
+
+# グローバルインスタンス
+attack_cache = AttackCache(
+    policy=settings.ATTACK_CACHE_POLICY,
+    ttl=settings.ATTACK_CACHE_TTL,
+    max_entries=settings.ATTACK_CACHE_MAX_ENTRIES,
+    variety=settings.ATTACK_CACHE_VARIETY,
+    max_variants=settings.ATTACK_CACHE_MAX_VARIANTS,
+    persist_path=settings.ATTACK_CACHE_PATH if settings.ATTACK_CACHE_PERSIST else None,
+    legacy_path=settings.ASSETS_DIR / "attack_cache.json"
+)
@@ -1,28 +1,41 @@
 """バトル処理コントローラー"""
 
-import asyncio
-from typing import Optional
+import uuid
+from typing import Any, Dict, Optional
 
-from ..api.models import CreatureStats, AttackResultData, AttackParticipant
-from .claude_desktop_client import ClaudeDesktopClient
-from ..core.constants import Timing, PromptTemplates, Defaults
+from pydantic import ValidationError
+
+from ..api.models import CreatureStats, AttackResultData, AttackParticipant, AttackResponse
+from .attack_cache import attack_cache
+from .dispatch_backends import DispatchBackend, DispatchJob, get_dispatch_backend
+from .job_scheduler import job_scheduler
+from .mcp_manager import mcp_manager
+from ..core.config import settings
+from ..core.constants import PromptTemplates, Defaults
+from ..core.exceptions import SchedulerBusyError
 
 
 class BattleController:
     """バトル処理を行うコントローラー"""
     
-    def __init__(self):
-        self.desktop_client = ClaudeDesktopClient()
+    def __init__(self, backend: Optional[DispatchBackend] = None):
+        self.backend = backend or get_dispatch_backend()
+        
+    async def process_attack(self, attack_prompt: str, me: CreatureStats, enemy: CreatureStats, correlation_id: str,
+                             wait: bool = True, affinity: Optional[str] = None) -> Optional[AttackResponse]:
+        """攻撃を処理する
         
-    async def process_attack(self, attack_prompt: str, me: CreatureStats, enemy: CreatureStats) -> Optional[AttackResultData]:
-        """攻撃を処理する"""
+        wait が有効なら送信後に相関IDのMCP結果を待ち（最大 ATTACK_RESULT_TIMEOUT 秒）、
+        実際の結果をそのまま返す。無効な場合や期限までに届かなかった場合は仮の結果を
+        pending として返し、呼び出し元は相関IDでMCP結果を受け取る。
+        affinity は同じ送信先へ送る攻撃のまとまり（省略時は召喚獣の組み合わせ）。
+        """
         try:
-            position = self.desktop_client.load_claude_position()
-            if not position:
-                print("Claude Desktopの座標が設定されていません")
-                return None
-            
-            x, y = position
+            # 同じ組み合わせ・同じ呪文の結果があればClaudeに送らずに返す
+            cache_key = attack_cache.make_key(attack_prompt, me, enemy)
+            cached = attack_cache.lookup(cache_key)
+            if cached is not None:
+                return self._resolve_from_cache(cached, correlation_id, deliver=not wait)
             
             # 攻撃処理のプロンプトを作成
             claude_prompt = PromptTemplates.ATTACK_TEMPLATE.format(
@@ -32,23 +45,98 @@ class BattleController:
                 defender_name=enemy.name,
                 defender_hp=enemy.hp,
                 defender_special=enemy.specialMove,
-                attack_prompt=attack_prompt
+                attack_prompt=attack_prompt,
+                correlation_id=correlation_id
             )
             
-            # Claude Desktopにメッセージを送信
-            self.desktop_client.send_to_claude_desktop(claude_prompt, x, y)
+            # 設定されたバックエンド（Claude Desktopなど）にプロンプトを送信
+            # 結果がMCP経由で届いたらキャッシュに登録する
+            # （送信と応答待ちはジョブスケジューラーで、待機中の召喚より優先して実行する）
+            attack_cache.expect(correlation_id, cache_key)
+            timeout = settings.ATTACK_RESULT_TIMEOUT if wait else None
+            affinity = affinity or self.battle_affinity(me, enemy)
+            # ジョブIDはサーバーで発行する（相関IDはクライアントが指定でき、再送で重複するためMCP結果の照合にだけ使う）
+            mcp_result = await job_scheduler.run(
+                f"attack-{uuid.uuid4()}",
+                "attack",
+                lambda: self._dispatch_attack(
+                    claude_prompt, attack_prompt, correlation_id, affinity, timeout
+                )
+            )
             
-            # レスポンス待機（実際の実装では、Claude Desktopからの出力を監視）
-            await asyncio.sleep(Timing.ATTACK_RESPONSE_WAIT)
+            if mcp_result is not None:
+                return self._to_response(mcp_result, attack_prompt, correlation_id)
             
-            # 仮の結果を返す（実際の実装では、Claude Desktopの出力を解析）
-            return AttackResultData(
-                comment=f"「{attack_prompt}」{Defaults.DEFAULT_ATTACK_COMMENT}",
-                attacker=AttackParticipant(damage=0),  # 攻撃者はダメージなし
-                defender=AttackParticipant(damage=-Defaults.DEFAULT_DAMAGE)  # 防御者にダメージ
+            # 仮の結果を返す（実際の結果は相関IDでMCP結果として受け取る）
+            return AttackResponse(
+                result=self._placeholder(attack_prompt, correlation_id),
+                correlationId=correlation_id,
+                pending=True
             )
             
+        except SchedulerBusyError:
+            # キューが満杯の場合は呼び出し元で429を返す
+            raise
         except Exception as e:
             print(f"攻撃処理エラー: {e}")
             return None
     
+    async def _dispatch_attack(self, claude_prompt: str, attack_prompt: str, correlation_id: str, affinity: str,
+                               timeout: Optional[float]) -> Optional[Dict[str, Any]]:
+        """攻撃プロンプトを送信し、応答を待つ（timeout が None なら送信後すぐに None を返す）"""
+        job = DispatchJob(
+            DispatchJob.ATTACK,
+            claude_prompt,
+            correlation_id=correlation_id,
+            context={"attack_prompt": attack_prompt, "affinity": affinity}
+        )
+        await self.backend.dispatch(job)
+        
+        try:
+            if timeout is None:
+                # 結果は相関IDでMCP結果として届くため、貼り付けが終われば送信先を解放する
+                return None
+            # 相関IDのMCP結果が届くまで待つ（届くまで送信先を確保しておく）
+            return await mcp_manager.wait_for_result(correlation_id, timeout)
+        finally:
+            await self.backend.release(job)
+    
+    @staticmethod
+    def battle_affinity(me: CreatureStats, enemy: CreatureStats) -> str:
+        """同じバトル（同じ召喚獣の組み合わせ）の攻撃を同じ送信先へ送るためのキー"""
+        return "battle:" + "|".join(sorted([me.name, enemy.name]))
+    
+    def _resolve_from_cache(self, cached: dict, correlation_id: str, deliver: bool = True) -> AttackResponse:
+        """キャッシュした結果をそのまま返す（deliver: MCP結果としても配信する）"""
+        result = {**cached, "result_type": "attack", "correlation_id": correlation_id}
+        if deliver:
+            # フロントエンドは相関IDでMCP結果を待つため、即座に受け取れるよう保存する
+            mcp_manager.save_result(mcp_manager.generate_execution_id(), result, correlation_id)
+        return AttackResponse(
+            result=AttackResultData(
+                comment=cached["comment"],
+                attacker=AttackParticipant(**cached["attacker"]),
+                defender=AttackParticipant(**cached["defender"]),
+                correlation_id=correlation_id
+            ),
+            correlationId=correlation_id
+        )
+    
+    def _to_response(self, mcp_result: Dict[str, Any], attack_prompt: str, correlation_id: str) -> AttackResponse:
+        """受け取ったMCP結果をレスポンスにする（攻撃結果の形式でなければ仮の結果を添える）"""
+        data = mcp_result.get("data")
+        try:
+            result = AttackResultData(**{**data, "correlation_id": correlation_id})
+        except (TypeError, ValidationError):
+            result = self._placeholder(attack_prompt, correlation_id)
+        return AttackResponse(result=result, correlationId=correlation_id, mcpResult=mcp_result)
+    
+    @staticmethod
+    def _placeholder(attack_prompt: str, correlation_id: str) -> AttackResultData:
+        """仮の攻撃結果"""
+        return AttackResultData(
+            comment=f"「{attack_prompt}」{Defaults.DEFAULT_ATTACK_COMMENT}",
+            attacker=AttackParticipant(damage=0),  # 攻撃者はダメージなし
+            defender=AttackParticipant(damage=-Defaults.DEFAULT_DAMAGE),  # 防御者にダメージ
+            correlation_id=correlation_id
+        )
@@ -0,0 +1,437 @@
+"""バトルのイベントログ（追記専用・NDJSON・セグメント分割）
+
+バトルの作成・攻撃・攻撃結果の適用・MCP結果の受信などを1行1イベントのJSON（NDJSON）で
+event_log.dir に追記する。ファイルは segment_bytes ごとに新しいセグメントへ切り替え、
+max_segments を超えたら古いセグメントから削除する（0なら削除しない）。
+
+- イベントには通し番号（seq）を付ける。セグメントのファイル名は先頭のイベントの seq
+- 書き込みは専用スレッドが受け持ち、キューに溜まった分をまとめて1回で書き出す
+  （append はファイルに触れないため、イベントループやGUIスレッドから呼び出してよい）
+- 購読者（バトルごとのイベントのストリーミング）には追記と同時に配信する
+- バトルごとにイベントを含むセグメントを索引に持ち、バトルのイベントはそのセグメントだけを読む。
+  閉じたセグメントの索引は events-*.index.json に書き出し、起動時は書き込み中のセグメントだけを走査する
+"""
+
+import asyncio
+import json
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ..core.config import settings
+
+try:
+    import orjson
+except ImportError:  # orjsonは任意
+    orjson = None
+
+SEGMENT_PREFIX = "events-"
+SEGMENT_SUFFIX = ".ndjson"
+INDEX_SUFFIX = ".index.json"
+# 一括エクスポートで読み込む単位
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+# イベントの種類
+BATTLE_CREATED = "battle_created"
+BATTLE_DELETED = "battle_deleted"
+ATTACK_REQUESTED = "attack_requested"
+ATTACK_APPLIED = "attack_applied"
+MCP_RESULT = "mcp_result"
+
+
+def encode_event(event: Dict[str, Any]) -> bytes:
+    """イベントを1行のJSON（改行付き）にエンコードする"""
+    if orjson is not None:
+        return orjson.dumps(event, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS)
+    return (json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def segment_name(first_seq: int) -> str:
+    return f"{SEGMENT_PREFIX}{first_seq:012d}{SEGMENT_SUFFIX}"
+
+
+def list_segments(directory: Path) -> List[Tuple[int, Path]]:
+    """セグメントの一覧（先頭のseq, パス）を古い順に返す"""
+    if not directory.exists():
+        return []
+    segments = []
+    for path in directory.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"):
+        try:
+            segments.append((int(path.name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]), path))
+        except ValueError:
+            continue
+    return sorted(segments)
+
+
+def index_path(segment_path: Path) -> Path:
+    """セグメントの索引ファイル（バトルID -> [最初のseq, 最後のseq]）のパス"""
+    return segment_path.with_name(segment_path.name[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX)
+
+
+def scan_battles(segment_path: Path) -> Dict[str, List[int]]:
+    """セグメントを走査してバトルごとの seq の範囲を求める（索引ファイルがない場合）"""
+    battles: Dict[str, List[int]] = {}
+    with open(segment_path, 'rb') as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if event.get("battle_id") is not None:
+                battles.setdefault(event["battle_id"], [event["seq"], event["seq"]])[1] = event["seq"]
+    return battles
+
+
+def read_events(directory: Path, battle_id: Optional[str] = None, from_seq: int = 0,
+                to_seq: Optional[int] = None,
+                segments: Optional[List[Tuple[int, Path]]] = None) -> Iterator[Dict[str, Any]]:
+    """セグメントからイベントを1件ずつ読み込む（ブロッキング。segments を省略するとすべてのセグメント）"""
+    if segments is None:
+        segments = list_segments(directory)
+    for index, (first_seq, path) in enumerate(segments):
+        # 次のセグメントが from_seq 以前から始まるなら、このセグメントに対象のイベントはない
+        if index + 1 < len(segments) and segments[index + 1][0] <= from_seq:
+            continue
+        if to_seq is not None and first_seq > to_seq:
+            break
+        try:
+            with open(path, 'rb') as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        # 書き込み途中で終了した最後の行は読み飛ばす
+                        continue
+                    if event["seq"] < from_seq or (battle_id is not None and event.get("battle_id") != battle_id):
+                        continue
+                    if to_seq is not None and event["seq"] > to_seq:
+                        return
+                    yield event
+        except FileNotFoundError:
+            # 読み込み中に古いセグメントが削除された
+            continue
+
+
+def export_segments(directory: Path, from_seq: int = 0) -> Iterator[bytes]:
+    """セグメントの内容を一定の大きさずつ返す（全体をメモリに読み込まない。ブロッキング）"""
+    segments = list_segments(directory)
+    for index, (first_seq, path) in enumerate(segments):
+        if index + 1 < len(segments) and segments[index + 1][0] <= from_seq:
+            continue
+        try:
+            with open(path, 'rb') as f:
+                if first_seq < from_seq:
+                    # 境界のセグメントだけは行ごとに絞り込む
+                    for line in f:
+                        try:
+                            if json.loads(line)["seq"] >= from_seq:
+                                yield line
+                        except ValueError:
+                            continue
+                    continue
+                while True:
+                    chunk = f.read(EXPORT_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+        except FileNotFoundError:
+            continue
+
+
+class BattleEventLog:
+    """追記専用のイベントログ"""
+
+    def __init__(self, directory: Path, segment_bytes: int = 8 * 1024 * 1024, max_segments: int = 0,
+                 batch_size: int = 256, enabled: bool = True):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self.batch_size = batch_size
+        self.enabled = enabled
+
+        self._queue: "queue.Queue[Optional[Any]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._writer: Optional[threading.Thread] = None
+        self._subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue, Optional[str]]] = []
+        self._seq: Optional[int] = None
+        self._file = None
+        self._segment_size = 0
+        self._segment_seq = 0  # 書き込み中のセグメントの先頭のseq
+
+        # バトルID -> イベントを含むセグメント（先頭のseq）の一覧。書き込み中のセグメント分は
+        # バトルID -> [最初のseq, 最後のseq] も持ち、切り替え時に索引ファイルへ書き出す
+        self._index: Optional[Dict[str, List[int]]] = None
+        self._segment_battles: Dict[str, List[int]] = {}
+        self._index_lock = threading.Lock()
+
+        self._written = 0
+        self._batches = 0
+        self._rotations = 0
+
+    def append(self, event_type: str, battle_id: Optional[str] = None, **data: Any) -> Optional[Dict[str, Any]]:
+        """イベントを追記する（書き込みは専用スレッドで行う）"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            if self._seq is None:
+                self._seq = self._last_seq()
+            self._seq += 1
+            event = {"seq": self._seq, "ts": time.time(), "type": event_type, "battle_id": battle_id, **data}
+            self._ensure_writer()
+            self._queue.put(event)
+        self._publish(event)
+        return event
+
+    @property
+    def last_seq(self) -> int:
+        """最後に追記したイベントの seq"""
+        with self._lock:
+            if self._seq is None:
+                self._seq = self._last_seq()
+            return self._seq
+
+    def flush(self, timeout: float = 5.0):
+        """キューに溜まったイベントが書き出されるまで待つ"""
+        if self._writer is None:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self):
+        """書き出しを終えてファイルを閉じる（終了時に呼び出す）"""
+        self.flush()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    # ------------------------------------------------------------------
+    # 購読（バトルごとのイベントのストリーミング）
+    # ------------------------------------------------------------------
+    def subscribe(self, battle_id: Optional[str] = None) -> asyncio.Queue:
+        """追記されたイベントの配信を購読する（battle_id を省略するとすべてのイベント）"""
+        events: asyncio.Queue = asyncio.Queue()
+        self._subscribers.append((asyncio.get_running_loop(), events, battle_id))
+        return events
+
+    def unsubscribe(self, events: asyncio.Queue):
+        self._subscribers = [entry for entry in self._subscribers if entry[1] is not events]
+
+    def read(self, battle_id: Optional[str] = None, from_seq: int = 0,
+             to_seq: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """書き出し済みのイベントを読み込む（ブロッキング。バトルを指定すると索引のセグメントだけを読む）"""
+        if battle_id is None:
+            return read_events(self.directory, None, from_seq, to_seq)
+        with self._index_lock:
+            self._ensure_index()
+            segment_seqs = set(self._index.get(battle_id, ()))
+        segments = [(first_seq, path) for first_seq, path in list_segments(self.directory) if first_seq in segment_seqs]
+        return read_events(self.directory, battle_id, from_seq, to_seq, segments)
+
+    def export(self, from_seq: int = 0) -> Iterator[bytes]:
+        """書き出し済みのセグメントをそのまま返す（ブロッキング）"""
+        return export_segments(self.directory, from_seq)
+
+    def stats(self) -> Dict[str, Any]:
+        segments = list_segments(self.directory)
+        return {
+            "enabled": self.enabled,
+            "last_seq": self._seq,
+            "queued": self._queue.qsize(),
+            "written": self._written,
+            "batches": self._batches,
+            "rotations": self._rotations,
+            "segments": len(segments),
+            "indexed_battles": len(self._index) if self._index is not None else None,
+            "bytes": sum(path.stat().st_size for _, path in segments if path.exists())
+        }
+
+    def _publish(self, event: Dict[str, Any]):
+        try:
+            current_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            current_loop = None
+        for loop, events, battle_id in list(self._subscribers):
+            if battle_id is not None and event["battle_id"] != battle_id:
+                continue
+            try:
+                if loop is current_loop:
+                    events.put_nowait(event)
+                else:
+                    loop.call_soon_threadsafe(events.put_nowait, event)
+            except RuntimeError:
+                # イベントループが終了している購読者は破棄
+                self.unsubscribe(events)
+
+    # ------------------------------------------------------------------
+    # 書き込み（専用スレッドでまとめて書き出す）
+    # ------------------------------------------------------------------
+    def _ensure_writer(self):
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, name="battle-event-writer", daemon=True)
+            self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            events = [item for item in batch if isinstance(item, dict)]
+            if events:
+                try:
+                    self._write(events)
+                except OSError as e:
+                    print(f"イベントログ書き込みエラー: {e}")
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    def _write(self, events: List[Dict[str, Any]]):
+        """イベントをまとめて書き出す（セグメントが上限を超えたら次のセグメントへ）"""
+        data = bytearray()
+        first_seq = events[0]["seq"]
+        for event in events:
+            line = encode_event(event)
+            if self._file is None or self._segment_size + len(data) + len(line) > self.segment_bytes:
+                if data:
+                    self._file.write(data)
+                    self._segment_size += len(data)
+                    data = bytearray()
+                self._rotate(first_seq if self._file is None else event["seq"])
+            data += line
+            if event["battle_id"] is not None:
+                self._note(event["battle_id"], event["seq"])
+        self._file.write(data)
+        self._file.flush()
+        self._segment_size += len(data)
+        self._written += len(events)
+        self._batches += 1
+
+    def _rotate(self, first_seq: int):
+        """新しいセグメントを開き、古いセグメントを削除する"""
+        with self._index_lock:
+            self._ensure_index()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._write_index(self.directory / segment_name(self._segment_seq))
+                self._rotations += 1
+            self.directory.mkdir(parents=True, exist_ok=True)
+            segments = list_segments(self.directory)
+            if self._file is None and segments and segments[-1][1].stat().st_size < self.segment_bytes:
+                # 起動直後は前回のセグメントに続けて追記する（索引は読み込み時に走査済み）
+                self._segment_seq, path = segments[-1]
+            else:
+                if self._file is None and segments:
+                    # 前回書き込み中だったセグメントは満杯なので、走査済みの索引を書き出して閉じる
+                    self._write_index(segments[-1][1])
+                path = self.directory / segment_name(first_seq)
+                segments.append((first_seq, path))
+                self._segment_seq = first_seq
+                with self._index_lock:
+                    self._segment_battles = {}
+            self._file = open(path, 'ab')
+            self._segment_size = path.stat().st_size
+            if self.max_segments > 0:
+                for old_seq, old_path in segments[:-self.max_segments]:
+                    try:
+                        old_path.unlink()
+                        index_path(old_path).unlink()
+                    except OSError:
+                        pass
+                    self._forget_segment(old_seq)
+
+    # ------------------------------------------------------------------
+    # 索引（バトルID -> セグメント）
+    # ------------------------------------------------------------------
+    def _ensure_index(self):
+        """索引を読み込む（_index_lock 取得済みで呼び出す）
+
+        閉じたセグメントは索引ファイルを読み、書き込み中（最後）のセグメントと索引ファイルの
+        ないセグメントだけを走査する。
+        """
+        if self._index is not None:
+            return
+        self._index = {}
+        segments = list_segments(self.directory)
+        for position, (first_seq, path) in enumerate(segments):
+            battles = None
+            if position < len(segments) - 1:
+                try:
+                    with open(index_path(path), 'r', encoding='utf-8') as f:
+                        battles = json.load(f)
+                except (OSError, ValueError):
+                    battles = None
+            if battles is None:
+                try:
+                    battles = scan_battles(path)
+                except OSError:
+                    continue
+            for battle_id in battles:
+                self._index.setdefault(battle_id, []).append(first_seq)
+            if position == len(segments) - 1:
+                self._segment_battles = battles
+
+    def _note(self, battle_id: str, seq: int):
+        """書き出したイベントを索引に加える（書き込みスレッドから呼び出す）"""
+        with self._index_lock:
+            battle = self._segment_battles.get(battle_id)
+            if battle is None:
+                self._segment_battles[battle_id] = [seq, seq]
+                segment_seqs = self._index.setdefault(battle_id, [])
+                if not segment_seqs or segment_seqs[-1] != self._segment_seq:
+                    segment_seqs.append(self._segment_seq)
+            else:
+                battle[1] = seq
+
+    def _write_index(self, segment_path: Path):
+        """閉じたセグメントの索引ファイルを書き出す"""
+        with self._index_lock:
+            text = json.dumps(self._segment_battles)
+        try:
+            temp_path = index_path(segment_path).with_suffix(".tmp")
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            temp_path.replace(index_path(segment_path))
+        except OSError as e:
+            print(f"イベントログの索引書き込みエラー: {e}")
+
+    def _forget_segment(self, first_seq: int):
+        """削除したセグメントを索引から取り除く"""
+        with self._index_lock:
+            for battle_id in list(self._index):
+                segment_seqs = self._index[battle_id]
+                if segment_seqs and segment_seqs[0] == first_seq:
+                    segment_seqs.pop(0)
+                    if not segment_seqs:
+                        del self._index[battle_id]
+
+    def _last_seq(self) -> int:
+        """前回までに書き出した最後の seq（ロック取得済みで呼び出す）"""
+        segments = list_segments(self.directory)
+        if not segments:
+            return 0
+        last = segments[-1][0] - 1
+        with open(segments[-1][1], 'rb') as f:
+            for line in f:
+                try:
+                    last = json.loads(line)["seq"]
+                except ValueError:
+                    continue
+        return last
+
+
+# グローバルインスタンス
+battle_events = BattleEventLog(
+    settings.EVENT_LOG_DIR,
+    segment_bytes=settings.EVENT_LOG_SEGMENT_BYTES,
+    max_segments=settings.EVENT_LOG_MAX_SEGMENTS,
+    batch_size=settings.EVENT_LOG_BATCH_SIZE,
+    enabled=settings.EVENT_LOG_ENABLED
+)
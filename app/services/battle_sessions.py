@@ -0,0 +1,285 @@
+"""サーバー側のバトルセッション
+
+バトルの状態（HP・ターン・召喚獣・最後の攻撃結果）をサーバーで保持し、攻撃はバトルIDと
+攻撃呪文だけで行えるようにする。攻撃結果のダメージはサーバーで適用する。
+
+- セッションは __slots__ の小さなオブジェクトで、メモリ上の表（LRU+TTL）に置く
+- 攻撃結果は相関IDで対応付け、MCP結果として届いた時点（mcp_manager）か、攻撃APIが
+  結果を受け取った時点のどちらか早いほうで1度だけ適用する
+- 定期的にスナップショットをファイルへ書き出し、再起動後に復元する
+- 適用した攻撃結果は適用後の状態とともにイベントログ（battle_events）へ記録する
+"""
+
+import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..core.config import settings
+from .battle_events import ATTACK_APPLIED, battle_events
+
+
+class BattleSession:
+    """1つのバトルの状態（召喚獣1・2はインデックス0・1）"""
+
+    __slots__ = ("battle_id", "creatures", "summon_ids", "hp", "max_hp", "turn", "current", "winner",
+                 "pending", "last_result", "created_at", "updated_at")
+
+    def __init__(self, battle_id: str, creatures: List[Dict[str, Any]], summon_ids: List[Optional[str]]):
+        now = time.time()
+        self.battle_id = battle_id
+        self.creatures = creatures
+        self.summon_ids = summon_ids
+        self.hp = [creature["hp"] for creature in creatures]
+        self.max_hp = list(self.hp)
+        self.turn = 0  # 適用済みの攻撃の数
+        self.current = 0  # 攻撃する側
+        self.winner: Optional[int] = None
+        self.pending: Optional[str] = None  # 結果待ちの攻撃の相関ID
+        self.last_result: Optional[Dict[str, Any]] = None
+        self.created_at = now
+        self.updated_at = now
+
+    @property
+    def finished(self) -> bool:
+        return self.winner is not None
+
+    def combatants(self) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """攻撃する側・される側の召喚獣（HPは現在の値）"""
+        me, enemy = self.current, 1 - self.current
+        return ({**self.creatures[me], "hp": self.hp[me]},
+                {**self.creatures[enemy], "hp": self.hp[enemy]})
+
+    def apply(self, result: Dict[str, Any]):
+        """攻撃結果のダメージを適用し、決着していなければターンを交代する"""
+        # 形式が正しくなければ何も変更せずに例外を送出する
+        last_result = {
+            "comment": result["comment"],
+            "attacker": {"damage": int(result["attacker"]["damage"])},
+            "defender": {"damage": int(result["defender"]["damage"])},
+            "correlation_id": result.get("correlation_id")
+        }
+        me, enemy = self.current, 1 - self.current
+        self.hp[me] = max(0, self.hp[me] + last_result["attacker"]["damage"])
+        self.hp[enemy] = max(0, self.hp[enemy] + last_result["defender"]["damage"])
+        self.turn += 1
+        self.last_result = last_result
+        if self.hp[enemy] <= 0:
+            self.winner = me
+        elif self.hp[me] <= 0:
+            self.winner = enemy
+        else:
+            self.current = enemy
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BattleSession":
+        session = cls.__new__(cls)
+        for slot in cls.__slots__:
+            setattr(session, slot, data[slot])
+        return session
+
+
+class BattleSessionStore:
+    """バトルセッションの表（最後に使われてから ttl 秒で破棄、max_sessions 件を超えたら古い順に破棄）"""
+
+    def __init__(self, ttl: float = 3600, max_sessions: int = 10000, snapshot_path: Optional[Path] = None):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.snapshot_path = snapshot_path
+
+        self._sessions: "OrderedDict[str, BattleSession]" = OrderedDict()
+        self._by_correlation: Dict[str, str] = {}  # 相関ID -> バトルID
+        self._lock = threading.Lock()
+        self._dirty = False
+
+        self._created = 0
+        self._applied = 0
+        self._expired = 0
+        self._evicted = 0
+
+    def create(self, creatures: List[Dict[str, Any]], summon_ids: List[Optional[str]]) -> BattleSession:
+        """バトルを作成する"""
+        session = BattleSession(str(uuid.uuid4()), creatures, summon_ids)
+        with self._lock:
+            self._sessions[session.battle_id] = session
+            self._created += 1
+            self._dirty = True
+            while len(self._sessions) > self.max_sessions:
+                _, evicted = self._sessions.popitem(last=False)
+                self._forget(evicted)
+                self._evicted += 1
+        return session
+
+    def get(self, battle_id: str) -> Optional[BattleSession]:
+        """バトルを取得する（期限切れなら破棄してNone）"""
+        with self._lock:
+            session = self._sessions.get(battle_id)
+            if session is None:
+                return None
+            if time.time() - session.updated_at > self.ttl:
+                self._remove(session)
+                self._expired += 1
+                return None
+            session.updated_at = time.time()
+            self._sessions.move_to_end(battle_id)
+            return session
+
+    def delete(self, battle_id: str) -> bool:
+        """バトルを削除する"""
+        with self._lock:
+            session = self._sessions.get(battle_id)
+            if session is None:
+                return False
+            self._remove(session)
+            return True
+
+    def begin_attack(self, session: BattleSession, correlation_id: str):
+        """攻撃を開始する（この相関IDの結果だけを適用する。結果待ちの前の攻撃は破棄）"""
+        with self._lock:
+            if session.pending is not None:
+                self._by_correlation.pop(session.pending, None)
+            session.pending = correlation_id
+            session.updated_at = time.time()
+            self._by_correlation[correlation_id] = session.battle_id
+            self._dirty = True
+
+    def battle_for(self, correlation_id: Optional[str]) -> Optional[str]:
+        """結果待ちの攻撃の相関IDに対応するバトルID"""
+        if correlation_id is None:
+            return None
+        with self._lock:
+            return self._by_correlation.get(correlation_id)
+
+    def record_result(self, correlation_id: Optional[str], result: Dict[str, Any]) -> Optional[BattleSession]:
+        """相関IDに対応するバトルへ攻撃結果を適用する（適用済み・対象外ならNone）"""
+        if correlation_id is None:
+            return None
+        with self._lock:
+            battle_id = self._by_correlation.get(correlation_id)
+            session = self._sessions.get(battle_id) if battle_id is not None else None
+            if session is None or session.pending != correlation_id or session.finished:
+                return None
+            session.apply({**result, "correlation_id": correlation_id})
+            del self._by_correlation[correlation_id]
+            session.pending = None
+            session.updated_at = time.time()
+            self._sessions.move_to_end(battle_id)
+            self._applied += 1
+            self._dirty = True
+            event = {"correlation_id": correlation_id, "result": session.last_result, "hp": list(session.hp),
+                     "turn": session.turn, "current": session.current, "winner": session.winner}
+        battle_events.append(ATTACK_APPLIED, battle_id, **event)
+        return session
+
+    def evict_expired(self) -> int:
+        """期限切れのバトルを破棄する"""
+        deadline = time.time() - self.ttl
+        removed = 0
+        with self._lock:
+            for session in list(self._sessions.values()):
+                if session.updated_at >= deadline:
+                    # 最後に使われた順に並んでいるため、以降はすべて期限内
+                    break
+                self._remove(session)
+                removed += 1
+            self._expired += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "pending": len(self._by_correlation),
+                "created": self._created,
+                "applied": self._applied,
+                "expired": self._expired,
+                "evicted": self._evicted,
+                "ttl_seconds": self.ttl,
+                "max_sessions": self.max_sessions
+            }
+
+    async def run_maintenance(self, interval: float):
+        """定期的に期限切れのバトルを破棄し、変更があればスナップショットを保存する（キャンセルされるまで）"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.evict_expired()
+                await loop.run_in_executor(None, self.save)
+            except Exception as e:
+                print(f"バトルセッションの保守エラー: {e}")
+
+    # ------------------------------------------------------------------
+    # スナップショット
+    # ------------------------------------------------------------------
+    def load(self) -> int:
+        """スナップショットからバトルを復元する"""
+        if self.snapshot_path is None or not self.snapshot_path.exists():
+            return 0
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"バトルセッション読み込みエラー: {e}")
+            return 0
+
+        deadline = time.time() - self.ttl
+        with self._lock:
+            for item in data.get("sessions", []):
+                if item["updated_at"] < deadline:
+                    continue
+                session = BattleSession.from_dict(item)
+                self._sessions[session.battle_id] = session
+                if session.pending is not None:
+                    self._by_correlation[session.pending] = session.battle_id
+            while len(self._sessions) > self.max_sessions:
+                _, evicted = self._sessions.popitem(last=False)
+                self._forget(evicted)
+            return len(self._sessions)
+
+    def save(self):
+        """変更があればスナップショットを書き出す"""
+        if self.snapshot_path is None:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            # 書き出し中にイベントループ側で変更されないよう、ロック中に文字列にしておく
+            text = json.dumps({"sessions": [session.to_dict() for session in self._sessions.values()]},
+                              ensure_ascii=False)
+            self._dirty = False
+        try:
+            self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.snapshot_path.with_suffix(".tmp")
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            temp_path.replace(self.snapshot_path)
+        except Exception as e:
+            print(f"バトルセッション保存エラー: {e}")
+
+    # ------------------------------------------------------------------
+    # 内部処理（ロック取得済みで呼び出す）
+    # ------------------------------------------------------------------
+    def _remove(self, session: BattleSession):
+        del self._sessions[session.battle_id]
+        self._forget(session)
+        self._dirty = True
+
+    def _forget(self, session: BattleSession):
+        if session.pending is not None:
+            self._by_correlation.pop(session.pending, None)
+
+
+# グローバルインスタンス
+battle_sessions = BattleSessionStore(
+    ttl=settings.BATTLE_SESSION_TTL,
+    max_sessions=settings.BATTLE_MAX_SESSIONS,
+    snapshot_path=settings.BATTLE_SNAPSHOT_PATH
+)
@@ -2,17 +2,22 @@
 
 from typing import Optional, Dict, Any
 
-from ..api.models import CreatureStats, AttackResultData
+from ..api.models import CreatureStats, AttackResponse
+from .dispatch_backends import DispatchBackend, get_dispatch_backend
 from .summon_controller import SummonController
 from .battle_controller import BattleController
 from .mcp_controller import MCPController
 
 class ClaudeController:
-    """Claude Desktopを制御するサービス（分割されたコントローラーの統合）"""
+    """Claude Desktopを制御するサービス（分割されたコントローラーの統合）
     
-    def __init__(self):
-        self.summon_controller = SummonController()
-        self.battle_controller = BattleController()
+    アプリケーションの起動時に1度だけ作成し、APIからは依存関係として注入する（app/api/deps.py）。
+    """
+    
+    def __init__(self, backend: Optional[DispatchBackend] = None):
+        backend = backend or get_dispatch_backend()
+        self.summon_controller = SummonController(backend)
+        self.battle_controller = BattleController(backend)
         self.mcp_controller = MCPController()
     
     # 召喚関連メソッド（SummonControllerに委譲）
@@ -20,10 +25,19 @@ class ClaudeController:
         """召喚獣を生成する"""
         return await self.summon_controller.generate_summon(prompt, summon_id)
     
+    async def send_summon(self, prompt: str, summon_id: str) -> str:
+        """召喚獣生成のプロンプトを送信する（相関IDを返す）"""
+        return await self.summon_controller.send_summon(prompt, summon_id)
+    
+    async def wait_for_summon(self, summon_id: str, correlation_id: Optional[str] = None) -> bool:
+        """召喚獣のファイルが書き込まれるまで待つ"""
+        return await self.summon_controller.wait_for_summon(summon_id, correlation_id)
+    
     # バトル関連メソッド（BattleControllerに委譲）
-    async def process_attack(self, attack_prompt: str, me: CreatureStats, enemy: CreatureStats) -> Optional[AttackResultData]:
+    async def process_attack(self, attack_prompt: str, me: CreatureStats, enemy: CreatureStats, correlation_id: str,
+                             wait: bool = True, affinity: Optional[str] = None) -> Optional[AttackResponse]:
         """攻撃を処理する"""
-        return await self.battle_controller.process_attack(attack_prompt, me, enemy)
+        return await self.battle_controller.process_attack(attack_prompt, me, enemy, correlation_id, wait, affinity)
     
     
     # MCP関連メソッド（MCPControllerに委譲）
@@ -31,13 +45,13 @@ class ClaudeController:
         """Claude DesktopからのMCP結果を処理する"""
         return await self.mcp_controller.process_mcp_result(result_data)
     
-    def get_current_mcp_result(self) -> Optional[Dict[str, Any]]:
+    def get_current_mcp_result(self, correlation_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """現在キューされているMCP結果を取得する"""
-        return self.mcp_controller.get_current_mcp_result()
+        return self.mcp_controller.get_current_mcp_result(correlation_id)
     
-    def has_mcp_result(self) -> bool:
+    def has_mcp_result(self, correlation_id: Optional[str] = None) -> bool:
         """キューにMCP結果があるかチェックする"""
-        return self.mcp_controller.has_mcp_result()
+        return self.mcp_controller.has_mcp_result(correlation_id)
     
     def get_mcp_result(self, execution_id: str) -> Optional[Dict[str, Any]]:
         """特定のMCP結果を取得する"""
@@ -1,15 +1,35 @@
-"""Claude Desktop GUI自動化クライアント"""
+"""Claude Desktop GUI自動化クライアント
+
+pyautogui / pyperclip は読み込みが遅く、ディスプレイがない環境では
+インポート自体が失敗するため、最初にGUI操作を行う時点で読み込む。
+貼り付けの待ち時間は固定値ではなく、クリップボードと入力欄の読み戻しで確認しながら
+調整する（dispatch_timing.py）。
+"""
 
 import json
+import re
 import time
 from pathlib import Path
-from typing import Optional
-import pyautogui
-import pyperclip
+from typing import Any, Dict, List, Optional
 
 from ..core.config import settings
 from ..core.constants import Timing
 from ..core.exceptions import ClaudeDesktopError
+from .desktop_dispatcher import desktop_dispatcher
+from .dispatch_timing import (
+    STEP_CLICK, STEP_PASTE, copy_verified, dispatch_timing, get_clipboard
+)
+
+
+def _gui():
+    """GUI自動化モジュール（pyautogui, pyperclip）を読み込む"""
+    try:
+        import pyautogui
+        import pyperclip
+    except Exception as e:
+        # ディスプレイがない環境では pyautogui のインポート時に例外になる
+        raise ClaudeDesktopError(f"GUI自動化モジュールを読み込めません: {e}")
+    return pyautogui, pyperclip
 
 
 class ClaudeDesktopClient:
@@ -17,23 +37,56 @@ class ClaudeDesktopClient:
     
     def __init__(self):
         self.config_file = settings.CLAUDE_CONFIG_FILE
-        self.config_file.parent.mkdir(exist_ok=True)
         
-    def load_claude_position(self) -> Optional[tuple]:
-        """Claude Desktopの座標を読み込む"""
+    def load_endpoints(self) -> List[Dict[str, Any]]:
+        """登録されたClaude Desktopのエンドポイント一覧を読み込む
+        
+        設定ファイルの形式:
+        - {"x": 100, "y": 200}（従来の形式。座標1つのGUIエンドポイント "default"）
+        - {"endpoints": [{"id": "left", "type": "gui", "x": 100, "y": 200},
+                         {"id": "agent-1", "type": "agent", "url": "http://192.168.0.10:9100"}]}
+        """
         try:
-            if self.config_file.exists():
-                with open(self.config_file, 'r') as f:
-                    config = json.load(f)
-                return config["x"], config["y"]
-            return None
-        except (json.JSONDecodeError, KeyError) as e:
+            if not self.config_file.exists():
+                return []
+            with open(self.config_file, 'r') as f:
+                config = json.load(f)
+            if "endpoints" in config:
+                return [{"type": "gui", **endpoint} for endpoint in config["endpoints"]]
+            return [{"id": "default", "type": "gui", "x": config["x"], "y": config["y"]}]
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
             raise ClaudeDesktopError(f"設定ファイルの読み込みに失敗しました: {e}")
         except Exception as e:
             raise ClaudeDesktopError(f"予期しないエラーが発生しました: {e}")
     
+    def load_claude_position(self) -> Optional[tuple]:
+        """Claude Desktopの座標を読み込む（最初のGUIエンドポイント）"""
+        for endpoint in self.load_endpoints():
+            if endpoint["type"] == "gui":
+                return endpoint["x"], endpoint["y"]
+        return None
+    
+    def is_on_screen(self, x: int, y: int) -> bool:
+        """座標が画面内にあるか確認する（ブロッキング。GUIディスパッチャーのスレッドで実行する）"""
+        pyautogui, _ = _gui()
+        return pyautogui.onScreen(x, y)
+    
+    async def send(self, message: str, x: int = None, y: int = None, restore_mouse: bool = True):
+        """
+        Claude Desktopにメッセージを送信（GUIディスパッチャー経由）
+        
+        GUI操作は専用スレッドで実行されるため、イベントループをブロックしない。
+        """
+        await desktop_dispatcher.run(
+            self.send_to_claude_desktop, message, x, y, restore_mouse,
+            label="send_to_claude_desktop"
+        )
+    
     def send_to_claude_desktop(self, message: str, x: int = None, y: int = None, restore_mouse: bool = True):
-        """Claude Desktopにメッセージを送信"""
+        """Claude Desktopにメッセージを送信（ブロッキング。非同期処理からは send を使用）"""
+        pyautogui, _ = _gui()
+        pyautogui.PAUSE = dispatch_timing.gui_pause
+        
         # 現在のマウス座標を記憶
         original_position = None
         if restore_mouse:
@@ -41,24 +94,15 @@ class ClaudeDesktopClient:
             print(f"マウス座標を記憶: {original_position}")
         
         try:
-            if x is not None and y is not None:
-                pyautogui.click(x, y)
-                time.sleep(Timing.CLAUDE_CLICK_DELAY)
-            else:
-                time.sleep(Timing.CLAUDE_WAIT_DELAY)
-            
-            # クリップボードを使用して日本語テキストを送信
-            pyperclip.copy(message)
-            time.sleep(Timing.CLIPBOARD_DELAY)
-            pyautogui.hotkey('ctrl', 'v')
-            time.sleep(Timing.PASTE_DELAY)
+            # クリップボードを使用して日本語テキストを貼り付け（確認できるまで再試行）
+            self._paste(pyautogui, get_clipboard(), message, x, y, dispatch_timing.verify_paste)
             
             # Enterキーを押して送信
             pyautogui.press('enter')
             
             # Enterキー押下後に元の座標に戻す
             if restore_mouse and original_position:
-                time.sleep(0.2)  # 送信完了を待つ
+                time.sleep(Timing.MOUSE_RESTORE_DELAY)  # 送信完了を待つ
                 pyautogui.moveTo(original_position.x, original_position.y)
                 print(f"マウス座標を元に戻しました: {original_position}")
             
@@ -69,6 +113,116 @@ class ClaudeDesktopClient:
                 print(f"エラー時にマウス座標を復元: {original_position}")
             raise ClaudeDesktopError(f"Claude Desktopへのメッセージ送信に失敗しました: {e}")
     
+    def calibrate(self, x: int, y: int, trials: int = 20, margin: float = 1.5) -> Dict[str, Any]:
+        """貼り付けの待ち時間をキャリブレーションする（ブロッキング）
+        
+        既定の待ち時間からテスト文字列の貼り付けと確認を trials 回繰り返し（送信はしない）、
+        成功するたびに待ち時間を短く、失敗したら長くする。最後に margin 倍の余裕を持たせて保存する。
+        """
+        pyautogui, _ = _gui()
+        pyautogui.PAUSE = dispatch_timing.gui_pause
+        clipboard = get_clipboard()
+        dispatch_timing.reset()
+        
+        for trial in range(1, trials + 1):
+            started = time.monotonic()
+            try:
+                self._paste(pyautogui, clipboard, f"キャリブレーション {trial}/{trials}", x, y,
+                            verify=True, adapt=True, fallback=False)
+                result = "OK"
+            except ClaudeDesktopError as e:
+                result = str(e)
+            finally:
+                # 入力欄を空に戻す
+                pyautogui.hotkey('ctrl', 'a')
+                pyautogui.press('delete')
+            delays = dispatch_timing.stats()["delays"]
+            print(f"[{trial}/{trials}] {result} ({time.monotonic() - started:.2f}秒) 待ち時間: {delays}")
+        
+        dispatch_timing.scale(margin)
+        dispatch_timing.save()
+        return dispatch_timing.stats()
+    
+    def _paste(self, pyautogui, clipboard, message: str, x: int = None, y: int = None,
+               verify: bool = True, adapt: Optional[bool] = None, fallback: bool = True):
+        """入力欄にメッセージを貼り付ける
+        
+        クリップボードは読み戻して書き込みを確認する。verify が有効なら入力欄の内容を読み戻して
+        貼り付けを確認し、失敗したら待ち時間を延ばして max_attempts 回まで再試行する。
+        それでも確認できなければ、失敗を記録したうえで従来の固定の待ち時間で貼り付ける
+        （読み戻しの失敗で送信そのものを失敗にしない。fallback=False なら例外を送出）。
+        """
+        for attempt in range(dispatch_timing.max_attempts):
+            if x is not None and y is not None:
+                pyautogui.click(x, y)
+                time.sleep(dispatch_timing.delay(STEP_CLICK))
+            else:
+                time.sleep(Timing.CLAUDE_WAIT_DELAY)
+            
+            try:
+                elapsed = copy_verified(clipboard, message, dispatch_timing.clipboard_timeout)
+            except ClaudeDesktopError as e:
+                dispatch_timing.record(False, adapt=adapt)
+                print(f"{e}（{attempt + 1}回目）")
+                continue
+            dispatch_timing.record_clipboard(elapsed)
+            if attempt > 0:
+                # 前回の貼り付けの結果を置き換える
+                pyautogui.hotkey('ctrl', 'a')
+            pyautogui.hotkey('ctrl', 'v')
+            time.sleep(dispatch_timing.delay(STEP_PASTE))
+            if not verify:
+                return
+            
+            if self._normalize(self._read_input(pyautogui, clipboard)) == self._normalize(message):
+                dispatch_timing.record(True, adapt=adapt)
+                # 全選択を解除してカーソルを末尾へ
+                pyautogui.hotkey('ctrl', 'end')
+                return
+            dispatch_timing.record(False, adapt=adapt)
+            print(f"貼り付けを確認できませんでした（{attempt + 1}回目）。待ち時間を延ばして再試行します")
+        
+        if not fallback:
+            raise ClaudeDesktopError("入力欄への貼り付けを確認できませんでした")
+        print("貼り付けを確認できなかったため、固定の待ち時間で貼り付けます")
+        self._paste_fixed(pyautogui, clipboard, message, x, y)
+    
+    def _paste_fixed(self, pyautogui, clipboard, message: str, x: int = None, y: int = None):
+        """固定の待ち時間で貼り付ける（確認は行わない）"""
+        if x is not None and y is not None:
+            pyautogui.click(x, y)
+            time.sleep(Timing.CLAUDE_CLICK_DELAY)
+        clipboard.copy(message)
+        time.sleep(Timing.CLIPBOARD_DELAY)
+        pyautogui.hotkey('ctrl', 'a')
+        pyautogui.hotkey('ctrl', 'v')
+        time.sleep(Timing.PASTE_DELAY)
+        pyautogui.hotkey('ctrl', 'end')
+    
+    def _read_input(self, pyautogui, clipboard) -> str:
+        """入力欄の内容を全選択・コピーして読み戻す（読み戻せなければ空文字列）"""
+        # コピーが行われたことを区別するため、先にクリップボードを目印の文字列にしておく
+        marker = f"__dispatch_verify_{time.monotonic()}__"
+        try:
+            copy_verified(clipboard, marker, dispatch_timing.clipboard_timeout)
+        except ClaudeDesktopError:
+            # 目印を書き込めなければ読み戻せなかったものとして扱う（確認失敗として再試行される）
+            return ""
+        pyautogui.hotkey('ctrl', 'a')
+        pyautogui.hotkey('ctrl', 'c')
+        deadline = time.monotonic() + dispatch_timing.clipboard_timeout
+        while time.monotonic() < deadline:
+            text = clipboard.paste()
+            if text != marker:
+                return text
+            time.sleep(0.01)
+        return ""
+    
+    @staticmethod
+    def _normalize(text: str) -> str:
+        """比較用に空白類を取り除く（入力欄は複数行の改行・空白を書き換えるため）"""
+        return re.sub(r"\s+", "", text)
+    
     def execute_with_mouse_restore(self, action_func, wait_for_enter: bool = False):
         """
         マウス座標を記憶し、アクション実行後に元の位置に戻す
@@ -77,6 +231,8 @@ class ClaudeDesktopClient:
             action_func: 実行する処理の関数
             wait_for_enter: Enterキー入力まで待機するかどうか
         """
+        pyautogui, _ = _gui()
+        
         # 現在のマウス座標を記憶
         original_position = pyautogui.position()
         print(f"現在のマウス座標を記憶: {original_position}")
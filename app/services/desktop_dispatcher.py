@@ -0,0 +1,127 @@
+"""GUI自動化ディスパッチャー
+
+pyautogui / pyperclip の操作は time.sleep を含むブロッキング処理のため、
+専用スレッド1本で順番に実行し、呼び出し側には await 可能な Future を返す。
+"""
+
+import asyncio
+import concurrent.futures
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class _DispatchJob:
+    """ディスパッチャーのジョブ"""
+
+    __slots__ = ("func", "args", "kwargs", "label", "future", "enqueued_at")
+
+    def __init__(self, func: Callable, args: tuple, kwargs: dict, label: str):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.label = label
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+        self.enqueued_at = time.monotonic()
+
+
+class DesktopDispatcher:
+    """GUI操作を専用スレッドで直列に実行するディスパッチャー"""
+
+    # 平均値の平滑化係数（指数移動平均）
+    EWMA_ALPHA = 0.2
+
+    def __init__(self, name: str = "desktop-dispatcher"):
+        self.name = name
+        self._queue: "queue.Queue[Optional[_DispatchJob]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self._running_label: Optional[str] = None
+        self._completed = 0
+        self._failed = 0
+        self._last_wait = 0.0
+        self._last_run = 0.0
+        self._avg_wait = 0.0
+        self._avg_run = 0.0
+
+    def submit(self, func: Callable, *args, label: str = "", **kwargs) -> concurrent.futures.Future:
+        """ジョブをキューに追加し、完了時に解決されるFutureを返す"""
+        self._ensure_started()
+        job = _DispatchJob(func, args, kwargs, label or getattr(func, "__name__", "job"))
+        self._queue.put(job)
+        return job.future
+
+    async def run(self, func: Callable, *args, label: str = "", **kwargs) -> Any:
+        """ジョブを実行し、イベントループをブロックせずに完了を待つ"""
+        return await asyncio.wrap_future(self.submit(func, *args, label=label, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        """キューの深さと処理時間の統計を返す"""
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "running": self._running_label,
+                "completed": self._completed,
+                "failed": self._failed,
+                "last_wait_ms": round(self._last_wait * 1000, 1),
+                "last_run_ms": round(self._last_run * 1000, 1),
+                "avg_wait_ms": round(self._avg_wait * 1000, 1),
+                "avg_run_ms": round(self._avg_run * 1000, 1)
+            }
+
+    def shutdown(self, timeout: float = 5.0):
+        """キュー内のジョブを処理し終えてからスレッドを停止する"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            if not job.future.set_running_or_notify_cancel():
+                continue
+
+            started_at = time.monotonic()
+            with self._lock:
+                self._running_label = job.label
+                self._last_wait = started_at - job.enqueued_at
+
+            try:
+                result = job.func(*job.args, **job.kwargs)
+                job.future.set_result(result)
+                succeeded = True
+            except BaseException as e:
+                job.future.set_exception(e)
+                succeeded = False
+
+            run_time = time.monotonic() - started_at
+            with self._lock:
+                self._running_label = None
+                self._last_run = run_time
+                if self._completed + self._failed == 0:
+                    self._avg_wait = self._last_wait
+                    self._avg_run = run_time
+                else:
+                    self._avg_wait += self.EWMA_ALPHA * (self._last_wait - self._avg_wait)
+                    self._avg_run += self.EWMA_ALPHA * (run_time - self._avg_run)
+                if succeeded:
+                    self._completed += 1
+                else:
+                    self._failed += 1
+
+
+# グローバルインスタンス（Claude Desktopへの操作はすべてこのスレッドで行う）
+desktop_dispatcher = DesktopDispatcher()
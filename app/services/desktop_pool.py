@@ -0,0 +1,348 @@
+"""Claude Desktopエンドポイントのプール
+
+config/claude_desktop_config.json に登録した複数のClaude Desktopへ、召喚・攻撃のジョブを
+振り分ける。エンドポイントは次の2種類。
+
+- gui:   このマシンの画面上の入力欄の座標（ウィンドウごとに1つ）。貼り付け操作は
+         GUIディスパッチャーで直列化されるが、生成は各ウィンドウで並行して進む
+- agent: 別のマシンで動くエージェント（ローカルネットワークのHTTP）。
+         GET {url}/health が200を返せば正常、POST {url}/dispatch に
+         {"kind", "prompt", "summon_id", "correlation_id"} を送るとそのマシンの
+         Claude Desktopへ貼り付ける。結果は従来どおりMCP（このAPI）と assets/ に届くため、
+         エージェント側は assets/ を共有している必要がある
+
+1つのエンドポイントは同時に max_jobs 件（既定1件）までのジョブを受け持ち、ジョブが
+完了するまで（release されるまで）確保される。振り分けは正常なエンドポイントのうち
+負荷の最も低いものへ行い、同じバトルの攻撃は前回と同じエンドポイントを優先する。
+ヘルスチェックに失敗したエンドポイントと、送信に続けて failure_threshold 回失敗した
+エンドポイントは異常とし、ヘルスチェックで回復するまで使わない。すべてが異常なときは定期ヘルスチェックを待たずに
+確認し直し、recovery_timeout 秒まで回復を待つ。
+"""
+
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from ..core.exceptions import ClaudeDesktopError, DispatchError
+
+
+class DesktopEndpoint(ABC):
+    """プロンプトの送信先（Claude Desktop 1つ）"""
+
+    kind = "base"
+
+    def __init__(self, endpoint_id: str, max_jobs: int = 1):
+        self.endpoint_id = endpoint_id
+        self.max_jobs = max(1, max_jobs)
+        self.in_flight = 0
+        self.healthy = True
+        self.last_error: Optional[str] = None
+        self.last_checked: Optional[float] = None
+        self.sent = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+
+    @property
+    def available(self) -> bool:
+        return self.healthy and self.in_flight < self.max_jobs
+
+    @abstractmethod
+    async def send(self, job) -> None:
+        """プロンプトを送信する"""
+
+    @abstractmethod
+    async def probe(self) -> None:
+        """ヘルスチェック（異常なら例外を送出する）"""
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "id": self.endpoint_id,
+            "type": self.kind,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "max_jobs": self.max_jobs,
+            "sent": self.sent,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error
+        }
+
+
+class GUIEndpoint(DesktopEndpoint):
+    """このマシンの画面上のClaude Desktop（入力欄の座標）"""
+
+    kind = "gui"
+
+    def __init__(self, endpoint_id: str, x: int, y: int, max_jobs: int = 1):
+        from .claude_desktop_client import ClaudeDesktopClient
+
+        super().__init__(endpoint_id, max_jobs)
+        self.x = x
+        self.y = y
+        self.client = ClaudeDesktopClient()
+
+    async def send(self, job) -> None:
+        await self.client.send(job.prompt, self.x, self.y)
+
+    async def probe(self) -> None:
+        from .desktop_dispatcher import desktop_dispatcher
+
+        if not await desktop_dispatcher.run(self.client.is_on_screen, self.x, self.y, label="health_check"):
+            raise ClaudeDesktopError(f"座標が画面外です: ({self.x}, {self.y})")
+
+    def status(self) -> Dict[str, Any]:
+        return {**super().status(), "x": self.x, "y": self.y}
+
+
+class AgentEndpoint(DesktopEndpoint):
+    """別のマシンのエージェント経由のClaude Desktop"""
+
+    kind = "agent"
+
+    def __init__(self, endpoint_id: str, url: str, max_jobs: int = 1, timeout: float = 10):
+        super().__init__(endpoint_id, max_jobs)
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    async def send(self, job) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._post, {
+            "kind": job.kind,
+            "prompt": job.prompt,
+            "summon_id": job.summon_id,
+            "correlation_id": job.correlation_id
+        })
+
+    async def probe(self) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._get_health)
+
+    def _post(self, payload: Dict[str, Any]):
+        import requests
+
+        try:
+            response = requests.post(f"{self.url}/dispatch", json=payload, timeout=self.timeout)
+            response.raise_for_status()
+        except Exception as e:
+            raise DispatchError(f"エージェントへの送信に失敗しました ({self.endpoint_id}): {e}")
+
+    def _get_health(self):
+        import requests
+
+        try:
+            response = requests.get(f"{self.url}/health", timeout=self.timeout)
+            response.raise_for_status()
+        except Exception as e:
+            raise DispatchError(f"エージェントのヘルスチェックに失敗しました ({self.endpoint_id}): {e}")
+
+    def status(self) -> Dict[str, Any]:
+        return {**super().status(), "url": self.url}
+
+
+def create_endpoint(config: Dict[str, Any], agent_timeout: float = 10) -> DesktopEndpoint:
+    """設定からエンドポイントを作成する"""
+    endpoint_type = config.get("type", "gui")
+    endpoint_id = str(config.get("id") or f"{endpoint_type}-{config.get('url') or (config.get('x'), config.get('y'))}")
+    max_jobs = config.get("max_jobs", 1)
+    if endpoint_type == GUIEndpoint.kind:
+        return GUIEndpoint(endpoint_id, config["x"], config["y"], max_jobs)
+    if endpoint_type == AgentEndpoint.kind:
+        return AgentEndpoint(endpoint_id, config["url"], max_jobs, config.get("timeout", agent_timeout))
+    raise ClaudeDesktopError(f"不明なエンドポイントの種類です: {endpoint_type}")
+
+
+class DesktopPool:
+    """エンドポイントへのジョブの振り分けとヘルスチェック"""
+
+    # すべてのエンドポイントが異常なときに回復を確認し直す間隔（秒）
+    RECOVERY_PROBE_INTERVAL = 1.0
+
+    def __init__(self, endpoints: List[DesktopEndpoint], health_interval: float = 30, sticky_size: int = 1024,
+                 failure_threshold: int = 3, recovery_timeout: float = 30):
+        self.endpoints = endpoints
+        self.health_interval = health_interval
+        self.sticky_size = sticky_size
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_timeout = recovery_timeout
+        self._leases: Dict[str, DesktopEndpoint] = {}
+        self._sticky: "OrderedDict[str, str]" = OrderedDict()
+        self._changed: Optional[asyncio.Condition] = None
+        self._checking: Optional[asyncio.Future] = None
+        # 正常なエンドポイントの数が変わったときに呼ぶ関数（スケジューラーの同時実行数の更新）
+        self.on_capacity_change: Optional[Callable[[int], None]] = None
+        self._reported_capacity = self.capacity()
+
+    def capacity(self) -> int:
+        """正常なエンドポイントが同時に受け持てるジョブ数の合計"""
+        return sum(endpoint.max_jobs for endpoint in self.endpoints if endpoint.healthy)
+
+    async def dispatch(self, job, job_key: str, affinity: Optional[str] = None) -> DesktopEndpoint:
+        """エンドポイントを確保してプロンプトを送信する（失敗したら別のエンドポイントで再試行）
+
+        確保したエンドポイントは release(job_key) まで他のジョブに使われない。
+        """
+        last_error: Optional[Exception] = None
+        tried: Set[str] = set()
+        for _ in range(max(1, len(self.endpoints))):
+            if tried and all(endpoint.endpoint_id in tried for endpoint in self.endpoints if endpoint.healthy):
+                # 正常なエンドポイントはすべて試した
+                break
+            endpoint = await self.acquire(job_key, affinity, tried)
+            try:
+                await endpoint.send(job)
+            except asyncio.CancelledError:
+                await self.release(job_key)
+                raise
+            except Exception as e:
+                print(f"Claude Desktopへの送信に失敗しました ({endpoint.endpoint_id}): {e}")
+                self._mark(endpoint, e)
+                await self.release(job_key)
+                tried.add(endpoint.endpoint_id)
+                last_error = e
+                continue
+            endpoint.sent += 1
+            endpoint.consecutive_failures = 0
+            return endpoint
+        raise ClaudeDesktopError(f"すべてのClaude Desktopへの送信に失敗しました: {last_error}")
+
+    async def acquire(self, job_key: str, affinity: Optional[str] = None,
+                      exclude: Optional[Set[str]] = None) -> DesktopEndpoint:
+        """空いているエンドポイントを確保する
+
+        すべて使用中なら空くまで待つ。すべて異常なら確認し直しながら recovery_timeout 秒まで
+        回復を待つ。exclude のIDのエンドポイントは使わない（送信に失敗したもの）。
+        """
+        if not self.endpoints:
+            raise ClaudeDesktopError("Claude Desktopの座標が設定されていません")
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.recovery_timeout
+        changed = self._condition()
+        while True:
+            while not self._has_healthy():
+                # 定期ヘルスチェックを待たずに確認し直す
+                await self._recheck()
+                if self._has_healthy():
+                    break
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise ClaudeDesktopError("利用できるClaude Desktopがありません（すべてヘルスチェックに失敗）")
+                await asyncio.sleep(min(self.RECOVERY_PROBE_INTERVAL, remaining))
+
+            async with changed:
+                endpoint = None
+                while endpoint is None and self._has_healthy():
+                    endpoint = self._choose(affinity, exclude)
+                    if endpoint is None:
+                        await changed.wait()
+                if endpoint is None:
+                    # 待っている間にすべて異常になった
+                    continue
+
+                endpoint.in_flight += 1
+                self._leases[job_key] = endpoint
+                if affinity is not None:
+                    self._sticky[affinity] = endpoint.endpoint_id
+                    self._sticky.move_to_end(affinity)
+                    while len(self._sticky) > self.sticky_size:
+                        self._sticky.popitem(last=False)
+                return endpoint
+
+    async def release(self, job_key: str):
+        """ジョブが完了したエンドポイントを解放する（送信に失敗して異常になっていれば同時実行数も更新）"""
+        endpoint = self._leases.pop(job_key, None)
+        if endpoint is None:
+            return
+        endpoint.in_flight -= 1
+        self._report_capacity()
+        await self._notify()
+
+    async def check_health(self):
+        """すべてのエンドポイントのヘルスチェックを行う"""
+        results = await asyncio.gather(*(endpoint.probe() for endpoint in self.endpoints), return_exceptions=True)
+        for endpoint, result in zip(self.endpoints, results):
+            endpoint.last_checked = time.time()
+            if isinstance(result, Exception):
+                if endpoint.healthy:
+                    print(f"Claude Desktopのヘルスチェックに失敗しました ({endpoint.endpoint_id}): {result}")
+                self._mark(endpoint, result, unhealthy=True)
+            else:
+                endpoint.consecutive_failures = 0
+                if not endpoint.healthy:
+                    print(f"Claude Desktopが回復しました: {endpoint.endpoint_id}")
+                    endpoint.healthy = True
+                    endpoint.last_error = None
+        self._report_capacity()
+        await self._notify()
+
+    async def run_health_checks(self):
+        """定期的にヘルスチェックを行う（キャンセルされるまで）"""
+        while True:
+            try:
+                await self.check_health()
+            except Exception as e:
+                print(f"ヘルスチェックエラー: {e}")
+            await asyncio.sleep(self.health_interval)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity(),
+            "healthy": sum(1 for endpoint in self.endpoints if endpoint.healthy),
+            "endpoints": [endpoint.status() for endpoint in self.endpoints]
+        }
+
+    def _choose(self, affinity: Optional[str], exclude: Optional[Set[str]] = None) -> Optional[DesktopEndpoint]:
+        """前回と同じエンドポイント（空いていれば）、なければ負荷の最も低いエンドポイント"""
+        exclude = exclude or set()
+        if affinity is not None and affinity in self._sticky:
+            preferred = self._find(self._sticky[affinity])
+            if preferred is not None and preferred.available and preferred.endpoint_id not in exclude:
+                return preferred
+        candidates = [endpoint for endpoint in self.endpoints
+                      if endpoint.available and endpoint.endpoint_id not in exclude]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda endpoint: (endpoint.in_flight / endpoint.max_jobs, endpoint.sent))
+
+    def _has_healthy(self) -> bool:
+        return any(endpoint.healthy for endpoint in self.endpoints)
+
+    def _find(self, endpoint_id: str) -> Optional[DesktopEndpoint]:
+        for endpoint in self.endpoints:
+            if endpoint.endpoint_id == endpoint_id:
+                return endpoint
+        return None
+
+    def _mark(self, endpoint: DesktopEndpoint, error: Exception, unhealthy: bool = False):
+        """失敗を記録する（送信の一時的な失敗では、続けて failure_threshold 回失敗するまで異常としない）"""
+        endpoint.failures += 1
+        endpoint.consecutive_failures += 1
+        endpoint.last_error = str(error)
+        if unhealthy or endpoint.consecutive_failures >= self.failure_threshold:
+            endpoint.healthy = False
+
+    async def _recheck(self):
+        """ヘルスチェックをすぐに行う（同時に呼ばれたら実行中のチェックを共有する）"""
+        if self._checking is None or self._checking.done():
+            self._checking = asyncio.ensure_future(self.check_health())
+        await asyncio.shield(self._checking)
+
+    def _report_capacity(self):
+        """前回知らせたときから同時に受け持てるジョブ数が変わっていれば知らせる"""
+        capacity = self.capacity()
+        if capacity == self._reported_capacity:
+            return
+        self._reported_capacity = capacity
+        if self.on_capacity_change is not None:
+            self.on_capacity_change(capacity)
+
+    def _condition(self) -> asyncio.Condition:
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+        return self._changed
+
+    async def _notify(self):
+        changed = self._condition()
+        async with changed:
+            changed.notify_all()
@@ -0,0 +1,330 @@
+"""プロンプト送信バックエンド
+
+召喚・攻撃のプロンプトをどこへ送るかを切り替えるための抽象化。
+config/app_config.json の dispatch.backend で選択する。
+
+- desktop: Claude DesktopへのGUI自動化（複数のウィンドウ・エージェントへの振り分けに対応）
+- http:    chat-completions形式のHTTP API
+- stub:    プロセス内スタブ（ヘッドレス実行・負荷試験・CI用）
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import struct
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional
+
+from ..core.config import settings
+from ..core.exceptions import DispatchError
+
+
+class DispatchJob:
+    """送信するプロンプトと、その結果を受け取るための識別子"""
+
+    __slots__ = ("kind", "prompt", "summon_id", "correlation_id", "context")
+
+    SUMMON = "summon"
+    ATTACK = "attack"
+
+    def __init__(self, kind: str, prompt: str, summon_id: Optional[str] = None,
+                 correlation_id: Optional[str] = None, context: Optional[Dict[str, Any]] = None):
+        self.kind = kind
+        self.prompt = prompt
+        self.summon_id = summon_id
+        self.correlation_id = correlation_id
+        self.context = context or {}
+
+
+class DispatchBackend(ABC):
+    """プロンプト送信バックエンドの基底クラス
+
+    dispatch はプロンプトを送信した時点で戻る。結果は従来どおり
+    assets/{summon_id}/ のファイルやMCP結果（相関ID付き）として届く。
+    呼び出し側は送信先が不要になったら（結果の受信後、召喚なら貼り付けの直後。
+    失敗・取り消しでも）release を呼ぶ。
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def dispatch(self, job: DispatchJob):
+        """プロンプトを送信する"""
+
+    async def release(self, job: DispatchJob):
+        """ジョブの完了を通知する（送信先を確保するバックエンドが解放に使う）"""
+
+    async def start(self, on_capacity_change: Optional[Callable[[int], None]] = None):
+        """起動時の処理（ヘルスチェックの開始など）
+
+        on_capacity_change は送信先の数が変わったときに新しい同時実行数で呼ばれる。
+        """
+
+    async def stop(self):
+        """終了時の処理"""
+
+    def capacity(self) -> Optional[int]:
+        """同時に実行できるジョブ数（送信先の数で決まらない場合はNone）"""
+        return None
+
+    def status(self) -> Dict[str, Any]:
+        """バックエンドの状態を返す"""
+        return {"backend": self.name}
+
+
+class DesktopGUIBackend(DispatchBackend):
+    """Claude Desktopへプロンプトを貼り付けるバックエンド
+
+    config/claude_desktop_config.json に登録した複数のClaude Desktop（画面上のウィンドウや
+    別のマシンのエージェント）へ、負荷の低い順にジョブを振り分ける（desktop_pool.py）。
+    同じバトルの攻撃は同じClaude Desktopへ送る。
+    """
+
+    name = "desktop"
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.health_interval = config.get("health_interval", 30)
+        self.agent_timeout = config.get("agent_timeout", 10)
+        self.sticky_size = config.get("sticky_size", 1024)
+        self.failure_threshold = config.get("failure_threshold", 3)
+        self.recovery_timeout = config.get("recovery_timeout", 30)
+        self._pool = None
+        self._health_task: Optional[asyncio.Task] = None
+
+    @property
+    def pool(self):
+        """エンドポイントのプール（初回アクセス時に設定ファイルから作成）"""
+        if self._pool is None:
+            from .claude_desktop_client import ClaudeDesktopClient
+            from .desktop_pool import DesktopPool, create_endpoint
+
+            endpoints = [create_endpoint(endpoint, self.agent_timeout)
+                         for endpoint in ClaudeDesktopClient().load_endpoints()]
+            self._pool = DesktopPool(endpoints, self.health_interval, self.sticky_size,
+                                     self.failure_threshold, self.recovery_timeout)
+        return self._pool
+
+    async def dispatch(self, job: DispatchJob):
+        await self.pool.dispatch(job, self._job_key(job), job.context.get("affinity"))
+
+    async def release(self, job: DispatchJob):
+        await self.pool.release(self._job_key(job))
+
+    async def start(self, on_capacity_change: Optional[Callable[[int], None]] = None):
+        if self.pool.endpoints and self._health_task is None:
+            self.pool.on_capacity_change = on_capacity_change
+            self._health_task = asyncio.create_task(self.pool.run_health_checks())
+
+    async def stop(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+
+    def capacity(self) -> Optional[int]:
+        return self.pool.capacity() or None
+
+    def status(self) -> Dict[str, Any]:
+        from .desktop_dispatcher import desktop_dispatcher
+        from .dispatch_timing import dispatch_timing
+
+        return {
+            "backend": self.name,
+            "pool": self.pool.status(),
+            "dispatcher": desktop_dispatcher.stats(),
+            "timing": dispatch_timing.stats()
+        }
+
+    @staticmethod
+    def _job_key(job: DispatchJob) -> str:
+        return f"{job.kind}:{job.summon_id or job.correlation_id}"
+
+
+class HTTPChatBackend(DispatchBackend):
+    """chat-completions形式のHTTP APIへプロンプトを送るバックエンド
+
+    応答本文に含まれるJSONを取り出し、攻撃ならMCP結果として、
+    召喚なら status.json として保存する。model.stl はAPI側のエージェント
+    （Blender連携など）が assets/{summon_id}/ に書き出すことを前提とする。
+    """
+
+    name = "http"
+
+    def __init__(self, config: Dict[str, Any]):
+        self.url = config["url"]
+        self.model = config.get("model")
+        self.timeout = config.get("timeout", 120)
+        self.api_key = os.environ.get(config.get("api_key_env", ""), "") if config.get("api_key_env") else ""
+
+    async def dispatch(self, job: DispatchJob):
+        loop = asyncio.get_running_loop()
+        content = await loop.run_in_executor(None, self._post, job.prompt)
+        data = self._extract_json(content)
+        if data is None:
+            print(f"HTTPバックエンドの応答にJSONが含まれていません ({job.kind})")
+            return
+
+        if job.kind == DispatchJob.ATTACK:
+            from .mcp_manager import mcp_manager
+
+            data.setdefault("result_type", "attack")
+            mcp_manager.save_result(mcp_manager.generate_execution_id(), data, job.correlation_id)
+        elif job.kind == DispatchJob.SUMMON:
+            from .file_manager import async_file_manager
+
+            # この応答は今回の送信の結果なので、相関IDが省かれていても補う
+            data.setdefault("correlation_id", job.correlation_id)
+            await async_file_manager.save_stats(job.summon_id, data)
+
+    def _post(self, prompt: str) -> str:
+        import requests
+
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        payload = {"messages": [{"role": "user", "content": prompt}]}
+        if self.model:
+            payload["model"] = self.model
+
+        try:
+            response = requests.post(self.url, json=payload, headers=headers, timeout=self.timeout)
+            response.raise_for_status()
+            body = response.json()
+            return body["choices"][0]["message"]["content"]
+        except Exception as e:
+            raise DispatchError(f"HTTPバックエンドへの送信に失敗しました: {e}")
+
+    @staticmethod
+    def _extract_json(content: str) -> Optional[Dict[str, Any]]:
+        """応答本文から最初のJSONオブジェクトを取り出す"""
+        block = re.search(r"```(?:json)?\s*(\{.*?\})\s*```", content, re.DOTALL)
+        candidates = [block.group(1)] if block else []
+        start, end = content.find("{"), content.rfind("}")
+        if start != -1 and end > start:
+            candidates.append(content[start:end + 1])
+        for candidate in candidates:
+            try:
+                data = json.loads(candidate)
+                if isinstance(data, dict):
+                    return data
+            except json.JSONDecodeError:
+                continue
+        return None
+
+    def status(self) -> Dict[str, Any]:
+        return {"backend": self.name, "url": self.url, "model": self.model}
+
+
+class StubBackend(DispatchBackend):
+    """Claudeを使わずにプロセス内で結果を生成するスタブ
+
+    設定した遅延の後、召喚なら status.json と model.stl を書き出し、
+    攻撃ならMCP結果を保存する。結果はプロンプトから決定的に生成される。
+    """
+
+    name = "stub"
+
+    def __init__(self, config: Dict[str, Any]):
+        self.summon_latency = config.get("summon_latency", 2.0)
+        self.attack_latency = config.get("attack_latency", 0.5)
+        self._tasks = set()
+
+    async def dispatch(self, job: DispatchJob):
+        if job.kind == DispatchJob.SUMMON:
+            coroutine = self._complete_summon(job)
+        elif job.kind == DispatchJob.ATTACK:
+            coroutine = self._complete_attack(job)
+        else:
+            raise DispatchError(f"未対応のジョブ種別です: {job.kind}")
+
+        # 送信後すぐに戻り、結果は遅延後に届ける（実際のClaudeと同じ流れ）
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _complete_summon(self, job: DispatchJob):
+        await asyncio.sleep(self.summon_latency)
+        from .file_manager import file_manager
+
+        file_manager.create_summon_directory(job.summon_id)
+        seed = self._seed(job.context.get("summon_prompt", job.prompt))
+        with open(file_manager.get_model_path(job.summon_id), 'wb') as f:
+            f.write(self._octahedron_stl(1.0 + seed % 5))
+        file_manager.save_stats(job.summon_id, {
+            "correlation_id": job.correlation_id,
+            "name": f"スタブ召喚獣{seed % 1000:03d}",
+            "hp": 100 + seed % 900,
+            "specialMove": "スタブ・インパクト",
+            "description": "スタブバックエンドが生成した召喚獣",
+            "victoryComment": "テストは成功した！"
+        })
+
+    async def _complete_attack(self, job: DispatchJob):
+        await asyncio.sleep(self.attack_latency)
+        from .mcp_manager import mcp_manager
+
+        seed = self._seed(job.context.get("attack_prompt", job.prompt))
+        mcp_manager.save_result(mcp_manager.generate_execution_id(), {
+            "result_type": "attack",
+            "correlation_id": job.correlation_id,
+            "comment": f"「{job.context.get('attack_prompt', '')}」がスタブで炸裂！",
+            "attacker": {"damage": 0},
+            "defender": {"damage": -(10 + seed % 90)}
+        }, job.correlation_id)
+
+    @staticmethod
+    def _seed(text: str) -> int:
+        return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "little")
+
+    @staticmethod
+    def _octahedron_stl(size: float) -> bytes:
+        """正八面体のバイナリSTLを作成"""
+        s = size
+        top, bottom = (0, 0, s), (0, 0, -s)
+        ring = [(s, 0, 0), (0, s, 0), (-s, 0, 0), (0, -s, 0)]
+        faces = []
+        for i in range(4):
+            a, b = ring[i], ring[(i + 1) % 4]
+            faces.append((a, b, top))
+            faces.append((b, a, bottom))
+
+        data = bytearray(b"stub backend model".ljust(80, b"\0"))
+        data += struct.pack("<I", len(faces))
+        for face in faces:
+            data += struct.pack("<3f", 0.0, 0.0, 0.0)
+            for vertex in face:
+                data += struct.pack("<3f", *vertex)
+            data += struct.pack("<H", 0)
+        return bytes(data)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "summon_latency": self.summon_latency,
+            "attack_latency": self.attack_latency,
+            "in_flight": len(self._tasks)
+        }
+
+
+def create_dispatch_backend(name: str, config: Dict[str, Any]) -> DispatchBackend:
+    """設定からバックエンドを作成する"""
+    if name == DesktopGUIBackend.name:
+        return DesktopGUIBackend(config.get("desktop", {}))
+    if name == HTTPChatBackend.name:
+        return HTTPChatBackend(config.get("http", {}))
+    if name == StubBackend.name:
+        return StubBackend(config.get("stub", {}))
+    raise DispatchError(f"不明なディスパッチバックエンドです: {name}")
+
+
+_backend: Optional[DispatchBackend] = None
+
+
+def get_dispatch_backend() -> DispatchBackend:
+    """設定で選択されたバックエンドを取得する（プロセス内で共有）"""
+    global _backend
+    if _backend is None:
+        _backend = create_dispatch_backend(settings.DISPATCH_BACKEND, settings.DISPATCH_CONFIG)
+    return _backend
@@ -0,0 +1,245 @@
+"""Claude Desktopへの貼り付けのタイミング調整
+
+固定の待ち時間（クリック後・クリップボード設定後・貼り付け後）の代わりに、
+- クリップボードは書き込んだ内容を読み戻して確認できるまで待つ
+- 貼り付けは入力欄の内容を読み戻して確認し、成功・失敗に応じて待ち時間を調整する
+  （成功したら少しずつ短く、失敗したら倍に。AIMD方式）
+調整した値は config/dispatch_timing.json に保存し、次回起動時に引き継ぐ。
+
+クリップボードは、Linuxでは pyperclip が操作のたびに xclip / xsel を起動するため、
+可能ならプロセス内に常駐させた Tk のクリップボードを使う。
+GUI操作と同じく、クリップボードはGUIディスパッチャーのスレッドからのみ使用する。
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from ..core.config import settings
+from ..core.constants import Timing
+from ..core.exceptions import ClaudeDesktopError
+
+# 調整対象の待ち時間
+STEP_CLICK = "click"
+STEP_PASTE = "paste"
+
+
+class PyperclipClipboard:
+    """pyperclip によるクリップボード（環境に応じて外部コマンドを起動する）"""
+
+    name = "pyperclip"
+
+    def __init__(self):
+        import pyperclip
+
+        self._pyperclip = pyperclip
+
+    def copy(self, text: str):
+        self._pyperclip.copy(text)
+
+    def paste(self) -> str:
+        return self._pyperclip.paste() or ""
+
+
+class TkClipboard:
+    """プロセス内に常駐させた Tk のクリップボード（外部コマンドを起動しない）
+
+    Tk のルートウィンドウ（非表示）が生きている間はこのプロセスがクリップボードを所有する。
+    作成したスレッドからのみ使用できる。
+    """
+
+    name = "tk"
+
+    def __init__(self):
+        import tkinter
+
+        self._tcl_error = tkinter.TclError
+        self._root = tkinter.Tk()
+        self._root.withdraw()
+
+    def copy(self, text: str):
+        self._root.clipboard_clear()
+        self._root.clipboard_append(text)
+        self._root.update()
+
+    def paste(self) -> str:
+        try:
+            self._root.update()
+            return self._root.clipboard_get()
+        except self._tcl_error:
+            return ""
+
+
+def create_clipboard(kind: str = "auto"):
+    """クリップボードを作成する（auto: Tk が使えれば Tk、なければ pyperclip）"""
+    if kind in ("auto", TkClipboard.name):
+        try:
+            return TkClipboard()
+        except Exception as e:
+            if kind == TkClipboard.name:
+                raise ClaudeDesktopError(f"Tkのクリップボードを使用できません: {e}")
+    try:
+        return PyperclipClipboard()
+    except Exception as e:
+        raise ClaudeDesktopError(f"クリップボードを使用できません: {e}")
+
+
+_clipboard = None
+
+
+def get_clipboard():
+    """共有のクリップボードを取得する（GUIディスパッチャーのスレッドから呼び出す）"""
+    global _clipboard
+    if _clipboard is None:
+        _clipboard = create_clipboard(dispatch_timing.clipboard_kind)
+    return _clipboard
+
+
+def copy_verified(clipboard, text: str, timeout: float, poll_interval: float = 0.01) -> float:
+    """クリップボードに書き込み、読み戻して一致するまで待つ（かかった秒数を返す）"""
+    started = time.monotonic()
+    clipboard.copy(text)
+    while clipboard.paste() != text:
+        if time.monotonic() - started > timeout:
+            raise ClaudeDesktopError("クリップボードへの書き込みを確認できませんでした")
+        time.sleep(poll_interval)
+    return time.monotonic() - started
+
+
+class DispatchTiming:
+    """貼り付け操作の待ち時間と成功率（GUIディスパッチャーのスレッドから更新する）"""
+
+    # 成功率の平滑化係数（指数移動平均）
+    EWMA_ALPHA = 0.1
+
+    def __init__(self, path: Path, defaults: Dict[str, float], config: Dict[str, Any]):
+        self.path = path
+        self.defaults = dict(defaults)
+        self.adaptive = config.get("adaptive", True)
+        self.verify_paste = config.get("verify_paste", True)
+        self.clipboard_kind = config.get("clipboard", "auto")
+        self.clipboard_timeout = config.get("clipboard_timeout", 1.0)
+        self.gui_pause = config.get("gui_pause", 0.02)
+        self.min_delay = config.get("min_delay", 0.02)
+        self.max_delay = config.get("max_delay", 2.0)
+        self.max_attempts = config.get("max_attempts", 3)
+        self.decrease = config.get("decrease", 0.9)
+        self.increase = config.get("increase", 2.0)
+        self._delays: Dict[str, float] = dict(defaults)
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._dirty = False
+        self._success_rate = 1.0
+        self._attempts = 0
+        self._failures = 0
+        self._clipboard_avg = 0.0
+
+    def delay(self, step: str) -> float:
+        """現在の待ち時間（秒）"""
+        self._ensure_loaded()
+        with self._lock:
+            return self._delays[step]
+
+    def record(self, success: bool, steps: Iterable[str] = (STEP_CLICK, STEP_PASTE),
+               adapt: Optional[bool] = None):
+        """貼り付けの確認結果を記録し、待ち時間を調整する（adapt: 設定の adaptive を上書き）"""
+        self._ensure_loaded()
+        with self._lock:
+            self._attempts += 1
+            self._success_rate += self.EWMA_ALPHA * ((1.0 if success else 0.0) - self._success_rate)
+            if not success:
+                self._failures += 1
+            if not (self.adaptive if adapt is None else adapt):
+                return
+            factor = self.decrease if success else self.increase
+            for step in steps:
+                self._delays[step] = self._clamp(self._delays[step] * factor)
+            self._dirty = True
+
+    def scale(self, factor: float, steps: Iterable[str] = (STEP_CLICK, STEP_PASTE)):
+        """待ち時間をまとめて factor 倍する（キャリブレーション後の余裕分）"""
+        self._ensure_loaded()
+        with self._lock:
+            for step in steps:
+                self._delays[step] = self._clamp(self._delays[step] * factor)
+            self._dirty = True
+
+    def record_clipboard(self, elapsed: float):
+        """クリップボードの書き込み確認にかかった時間を記録する"""
+        with self._lock:
+            self._clipboard_avg += self.EWMA_ALPHA * (elapsed - self._clipboard_avg)
+
+    def stats(self) -> Dict[str, Any]:
+        self._ensure_loaded()
+        with self._lock:
+            return {
+                "adaptive": self.adaptive,
+                "verify_paste": self.verify_paste,
+                "delays": {step: round(value, 3) for step, value in self._delays.items()},
+                "success_rate": round(self._success_rate, 3),
+                "attempts": self._attempts,
+                "failures": self._failures,
+                "clipboard_avg_ms": round(self._clipboard_avg * 1000, 1)
+            }
+
+    def load(self):
+        """保存した待ち時間を読み込む（なければ既定値）"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            saved = {}
+        with self._lock:
+            for step in self.defaults:
+                value = saved.get("delays", {}).get(step)
+                if isinstance(value, (int, float)):
+                    self._delays[step] = self._clamp(float(value))
+            self._success_rate = saved.get("success_rate", self._success_rate)
+            self._loaded = True
+
+    def save(self):
+        """調整した待ち時間を保存する（変更がなければ何もしない）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                "delays": {step: round(value, 4) for step, value in self._delays.items()},
+                "success_rate": round(self._success_rate, 4),
+                "updated_at": time.time()
+            }
+            self._dirty = False
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+            tmp_path.replace(self.path)
+        except OSError as e:
+            print(f"タイミング設定の保存エラー: {e}")
+
+    def reset(self):
+        """待ち時間を既定値に戻す（キャリブレーションの開始時）"""
+        with self._lock:
+            self._delays = dict(self.defaults)
+            self._loaded = True
+            self._dirty = True
+
+    def _clamp(self, value: float) -> float:
+        return min(self.max_delay, max(self.min_delay, value))
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+
+# グローバルインスタンス（すべてのGUIエンドポイントで共有）
+dispatch_timing = DispatchTiming(
+    settings.CONFIG_DIR / "dispatch_timing.json",
+    {
+        STEP_CLICK: Timing.CLAUDE_CLICK_DELAY,
+        STEP_PASTE: Timing.PASTE_DELAY
+    },
+    settings.DESKTOP_TIMING
+)
@@ -1,22 +1,34 @@
 """ファイル管理サービス"""
 
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
 import json
-import time
-from typing import Dict, Any
+import os
+import shutil
+from typing import Dict, Any, Callable, Optional, TypeVar
 from ..core.config import settings
+from .summon_catalog import summon_catalog
+from .prompt_index import prompt_index
+from .metadata_store import metadata_store
+from ..core.exceptions import MeshError
 
 class FileManager:
-    """ファイル管理を行うサービス"""
+    """ファイル管理を行うサービス
+    
+    モデルなどのバイナリファイルは assets/{summon_id}/ に、召喚状態・ステータス・
+    召喚呪文はメタデータストア（SQLite）に保存する。
+    """
     
     def __init__(self):
         self.assets_dir = settings.ASSETS_DIR
-        self.assets_dir.mkdir(parents=True, exist_ok=True)
+        self.store = metadata_store
     
     def create_summon_directory(self, summon_id: str) -> Path:
         """召喚獣用のディレクトリを作成"""
         summon_dir = self.assets_dir / summon_id
-        summon_dir.mkdir(exist_ok=True)
+        summon_dir.mkdir(parents=True, exist_ok=True)
         return summon_dir
     
     def get_model_path(self, summon_id: str) -> Path:
@@ -24,66 +36,188 @@ class FileManager:
         return self.assets_dir / summon_id / "model.stl"
     
     def get_stats_path(self, summon_id: str) -> Path:
-        """ステータスJSONファイルのパスを取得"""
+        """ステータスJSONファイルのパスを取得（Claude Desktopが書き出すファイル）"""
         return self.assets_dir / summon_id / "status.json"
     
+    def save_summon_prompt(self, summon_id: str, prompt: str, cloned_from: Optional[str] = None) -> bool:
+        """召喚呪文を保存（類似呪文の検索に使用）"""
+        try:
+            self.store.set_prompt(summon_id, prompt, cloned_from)
+            return True
+        except Exception as e:
+            print(f"召喚呪文保存エラー: {e}")
+            return False
+    
+    def load_summon_prompt(self, summon_id: str) -> Optional[str]:
+        """召喚呪文を読み込み"""
+        try:
+            summon = self.store.get_summon(summon_id)
+            if summon is not None:
+                return summon["prompt"]
+        except Exception as e:
+            print(f"召喚呪文読み込みエラー: {e}")
+        return None
+    
+    def clone_summon(self, source_id: str, summon_id: str) -> bool:
+        """完成済みの召喚獣のファイルを新しい召喚IDへ複製
+        
+        モデルと派生ファイル（LOD・.qmesh・事前圧縮した .gz / .br）はハードリンクで共有し、
+        mesh.json と lod.json も引き継いで、生成した召喚獣と同じ状態で完了とする。
+        """
+        from .mesh_lod import LOD_MANIFEST
+        from .mesh_metadata import MESH_SIDECAR
+        
+        try:
+            source_dir = self.assets_dir / source_id
+            summon_dir = self.create_summon_directory(summon_id)
+            # モデルは変更されないためハードリンクで共有（できない場合はコピー）
+            for source_path in source_dir.glob("model*"):
+                if source_path.suffix == ".tmp":
+                    continue
+                try:
+                    os.link(source_path, summon_dir / source_path.name)
+                except OSError:
+                    shutil.copy2(source_path, summon_dir / source_path.name)
+            # mesh.json はモデルのサイズ・更新時刻で検証されるため、そのまま引き継げる
+            if (source_dir / MESH_SIDECAR).exists():
+                shutil.copy2(source_dir / MESH_SIDECAR, summon_dir / MESH_SIDECAR)
+            # lod.json はファイルのパスに召喚IDを含むため書き換える
+            if (source_dir / LOD_MANIFEST).exists():
+                with open(source_dir / LOD_MANIFEST, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+                for lod in manifest.get("lods", []):
+                    for key in ("path", "qmesh"):
+                        if key in lod:
+                            lod[key] = lod[key].replace(f"assets/{source_id}/", f"assets/{summon_id}/")
+                with open(summon_dir / LOD_MANIFEST, 'w', encoding='utf-8') as f:
+                    json.dump(manifest, f, ensure_ascii=False, indent=2)
+            if not self.save_stats(summon_id, self.load_stats(source_id)):
+                return False
+            # 元の召喚獣が未検証なら mesh.json をここで作成する
+            return self.check_summon_complete(summon_id)
+        except Exception as e:
+            print(f"召喚獣複製エラー: {e}")
+            return False
+    
     def save_stats(self, summon_id: str, stats: Dict[str, Any]) -> bool:
-        """ステータスをJSONファイルに保存"""
+        """ステータスを保存
+        
+        status.json は召喚完了の合図として監視されているため、ファイルにも書き出す。
+        """
         try:
+            self.store.set_stats(summon_id, stats)
             stats_path = self.get_stats_path(summon_id)
+            stats_path.parent.mkdir(parents=True, exist_ok=True)
             with open(stats_path, 'w', encoding='utf-8') as f:
                 json.dump(stats, f, ensure_ascii=False, indent=2)
+            summon_catalog.update_stats(summon_id, stats)
             return True
         except Exception as e:
             print(f"ステータス保存エラー: {e}")
             return False
     
     def load_stats(self, summon_id: str) -> Dict[str, Any]:
-        """ステータスをJSONファイルから読み込み"""
+        """ステータスを読み込み（未登録ならClaude Desktopが書き出した status.json から）"""
         try:
-            stats_path = self.get_stats_path(summon_id)
-            if stats_path.exists():
-                with open(stats_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+            summon = self.store.get_summon(summon_id)
+            if summon is not None and summon["stats"] is not None:
+                return summon["stats"]
+            return self._read_stats_file(summon_id) or {}
         except Exception as e:
             print(f"ステータス読み込みエラー: {e}")
         return {}
     
+    def _read_stats_file(self, summon_id: str) -> Optional[Dict[str, Any]]:
+        stats_path = self.get_stats_path(summon_id)
+        if not stats_path.exists():
+            return None
+        with open(stats_path, 'r', encoding='utf-8') as f:
+            stats = json.load(f)
+        return stats if isinstance(stats, dict) else None
+    
     def check_summon_complete(self, summon_id: str) -> bool:
-        """召喚が完了しているかチェック"""
+        """召喚が完了しているかチェック（モデルが最後まで書き込まれていることも検証）"""
         model_path = self.get_model_path(summon_id)
         stats_path = self.get_stats_path(summon_id)
-        return model_path.exists() and stats_path.exists()
+        if not (model_path.exists() and stats_path.exists()):
+            return False
+        # メッシュの処理にはNumPyを使うため、必要になった時点で読み込む
+        from .mesh_metadata import ensure_sidecar
+        
+        try:
+            # 検証済みなら mesh.json を読むだけ、未検証ならSTLを走査して書き出す
+            ensure_sidecar(model_path)
+            return True
+        except (MeshError, OSError, ValueError) as e:
+            print(f"モデル検証エラー {summon_id}: {e}")
+            return False
+    
+    def load_mesh_metadata(self, summon_id: str) -> Optional[Dict[str, Any]]:
+        """検証済みのメッシュメタデータ（mesh.json）を読み込み"""
+        from .mesh_metadata import load_sidecar
+        
+        return load_sidecar(self.get_model_path(summon_id))
     
-    def save_summon_status(self, summon_id: str, status: str) -> bool:
-        """召喚状態をファイルに保存"""
+    def load_summon_detail(self, summon_id: str) -> Optional[Dict[str, Any]]:
+        """召喚状態APIに必要な情報をまとめて読み込み
+        
+        Returns:
+            {"status": 状態, "stats": ステータス, "mesh": メッシュメタデータ}。
+            召喚IDが存在しない場合はNone
+        """
+        if not self.summon_exists(summon_id):
+            return None
+        status = self.load_summon_status(summon_id)
+        detail = {"status": status, "stats": None, "mesh": None}
+        if status == "completed":
+            if self.get_model_path(summon_id).exists() and self.get_stats_path(summon_id).exists():
+                detail["stats"] = self.load_stats(summon_id)
+                detail["mesh"] = self.load_mesh_metadata(summon_id)
+        return detail
+    
+    def save_summon_status(self, summon_id: str, status: str, details: Optional[Dict[str, Any]] = None) -> bool:
+        """召喚状態を保存
+        
+        Args:
+            details: 状態と一緒に残す補足情報（作成元の実行IDなど）
+        """
         try:
-            status_file = self.assets_dir / summon_id / "summon_status.json"
-            status_file.parent.mkdir(parents=True, exist_ok=True)
-            
-            status_data = {
-                "summon_id": summon_id,
-                "status": status,
-                "created_at": time.time()
-            }
-            
-            with open(status_file, 'w', encoding='utf-8') as f:
-                json.dump(status_data, f, ensure_ascii=False, indent=2)
+            (self.assets_dir / summon_id).mkdir(parents=True, exist_ok=True)
+            if status == "completed":
+                self._import_stats_file(summon_id)
+            self.store.set_status(summon_id, status, details)
+            summon_catalog.update_status(summon_id, status)
+            if status == "completed":
+                # 完成した召喚獣の呪文を類似検索の対象に加える
+                prompt = self.load_summon_prompt(summon_id)
+                if prompt:
+                    prompt_index.add(summon_id, prompt)
             return True
         except Exception as e:
             print(f"状態保存エラー: {e}")
             return False
     
+    def _import_stats_file(self, summon_id: str):
+        """Claude Desktopが書き出した status.json をメタデータストアへ取り込む"""
+        summon = self.store.get_summon(summon_id)
+        if summon is not None and summon["stats"] is not None:
+            return
+        try:
+            stats = self._read_stats_file(summon_id)
+        except (OSError, ValueError) as e:
+            print(f"ステータス読み込みエラー: {e}")
+            return
+        if stats is not None:
+            self.store.set_stats(summon_id, stats)
+    
     def load_summon_status(self, summon_id: str) -> str:
-        """召喚状態をファイルから読み込み"""
+        """召喚状態を読み込み"""
         try:
-            status_file = self.assets_dir / summon_id / "summon_status.json"
-            if status_file.exists():
-                with open(status_file, 'r', encoding='utf-8') as f:
-                    status_data = json.load(f)
-                return status_data.get("status", "unknown")
+            summon = self.store.get_summon(summon_id)
+            if summon is not None and summon["status"] is not None:
+                return summon["status"]
             
-            # ファイルが存在しない場合、完了チェック
+            # 状態が記録されていない場合、完了チェック
             if self.check_summon_complete(summon_id):
                 return "completed"
             else:
@@ -94,11 +228,11 @@ class FileManager:
     
     def summon_exists(self, summon_id: str) -> bool:
         """召喚IDが存在するかチェック"""
-        summon_dir = self.assets_dir / summon_id
-        status_file = summon_dir / "summon_status.json"
-        
-        # ステータスファイルが存在するか、完成したファイルが存在するかチェック
-        return status_file.exists() or self.check_summon_complete(summon_id)
+        # 召喚状態が記録されているか、完成したファイルが存在するかチェック
+        summon = self.store.get_summon(summon_id)
+        if summon is not None and summon["status"] is not None:
+            return True
+        return self.check_summon_complete(summon_id)
     
     def cleanup_summon(self, summon_id: str) -> bool:
         """召喚獣ファイルを削除"""
@@ -108,7 +242,108 @@ class FileManager:
                 for file in summon_dir.iterdir():
                     file.unlink()
                 summon_dir.rmdir()
+            self.store.delete_summon(summon_id)
+            summon_catalog.remove(summon_id)
+            prompt_index.remove(summon_id)
             return True
         except Exception as e:
             print(f"クリーンアップエラー: {e}")
-            return False
\ No newline at end of file
+            return False
+
+
+T = TypeVar("T")
+
+
+class AsyncFileManager:
+    """FileManagerの非同期版
+    
+    ファイル・メタデータストアへのアクセスを上限付きのスレッドプールで実行し、
+    遅いディスクやネットワークボリュームでもイベントループを止めない。
+    async のAPIハンドラーはこちらを使い、スクリプトなどは同期版の FileManager を使う。
+    """
+    
+    def __init__(self, file_manager: Optional[FileManager] = None, max_workers: int = 8):
+        self.file_manager = file_manager or FileManager()
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+    
+    async def run(self, function: Callable[..., T], *args, **kwargs) -> T:
+        """同期関数をファイルI/O用のスレッドプールで実行する"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), functools.partial(function, *args, **kwargs))
+    
+    def shutdown(self):
+        """スレッドプールを停止する"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="file-io")
+        return self._executor
+    
+    def get_model_path(self, summon_id: str) -> Path:
+        """STLモデルファイルのパスを取得"""
+        return self.file_manager.get_model_path(summon_id)
+    
+    def get_stats_path(self, summon_id: str) -> Path:
+        """ステータスJSONファイルのパスを取得"""
+        return self.file_manager.get_stats_path(summon_id)
+    
+    async def create_summon_directory(self, summon_id: str) -> Path:
+        """召喚獣用のディレクトリを作成"""
+        return await self.run(self.file_manager.create_summon_directory, summon_id)
+    
+    async def save_summon_prompt(self, summon_id: str, prompt: str, cloned_from: Optional[str] = None) -> bool:
+        """召喚呪文を保存"""
+        return await self.run(self.file_manager.save_summon_prompt, summon_id, prompt, cloned_from)
+    
+    async def load_summon_prompt(self, summon_id: str) -> Optional[str]:
+        """召喚呪文を読み込み"""
+        return await self.run(self.file_manager.load_summon_prompt, summon_id)
+    
+    async def clone_summon(self, source_id: str, summon_id: str) -> bool:
+        """完成済みの召喚獣のファイルを新しい召喚IDへ複製"""
+        return await self.run(self.file_manager.clone_summon, source_id, summon_id)
+    
+    async def save_stats(self, summon_id: str, stats: Dict[str, Any]) -> bool:
+        """ステータスを保存"""
+        return await self.run(self.file_manager.save_stats, summon_id, stats)
+    
+    async def load_stats(self, summon_id: str) -> Dict[str, Any]:
+        """ステータスを読み込み"""
+        return await self.run(self.file_manager.load_stats, summon_id)
+    
+    async def check_summon_complete(self, summon_id: str) -> bool:
+        """召喚が完了しているかチェック"""
+        return await self.run(self.file_manager.check_summon_complete, summon_id)
+    
+    async def load_mesh_metadata(self, summon_id: str) -> Optional[Dict[str, Any]]:
+        """検証済みのメッシュメタデータを読み込み"""
+        return await self.run(self.file_manager.load_mesh_metadata, summon_id)
+    
+    async def load_summon_detail(self, summon_id: str) -> Optional[Dict[str, Any]]:
+        """召喚状態APIに必要な情報をまとめて読み込み（スレッドの切り替えは1回）"""
+        return await self.run(self.file_manager.load_summon_detail, summon_id)
+    
+    async def save_summon_status(self, summon_id: str, status: str, details: Optional[Dict[str, Any]] = None) -> bool:
+        """召喚状態を保存"""
+        return await self.run(self.file_manager.save_summon_status, summon_id, status, details)
+    
+    async def load_summon_status(self, summon_id: str) -> str:
+        """召喚状態を読み込み"""
+        return await self.run(self.file_manager.load_summon_status, summon_id)
+    
+    async def summon_exists(self, summon_id: str) -> bool:
+        """召喚IDが存在するかチェック"""
+        return await self.run(self.file_manager.summon_exists, summon_id)
+    
+    async def cleanup_summon(self, summon_id: str) -> bool:
+        """召喚獣ファイルを削除"""
+        return await self.run(self.file_manager.cleanup_summon, summon_id)
+
+
+# グローバルインスタンス
+file_manager = FileManager()
+async_file_manager = AsyncFileManager(file_manager, max_workers=settings.FILE_IO_MAX_WORKERS)
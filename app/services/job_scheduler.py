@@ -0,0 +1,228 @@
+"""送信バックエンドのジョブスケジューラー
+
+Claude Desktopのウィンドウは1つしかないため、召喚・攻撃のジョブを同時に実行できる数を
+送信バックエンドごとに制限する（config/app_config.json の scheduler.concurrency）。
+攻撃のジョブはプロンプトの送信から結果が届くまで、召喚のジョブはプロンプトの貼り付けまで
+（ファイルの書き込みはジョブの外で待つ）。
+
+- 優先度の高いジョブ（攻撃）は、待機中の長いジョブ（召喚）より先に実行する
+- 待機中・実行中のジョブはIDで取り消せる
+- キューの順番と完了までの目安時間（種別ごとの実行時間の指数移動平均から推定）を返す
+- 先に実行されるジョブでキューが上限に達したら SchedulerBusyError（Retry-After の秒数付き）を送出する
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from ..core.config import settings
+from ..core.exceptions import SchedulerBusyError
+
+# 優先度（小さいほど先に実行する）
+PRIORITY_ATTACK = 0
+PRIORITY_SUMMON = 10
+
+
+class ScheduledJob:
+    """スケジューラーのジョブ"""
+
+    __slots__ = ("job_id", "kind", "priority", "seq", "factory", "enqueued_at", "started_at", "task", "future")
+
+    def __init__(self, job_id: str, kind: str, priority: int, seq: int,
+                 factory: Callable[[], Awaitable[Any]], future: asyncio.Future):
+        self.job_id = job_id
+        self.kind = kind
+        self.priority = priority
+        self.seq = seq
+        self.factory = factory
+        self.enqueued_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self.future = future
+
+    def __lt__(self, other: "ScheduledJob") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class JobScheduler:
+    """優先度付きキューで同時実行数を制限するスケジューラー（イベントループ上で動作）"""
+
+    # 実行時間の平滑化係数（指数移動平均）
+    EWMA_ALPHA = 0.3
+
+    def __init__(self, concurrency: int = 1, max_queue: int = 20, estimates: Optional[Dict[str, float]] = None):
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max_queue
+        self._avg_run: Dict[str, float] = dict(estimates or {})
+        self._queue: List[ScheduledJob] = []
+        self._jobs: Dict[str, ScheduledJob] = {}
+        self._running: Dict[str, ScheduledJob] = {}
+        self._seq = itertools.count()
+        self._completed = 0
+        self._failed = 0
+        self._cancelled = 0
+        self._rejected = 0
+
+    def submit(self, job_id: str, kind: str, factory: Callable[[], Awaitable[Any]],
+               priority: Optional[int] = None) -> asyncio.Future:
+        """ジョブをキューに追加し、ジョブの結果で解決されるFutureを返す
+
+        待機中のジョブの上限は、同じかより高い優先度のジョブだけで数える
+        （召喚でキューが埋まっていても攻撃は受け付ける）。
+
+        Raises:
+            SchedulerBusyError: 先に実行される待機中のジョブが上限に達している場合
+        """
+        if job_id in self._jobs:
+            raise ValueError(f"同じIDのジョブが既に登録されています: {job_id}")
+        if priority is None:
+            priority = PRIORITY_ATTACK if kind == "attack" else PRIORITY_SUMMON
+        ahead = sum(1 for other in self._queue if other.priority <= priority)
+        if ahead >= self.max_queue:
+            self._rejected += 1
+            raise SchedulerBusyError(f"ジョブが混み合っています（待機中 {ahead}件）", self.retry_after(kind))
+
+        future = asyncio.get_running_loop().create_future()
+        job = ScheduledJob(job_id, kind, priority, next(self._seq), factory, future)
+        self._jobs[job_id] = job
+        heapq.heappush(self._queue, job)
+        self._pump()
+        return future
+
+    async def run(self, job_id: str, kind: str, factory: Callable[[], Awaitable[Any]],
+                  priority: Optional[int] = None) -> Any:
+        """ジョブを実行して結果を待つ（待っている側が取り消されたらジョブも取り消す）"""
+        future = self.submit(job_id, kind, factory, priority)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            self.cancel(job_id)
+            raise
+
+    def cancel(self, job_id: str) -> bool:
+        """待機中・実行中のジョブを取り消す（該当するジョブがなければFalse）"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return False
+        if job.task is not None:
+            job.task.cancel()
+        else:
+            self._queue.remove(job)
+            heapq.heapify(self._queue)
+            self._finish(job)
+            job.future.cancel()
+            self._cancelled += 1
+        return True
+
+    def resize(self, concurrency: int):
+        """同時実行数を変更する（増えた分はすぐに待機中のジョブを開始する）"""
+        self.concurrency = max(1, concurrency)
+        self._pump()
+
+    def position(self, job_id: str) -> Optional[int]:
+        """キューの順番（0は実行中、登録されていなければNone）"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        if job.task is not None:
+            return 0
+        return sum(1 for other in self._queue if other < job) + 1
+
+    def eta(self, job_id: str) -> Optional[float]:
+        """ジョブ完了までの目安時間（秒）"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        now = time.monotonic()
+        if job.task is not None:
+            return max(0.0, self._estimate(job.kind) - (now - job.started_at))
+
+        # 実行中のジョブの残り時間と、先に実行されるジョブの時間をスロット数で割る
+        remaining = sum(max(0.0, self._estimate(other.kind) - (now - other.started_at))
+                        for other in self._running.values())
+        ahead = sum(self._estimate(other.kind) for other in self._queue if other < job)
+        return (remaining + ahead) / self.concurrency + self._estimate(job.kind)
+
+    def retry_after(self, kind: str = "summon") -> int:
+        """キューが空くまでの目安時間（秒、Retry-After用）"""
+        if self._running:
+            now = time.monotonic()
+            return max(1, math.ceil(min(max(0.0, self._estimate(other.kind) - (now - other.started_at))
+                                        for other in self._running.values())))
+        return max(1, math.ceil(self._estimate(kind)))
+
+    def stats(self) -> Dict[str, Any]:
+        """キューの状態と統計を返す"""
+        return {
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            "queued": len(self._queue),
+            "running": [{"id": job.job_id, "kind": job.kind} for job in self._running.values()],
+            "completed": self._completed,
+            "failed": self._failed,
+            "cancelled": self._cancelled,
+            "rejected": self._rejected,
+            "avg_run_seconds": {kind: round(value, 2) for kind, value in self._avg_run.items()}
+        }
+
+    async def shutdown(self):
+        """待機中・実行中のジョブをすべて取り消す"""
+        for job_id in list(self._jobs):
+            self.cancel(job_id)
+        tasks = [job.task for job in self._running.values() if job.task is not None]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _estimate(self, kind: str) -> float:
+        return self._avg_run.get(kind, 0.0)
+
+    def _pump(self):
+        """空いているスロットで優先度の高いジョブから開始する"""
+        while self._queue and len(self._running) < self.concurrency:
+            job = heapq.heappop(self._queue)
+            job.started_at = time.monotonic()
+            job.task = asyncio.ensure_future(job.factory())
+            job.task.add_done_callback(lambda task, job=job: self._on_done(job, task))
+            self._running[job.job_id] = job
+
+    def _on_done(self, job: ScheduledJob, task: asyncio.Task):
+        """ジョブの結果をFutureへ渡し、次のジョブを開始する
+
+        開始前に取り消されたタスクでも必ず呼ばれるよう、完了時のコールバックで処理する。
+        """
+        self._running.pop(job.job_id, None)
+        self._finish(job)
+        if task.cancelled():
+            self._cancelled += 1
+            job.future.cancel()
+        elif task.exception() is not None:
+            self._failed += 1
+            job.future.set_exception(task.exception())
+            # 誰も結果を待っていない場合に「例外が取得されなかった」警告を出さない
+            job.future.exception()
+        else:
+            self._completed += 1
+            self._record_run(job.kind, time.monotonic() - job.started_at)
+            job.future.set_result(task.result())
+        self._pump()
+
+    def _finish(self, job: ScheduledJob):
+        self._jobs.pop(job.job_id, None)
+
+    def _record_run(self, kind: str, run_time: float):
+        previous = self._avg_run.get(kind)
+        if previous is None:
+            self._avg_run[kind] = run_time
+        else:
+            self._avg_run[kind] = previous + self.EWMA_ALPHA * (run_time - previous)
+
+
+# グローバルインスタンス（選択された送信バックエンドの同時実行数で作成）
+job_scheduler = JobScheduler(
+    concurrency=settings.SCHEDULER_CONCURRENCY.get(settings.DISPATCH_BACKEND, 1),
+    max_queue=settings.SCHEDULER_MAX_QUEUE,
+    estimates=settings.SCHEDULER_ESTIMATES
+)
@@ -74,28 +74,34 @@ class MCPController:
                 "processing_status": "failed"
             }
     
-    def get_current_mcp_result(self) -> Optional[Dict[str, Any]]:
+    def get_current_mcp_result(self, correlation_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
         現在キューされているMCP結果を取得する（取得後削除）
         
+        Args:
+            correlation_id: 相関ID（省略時は全体で最も古い結果）
+            
         Returns:
             現在の結果データまたはNone
         """
         try:
-            return mcp_manager.get_current_result()
+            return mcp_manager.get_current_result(correlation_id)
         except Exception as e:
             print(f"現在のMCP結果取得エラー: {e}")
             return None
     
-    def has_mcp_result(self) -> bool:
+    def has_mcp_result(self, correlation_id: Optional[str] = None) -> bool:
         """
         キューにMCP結果があるかチェックする
         
+        Args:
+            correlation_id: 相関ID（省略時はいずれかの結果）
+            
         Returns:
             結果があるかどうか
         """
         try:
-            return mcp_manager.has_result()
+            return mcp_manager.has_result(correlation_id)
         except Exception as e:
             print(f"MCP結果存在確認エラー: {e}")
             return False
@@ -1,13 +1,17 @@
 """MCP結果管理サービス"""
 
+import asyncio
 import json
+import threading
 import uuid
 import logging
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from ..core.config import settings
+from .mcp_result_store import MCPResultStore
+from .metadata_store import metadata_store
 
 logger = logging.getLogger(__name__)
 
@@ -15,31 +19,49 @@ class MCPResultManager:
     """Claude DesktopからのMCP結果を管理するクラス"""
     
     def __init__(self):
+        # ディレクトリは3Dモデル結果の保存時に作成する（インポート時にファイルシステムを触らない）
         self.mcp_results_dir = settings.ASSETS_DIR / "mcp_results"
-        self.mcp_results_dir.mkdir(exist_ok=True)
-        logger.info(f"MCP結果ディレクトリを初期化: {self.mcp_results_dir}")
+        # 相関IDごとのインメモリストア（必要に応じてメタデータストアへジャーナル出力）
+        self.store = MCPResultStore(
+            ttl=settings.MCP_RESULT_TTL,
+            max_results=settings.MCP_RESULT_MAX_RESULTS,
+            max_bytes=settings.MCP_RESULT_MAX_BYTES,
+            journal=metadata_store if settings.MCP_RESULT_JOURNAL else None
+        )
+        # プッシュ配信の購読者 (イベントループ, キュー, 相関ID)。1つの結果は1人の購読者だけに配信する
+        self._subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue, Optional[str]]] = []
+        self._subscribers_lock = threading.Lock()
+        # 結果保存を待つロングポーリングの待機者 (イベントループ, イベント)
+        self._save_listeners: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+    
+    def restore(self) -> int:
+        """ジャーナルから未取得の結果を復元"""
+        restored = self.store.restore()
+        if restored:
+            logger.info(f"未取得のMCP結果を復元しました: {restored}件")
+        return restored
     
     def generate_execution_id(self) -> str:
         """実行UUIDを生成"""
         return str(uuid.uuid4())
     
-    def save_result(self, execution_id: str, result_data: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
+    def generate_correlation_id(self) -> str:
+        """相関ID（バトル・攻撃単位）を生成"""
+        return str(uuid.uuid4())
+    
+    def save_result(self, execution_id: str, result_data: Union[str, Dict[str, Any]], correlation_id: Optional[str] = None) -> Dict[str, Any]:
         """
-        Claude Desktopの結果をファイルに保存（1個のみキュー）
-        
-        新しい結果を保存する前に、既存の結果ファイルを全て削除します。
+        Claude Desktopの結果を相関IDごとのキューに保存
         
         Args:
             execution_id: 実行UUID
             result_data: 結果データ（JSON文字列またはdict）
+            correlation_id: 相関ID（省略時は結果データ内のcorrelation_idを使用）
             
         Returns:
             保存された結果の情報
         """
         try:
-            # 既存のMCP結果ファイルを全て削除（1個のみキューのため）
-            self._clear_all_results()
-            
             # 結果データを辞書形式に変換
             if isinstance(result_data, str):
                 try:
@@ -49,25 +71,36 @@ class MCPResultManager:
                     parsed_data = {"raw_result": result_data}
             else:
                 parsed_data = result_data
-            print(parsed_data)
+            
+            if correlation_id is None and isinstance(parsed_data, dict):
+                correlation_id = parsed_data.get("correlation_id")
+            
             # メタデータを追加
             result_with_metadata = {
                 "execution_id": execution_id,
+                "correlation_id": correlation_id,
                 "timestamp": datetime.now().isoformat(),
                 "result_type": self._detect_result_type(parsed_data),
                 "data": parsed_data
             }
             
-            # ファイルに保存
-            result_file = self.mcp_results_dir / f"{execution_id}.json"
-            with open(result_file, 'w', encoding='utf-8') as f:
-                json.dump(result_with_metadata, f, ensure_ascii=False, indent=2)
+            self.store.put(execution_id, result_with_metadata, correlation_id)
+            logger.info(f"MCP結果を保存しました: {execution_id} (相関ID: {correlation_id})")
+            
+            # バトルのイベントログに記録（攻撃結果の適用より先に、対応するバトルを調べる）
+            self._record_event(result_with_metadata)
             
-            logger.info(f"MCP結果を保存しました: {result_file}")
+            # 攻撃結果なら、同じ攻撃の再送に備えてキャッシュに登録
+            if result_with_metadata["result_type"] == "attack":
+                self._record_attack(correlation_id, parsed_data)
+            
+            # 購読者がいれば即座に配信し、待機中のリクエストを起こす
+            self._publish(execution_id, correlation_id)
+            self._notify_saved()
             
             return {
                 "execution_id": execution_id,
-                "file_path": str(result_file),
+                "correlation_id": correlation_id,
                 "timestamp": result_with_metadata["timestamp"],
                 "result_type": result_with_metadata["result_type"],
                 "status": "saved"
@@ -77,14 +110,179 @@ class MCPResultManager:
             logger.error(f"MCP結果保存エラー: {e}")
             raise Exception(f"結果の保存に失敗しました: {str(e)}")
     
-    def _clear_all_results(self):
-        """既存のMCP結果ファイルを全て削除"""
+    def _record_event(self, result: Dict[str, Any]):
+        """MCP結果をバトルのイベントログへ記録（バトルに対応しない結果も分析用に残す）"""
+        from .battle_events import MCP_RESULT, battle_events
+        from .battle_sessions import battle_sessions
+        
+        battle_events.append(
+            MCP_RESULT,
+            battle_sessions.battle_for(result["correlation_id"]),
+            correlation_id=result["correlation_id"],
+            execution_id=result["execution_id"],
+            result_type=result["result_type"],
+            data=result["data"]
+        )
+    
+    def _record_attack(self, correlation_id: Optional[str], attack_data: Dict[str, Any]):
+        """攻撃結果を攻撃キャッシュへ登録し、対応するバトルセッションへ適用"""
+        from .attack_cache import attack_cache
+        from .battle_sessions import battle_sessions
+        
         try:
-            for result_file in self.mcp_results_dir.glob("*.json"):
-                result_file.unlink()
-                logger.info(f"既存のMCP結果を削除しました: {result_file}")
-        except Exception as e:
-            logger.warning(f"既存ファイル削除エラー: {e}")
+            attack_cache.record_result(correlation_id, attack_data)
+        except (KeyError, TypeError) as e:
+            logger.warning(f"攻撃結果をキャッシュできません: {e}")
+        try:
+            battle_sessions.record_result(correlation_id, attack_data)
+        except (KeyError, TypeError) as e:
+            logger.warning(f"攻撃結果をバトルに適用できません: {e}")
+    
+    def subscribe(self, correlation_id: Optional[str] = None) -> asyncio.Queue:
+        """
+        MCP結果のプッシュ配信を購読する
+        
+        購読時点で既にキューされている結果があれば、すぐに配信します。
+        1つの結果は購読者（とポーリング）のうち1人だけが受け取ります。
+        
+        Args:
+            correlation_id: 相関ID（省略時はすべての結果を受け取る）
+            
+        Returns:
+            結果が届くキュー
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        with self._subscribers_lock:
+            self._subscribers.append((asyncio.get_running_loop(), queue, correlation_id))
+        
+        pending = self.get_current_result(correlation_id)
+        if pending is not None:
+            queue.put_nowait(pending)
+        return queue
+    
+    def unsubscribe(self, queue: asyncio.Queue):
+        """プッシュ配信の購読を解除"""
+        with self._subscribers_lock:
+            self._subscribers = [entry for entry in self._subscribers if entry[1] is not queue]
+    
+    async def release(self, queue: asyncio.Queue):
+        """
+        購読を解除し、配信済みで未処理の結果をキューへ戻す
+        
+        切断やタイムアウトの直前に届いた結果を失わないようにするために使用します。
+        配信した結果はこの購読者だけに渡したものなので、戻した結果は次の購読者へ配信し直します。
+        """
+        self.unsubscribe(queue)
+        # スレッド経由でスケジュール済みの配信を先に反映させる
+        await asyncio.sleep(0)
+        requeued = []
+        while not queue.empty():
+            result = queue.get_nowait()
+            self.store.put(result["execution_id"], result, result.get("correlation_id"))
+            requeued.append(result)
+        for result in requeued:
+            self._publish(result["execution_id"], result.get("correlation_id"))
+    
+    async def wait_for_result(self, correlation_id: Optional[str] = None, timeout: float = 0) -> Optional[Dict[str, Any]]:
+        """
+        結果が保存されるまで待機して取得（ロングポーリング用）
+        
+        Args:
+            correlation_id: 相関ID（省略時はいずれかの結果）
+            timeout: 最大待機秒数
+            
+        Returns:
+            結果データ。タイムアウトした場合はNone
+        """
+        queue = self.subscribe(correlation_id)
+        try:
+            return await asyncio.wait_for(queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            await self.release(queue)
+    
+    async def wait_for_execution(self, execution_id: str, timeout: float = 0) -> Optional[Dict[str, Any]]:
+        """
+        指定した実行IDの結果が保存されるまで待機して取得
+        
+        Args:
+            execution_id: 実行ID
+            timeout: 最大待機秒数
+            
+        Returns:
+            結果データ。タイムアウトした場合はNone
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            event = asyncio.Event()
+            listener = (loop, event)
+            self._save_listeners.append(listener)
+            try:
+                result = self.get_result(execution_id)
+                remaining = deadline - loop.time()
+                if result is not None or remaining <= 0:
+                    return result
+                try:
+                    await asyncio.wait_for(event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    return self.get_result(execution_id)
+            finally:
+                self._save_listeners.remove(listener)
+    
+    def _notify_saved(self):
+        """結果保存を待っているリクエストを起こす"""
+        for loop, event in list(self._save_listeners):
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass
+    
+    def subscriber_count(self) -> int:
+        """購読者数を取得"""
+        return len(self._subscribers)
+    
+    def _publish(self, execution_id: str, correlation_id: Optional[str]):
+        """
+        保存された結果を購読者の1人だけに配信（配信した結果はキューから取り出す）
+        
+        相関IDが一致する購読者を優先し、いなければ相関ID指定なしの購読者へ、購読した順に渡す。
+        配信した購読者は末尾へ回し、ストリームとロングポーリングが順番に結果を受け取るようにする。
+        """
+        try:
+            current_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            current_loop = None
+        
+        with self._subscribers_lock:
+            while True:
+                target = next((entry for entry in self._subscribers
+                               if correlation_id and entry[2] == correlation_id), None)
+                if target is None:
+                    target = next((entry for entry in self._subscribers if entry[2] is None), None)
+                if target is None:
+                    return
+                
+                # 購読者を選んだまま取り出すので、ほかの購読者やポーリングと重複しない
+                result = self.store.take(execution_id)
+                if result is None:
+                    return
+                
+                loop, queue, _ = target
+                self._subscribers.remove(target)
+                try:
+                    if loop is current_loop:
+                        queue.put_nowait(result)
+                    else:
+                        loop.call_soon_threadsafe(queue.put_nowait, result)
+                except RuntimeError:
+                    # イベントループが終了している購読者は破棄し、結果を戻して次の購読者へ
+                    self.store.put(execution_id, result, correlation_id)
+                    continue
+                self._subscribers.append(target)
+                logger.info(f"MCP結果を購読者に配信しました: {execution_id}")
+                return
     
     def _detect_result_type(self, data: Dict[str, Any]) -> str:
         """結果データの種類を判定"""
@@ -94,6 +292,9 @@ class MCPResultManager:
         
         # result_typeが存在しない場合は従来の判定処理
         if isinstance(data, dict):
+            # 相関IDは判定対象から除外
+            data = {key: value for key, value in data.items() if key != "correlation_id"}
+            
             # 決着コメントか判定
             if "comment" in data and len(data) == 1:
                 return "finish_comment"
@@ -121,56 +322,38 @@ class MCPResultManager:
             return "general_json"
     
     def get_result(self, execution_id: str) -> Optional[Dict[str, Any]]:
-        """実行IDから結果を取得（取得後ファイル削除）"""
+        """実行IDから結果を取得（取得後キューから削除）"""
         try:
-            result_file = self.mcp_results_dir / f"{execution_id}.json"
-            
-            if not result_file.exists():
-                return None
-            
-            with open(result_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # ファイルを削除（キューから取り出し）
-            result_file.unlink()
-            logger.info(f"MCP結果を取得し削除しました: {result_file}")
-            
+            data = self.store.take(execution_id)
+            if data is not None:
+                logger.info(f"MCP結果を取得しました: {execution_id}")
             return data
                 
         except Exception as e:
             logger.error(f"MCP結果取得エラー: {e}")
             return None
     
-    def get_current_result(self) -> Optional[Dict[str, Any]]:
-        """現在キューされている結果を取得（取得後削除）"""
+    def get_current_result(self, correlation_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        キューされている最も古い結果を取得（取得後削除）
+        
+        Args:
+            correlation_id: 相関ID（省略時は全体で最も古い結果）
+        """
         try:
-            # mcp_resultsディレクトリ内の最初のJSONファイルを取得
-            result_files = list(self.mcp_results_dir.glob("*.json"))
-            
-            if not result_files:
-                return None
-            
-            # 最初（唯一）のファイルを取得
-            result_file = result_files[0]
-            
-            with open(result_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # ファイルを削除（キューから取り出し）
-            result_file.unlink()
-            logger.info(f"現在のMCP結果を取得し削除しました: {result_file}")
-            
+            data = self.store.pop(correlation_id)
+            if data is not None:
+                logger.info(f"現在のMCP結果を取得しました: {data['execution_id']}")
             return data
                 
         except Exception as e:
             logger.error(f"現在のMCP結果取得エラー: {e}")
             return None
     
-    def has_result(self) -> bool:
+    def has_result(self, correlation_id: Optional[str] = None) -> bool:
         """キューに結果があるかチェック"""
         try:
-            result_files = list(self.mcp_results_dir.glob("*.json"))
-            return len(result_files) > 0
+            return self.store.has(correlation_id)
         except Exception as e:
             logger.error(f"結果存在確認エラー: {e}")
             return False
@@ -180,28 +363,18 @@ class MCPResultManager:
         try:
             results = []
             
-            # 全JSONファイルを取得
-            for result_file in self.mcp_results_dir.glob("*.json"):
-                try:
-                    with open(result_file, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                    
-                    # フィルタリング
-                    if result_type and data.get("result_type") != result_type:
-                        continue
-                    
-                    # サマリー情報のみ抽出
-                    summary = {
-                        "execution_id": data.get("execution_id"),
-                        "timestamp": data.get("timestamp"),
-                        "result_type": data.get("result_type"),
-                        "file_path": str(result_file)
-                    }
-                    
-                    results.append(summary)
-                    
-                except Exception as e:
-                    logger.warning(f"結果ファイル読み込みエラー {result_file}: {e}")
+            for data in self.store.list():
+                # フィルタリング
+                if result_type and data.get("result_type") != result_type:
+                    continue
+                
+                # サマリー情報のみ抽出
+                results.append({
+                    "execution_id": data.get("execution_id"),
+                    "correlation_id": data.get("correlation_id"),
+                    "timestamp": data.get("timestamp"),
+                    "result_type": data.get("result_type")
+                })
             
             # タイムスタンプでソート（新しい順）
             results.sort(key=lambda x: x["timestamp"], reverse=True)
@@ -215,11 +388,8 @@ class MCPResultManager:
     def delete_result(self, execution_id: str) -> bool:
         """結果を削除"""
         try:
-            result_file = self.mcp_results_dir / f"{execution_id}.json"
-            
-            if result_file.exists():
-                result_file.unlink()
-                logger.info(f"MCP結果を削除しました: {result_file}")
+            if self.store.take(execution_id) is not None:
+                logger.info(f"MCP結果を削除しました: {execution_id}")
                 return True
             
             return False
@@ -236,28 +406,19 @@ class MCPResultManager:
             if not all(field in creature_data for field in required_fields):
                 raise ValueError(f"必須フィールドが不足しています: {required_fields}")
             
+            from .file_manager import file_manager
+            
             # 召喚獣ディレクトリを作成
             creature_id = str(uuid.uuid4())
-            creature_dir = settings.ASSETS_DIR / creature_id
-            creature_dir.mkdir(exist_ok=True)
+            creature_dir = file_manager.create_summon_directory(creature_id)
             
-            # 召喚獣ステータスファイルを保存
-            status_file = creature_dir / "status.json"
-            with open(status_file, 'w', encoding='utf-8') as f:
-                json.dump(creature_data, f, ensure_ascii=False, indent=2)
-            
-            # 召喚状態ファイルを保存
-            summon_status = {
-                "status": "completed",
-                "creature_id": creature_id,
+            # ステータスと召喚状態を保存
+            if not file_manager.save_stats(creature_id, creature_data):
+                raise Exception("ステータスを保存できませんでした")
+            file_manager.save_summon_status(creature_id, "completed", {
                 "execution_id": execution_id,
-                "created_at": datetime.now().isoformat(),
                 "source": "mcp_result"
-            }
-            
-            summon_status_file = creature_dir / "summon_status.json"
-            with open(summon_status_file, 'w', encoding='utf-8') as f:
-                json.dump(summon_status, f, ensure_ascii=False, indent=2)
+            })
             
             logger.info(f"召喚獣データを処理しました: {creature_id}")
             
@@ -277,7 +438,7 @@ class MCPResultManager:
         try:
             # モデルファイルの保存先を決定
             model_dir = self.mcp_results_dir / f"models_{execution_id}"
-            model_dir.mkdir(exist_ok=True)
+            model_dir.mkdir(parents=True, exist_ok=True)
             
             # STLデータがある場合は保存
             if "stl_data" in model_data:
@@ -0,0 +1,213 @@
+"""MCP結果ストア（相関ID付きインメモリキュー）"""
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from .metadata_store import MetadataStore
+
+logger = logging.getLogger(__name__)
+
+
+class _StoredResult:
+    """ストア内の結果エントリ"""
+
+    __slots__ = ("key", "result", "created_at", "size")
+
+    def __init__(self, key: str, result: Dict[str, Any], created_at: float, size: int):
+        self.key = key
+        self.result = result
+        self.created_at = created_at
+        self.size = size
+
+
+class MCPResultStore:
+    """相関IDごとのFIFOキューでMCP結果を保持するストア
+
+    - 相関IDごとにFIFOで取り出す（取り出しはO(1)）
+    - 未取得のまま ttl 秒を超えた結果は破棄する
+    - 件数・合計サイズの上限を超えた場合は古いものから破棄する
+    - journal を指定すると、メタデータストア（SQLite）の書き込みスレッドへ
+      まとめて書き出す（write-behind。コミットは待たない）
+    """
+
+    DEFAULT_KEY = "_default"
+
+    def __init__(self, ttl: float, max_results: int, max_bytes: int, journal: Optional["MetadataStore"] = None):
+        self.ttl = ttl
+        self.max_results = max_results
+        self.max_bytes = max_bytes
+        self.journal = journal
+
+        self._results: "OrderedDict[str, _StoredResult]" = OrderedDict()  # 実行ID -> エントリ（保存順）
+        self._queues: Dict[str, Deque[str]] = {}  # 相関ID -> 実行IDのキュー
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # 追加・取り出し
+    # ------------------------------------------------------------------
+    def put(self, execution_id: str, result: Dict[str, Any], correlation_id: Optional[str] = None):
+        """結果を追加する"""
+        key = correlation_id or self.DEFAULT_KEY
+        size = len(json.dumps(result, ensure_ascii=False))
+        with self._lock:
+            self._evict_expired()
+            self._discard(execution_id)
+            self._results[execution_id] = _StoredResult(key, result, time.monotonic(), size)
+            self._queues.setdefault(key, deque()).append(execution_id)
+            self._total_bytes += size
+            self._evict_overflow()
+        self._journal("put", execution_id, result)
+
+    def pop(self, correlation_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """最も古い結果を取り出す
+
+        Args:
+            correlation_id: 相関ID（省略時は全体で最も古い結果）
+        """
+        with self._lock:
+            self._evict_expired()
+            if correlation_id is None:
+                if not self._results:
+                    return None
+                execution_id = next(iter(self._results))
+            else:
+                execution_id = self._peek_id(correlation_id)
+                if execution_id is None:
+                    return None
+            entry = self._remove(execution_id)
+        self._journal("delete", execution_id)
+        return entry.result
+
+    def take(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        """実行IDを指定して結果を取り出す"""
+        with self._lock:
+            self._evict_expired()
+            if execution_id not in self._results:
+                return None
+            entry = self._remove(execution_id)
+        self._journal("delete", execution_id)
+        return entry.result
+
+    def has(self, correlation_id: Optional[str] = None) -> bool:
+        """取り出せる結果があるか"""
+        with self._lock:
+            self._evict_expired()
+            if correlation_id is None:
+                return bool(self._results)
+            return self._peek_id(correlation_id) is not None
+
+    def list(self) -> List[Dict[str, Any]]:
+        """保持している結果を保存順に返す"""
+        with self._lock:
+            self._evict_expired()
+            return [entry.result for entry in self._results.values()]
+
+    def stats(self) -> Dict[str, Any]:
+        """ストアの状態を返す"""
+        with self._lock:
+            return {
+                "results": len(self._results),
+                "keys": len(self._queues),
+                "bytes": self._total_bytes,
+                "journal": self.journal is not None
+            }
+
+    # ------------------------------------------------------------------
+    # ジャーナル
+    # ------------------------------------------------------------------
+    def restore(self) -> int:
+        """ジャーナルから未取得の結果を復元する"""
+        if self.journal is None:
+            return 0
+        now = time.time()
+        # 期限切れの結果はまとめて削除する
+        self.journal.delete_results_before(now - self.ttl)
+        restored = 0
+        for saved_at, result in self.journal.load_results():
+            execution_id = result.get("execution_id")
+            if not execution_id or now - saved_at > self.ttl:
+                continue
+            with self._lock:
+                key = result.get("correlation_id") or self.DEFAULT_KEY
+                size = len(json.dumps(result, ensure_ascii=False))
+                self._discard(execution_id)
+                self._results[execution_id] = _StoredResult(key, result, time.monotonic() - (now - saved_at), size)
+                self._queues.setdefault(key, deque()).append(execution_id)
+                self._total_bytes += size
+                self._evict_overflow()
+            restored += 1
+        return restored
+
+    def flush(self, timeout: float = 5.0):
+        """ジャーナルへの書き出しが完了するまで待つ"""
+        if self.journal is not None:
+            self.journal.flush(timeout)
+
+    def _journal(self, operation: str, execution_id: str, result: Optional[Dict[str, Any]] = None):
+        if self.journal is None:
+            return
+        try:
+            if operation == "put":
+                self.journal.put_result(execution_id, result)
+            else:
+                self.journal.delete_result(execution_id)
+        except Exception as e:
+            logger.warning(f"ジャーナル書き込みエラー {execution_id}: {e}")
+
+    # ------------------------------------------------------------------
+    # 内部処理（ロック取得済みで呼び出す）
+    # ------------------------------------------------------------------
+    def _peek_id(self, correlation_id: str) -> Optional[str]:
+        """相関IDのキュー先頭の有効な実行IDを返す（無効なIDは読み捨てる）"""
+        ids = self._queues.get(correlation_id)
+        while ids:
+            if ids[0] in self._results:
+                return ids[0]
+            ids.popleft()
+        self._queues.pop(correlation_id, None)
+        return None
+
+    def _remove(self, execution_id: str) -> _StoredResult:
+        entry = self._results.pop(execution_id)
+        self._total_bytes -= entry.size
+        ids = self._queues.get(entry.key)
+        # 先頭の取り出し済みIDを読み捨てる（途中のIDは先頭に来た時点で読み捨てる）
+        while ids and ids[0] not in self._results:
+            ids.popleft()
+        if not ids:
+            self._queues.pop(entry.key, None)
+        return entry
+
+    def _discard(self, execution_id: str):
+        """同じ実行IDの結果があれば、サイズとキュー内の位置ごと取り除く（置き換え用）"""
+        if execution_id not in self._results:
+            return
+        entry = self._remove(execution_id)
+        ids = self._queues.get(entry.key)
+        if ids and execution_id in ids:
+            ids.remove(execution_id)
+            if not ids:
+                self._queues.pop(entry.key, None)
+
+    def _evict_expired(self):
+        deadline = time.monotonic() - self.ttl
+        while self._results:
+            execution_id, entry = next(iter(self._results.items()))
+            if entry.created_at > deadline:
+                break
+            self._remove(execution_id)
+            self._journal("delete", execution_id)
+            logger.info(f"期限切れのMCP結果を破棄しました: {execution_id}")
+
+    def _evict_overflow(self):
+        while self._results and (len(self._results) > self.max_results or self._total_bytes > self.max_bytes):
+            execution_id = next(iter(self._results))
+            self._remove(execution_id)
+            self._journal("delete", execution_id)
+            logger.warning(f"上限超過のためMCP結果を破棄しました: {execution_id}")
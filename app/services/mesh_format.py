@@ -0,0 +1,130 @@
+"""コンパクトなメッシュ形式（.qmesh）
+
+STLは三角形ごとに頂点を持つ非インデックス形式のため、同じ頂点を
+溶接してインデックス化し、位置を16bitに量子化して小さくする。
+ブラウザ側は各バッファをそのまま BufferGeometry に渡せる。
+
+レイアウト（リトルエンディアン、各セクションは4バイト境界に揃える）:
+    ヘッダー 44バイト
+        magic        4s   b"QMSH"
+        version      u16  1
+        flags        u16  bit0: 法線あり / bit1: 32bitインデックス
+        vertex_count u32
+        index_count  u32
+        bbox_min     3f   バウンディングボックスの最小点
+        bbox_max     3f   バウンディングボックスの最大点
+        scale        f32  量子化の刻み幅（全軸共通、最大辺の長さ）
+    位置     u16 x 3 x vertex_count   （位置 = bbox_min + q / 65535 * scale）
+    法線     s8  x 2 x vertex_count   （オクタヘドラル符号化、flags bit0 のときのみ）
+    インデックス u16 または u32 x index_count
+"""
+
+import struct
+from typing import Tuple
+
+import numpy as np
+
+MAGIC = b"QMSH"
+VERSION = 1
+FLAG_NORMALS = 0x1
+FLAG_INDEX32 = 0x2
+
+HEADER = struct.Struct("<4sHHII3f3ff")
+QUANT_MAX = 65535
+
+
+def _pad4(data: bytes) -> bytes:
+    return data + b"\0" * (-len(data) % 4)
+
+
+def _padded_size(size: int) -> int:
+    return size + (-size % 4)
+
+
+def octahedral_encode(normals: np.ndarray) -> np.ndarray:
+    """単位法線をオクタヘドラル符号化した int8 x 2 に変換"""
+    n = normals / np.maximum(np.abs(normals).sum(axis=1, keepdims=True), 1e-12)
+    x, y, z = n[:, 0], n[:, 1], n[:, 2]
+    folded_x = np.where(z < 0, (1 - np.abs(y)) * np.where(x >= 0, 1, -1), x)
+    folded_y = np.where(z < 0, (1 - np.abs(x)) * np.where(y >= 0, 1, -1), y)
+    encoded = np.stack([folded_x, folded_y], axis=1)
+    return np.clip(np.round(encoded * 127), -127, 127).astype(np.int8)
+
+
+def octahedral_decode(encoded: np.ndarray) -> np.ndarray:
+    """オクタヘドラル符号化した法線を単位ベクトルに戻す"""
+    e = encoded.astype(np.float32) / 127
+    x, y = e[:, 0], e[:, 1]
+    z = 1 - np.abs(x) - np.abs(y)
+    t = np.maximum(-z, 0)
+    x = x - np.where(x >= 0, t, -t)
+    y = y - np.where(y >= 0, t, -t)
+    n = np.stack([x, y, z], axis=1)
+    return n / np.maximum(np.linalg.norm(n, axis=1, keepdims=True), 1e-12)
+
+
+def encode_qmesh(triangles: np.ndarray, with_normals: bool = True) -> bytes:
+    """三角形配列 (N, 3, 3) を .qmesh 形式にエンコードする"""
+    vertices = triangles.reshape(-1, 3).astype(np.float64)
+    if len(vertices) == 0:
+        return HEADER.pack(MAGIC, VERSION, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0)
+
+    bbox_min = vertices.min(axis=0)
+    bbox_max = vertices.max(axis=0)
+    scale = float(max((bbox_max - bbox_min).max(), 1e-9))
+
+    # 量子化してから同じ位置の頂点を溶接する
+    quantized = np.round((vertices - bbox_min) / scale * QUANT_MAX).astype(np.uint16)
+    keys = (quantized[:, 0].astype(np.uint64) << 32) | (quantized[:, 1].astype(np.uint64) << 16) | quantized[:, 2]
+    unique_keys, indices = np.unique(keys, return_inverse=True)
+    welded = np.stack([unique_keys >> 32, (unique_keys >> 16) & 0xFFFF, unique_keys & 0xFFFF], axis=1)
+    indices = indices.reshape(-1, 3)
+    # 溶接で潰れた三角形を除く
+    valid = (indices[:, 0] != indices[:, 1]) & (indices[:, 1] != indices[:, 2]) & (indices[:, 0] != indices[:, 2])
+    indices = indices[valid].reshape(-1)
+
+    flags = 0
+    sections = [_pad4(welded.astype("<u2").tobytes())]
+    if with_normals:
+        flags |= FLAG_NORMALS
+        sections.append(_pad4(octahedral_encode(_vertex_normals(welded, indices)).tobytes()))
+    if len(welded) > 0xFFFF:
+        flags |= FLAG_INDEX32
+        sections.append(indices.astype("<u4").tobytes())
+    else:
+        sections.append(_pad4(indices.astype("<u2").tobytes()))
+
+    header = HEADER.pack(MAGIC, VERSION, flags, len(welded), len(indices),
+                         *bbox_min.astype(np.float32), *bbox_max.astype(np.float32), scale)
+    return header + b"".join(sections)
+
+
+def decode_qmesh(data: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """.qmesh を (頂点位置 (V, 3), インデックス (I,)) に戻す（検証・ツール用）"""
+    magic, version, flags, vertex_count, index_count, *bounds, scale = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("qmesh形式ではありません")
+    offset = HEADER.size
+    quantized = np.frombuffer(data, "<u2", vertex_count * 3, offset).reshape(-1, 3)
+    offset += _padded_size(quantized.nbytes)
+    if flags & FLAG_NORMALS:
+        offset += _padded_size(vertex_count * 2)
+    index_dtype = "<u4" if flags & FLAG_INDEX32 else "<u2"
+    indices = np.frombuffer(data, index_dtype, index_count, offset)
+    positions = np.array(bounds[:3], dtype=np.float64) + quantized / QUANT_MAX * scale
+    return positions.astype(np.float32), indices.astype(np.uint32)
+
+
+def _vertex_normals(quantized: np.ndarray, indices: np.ndarray) -> np.ndarray:
+    """面積で重み付けした頂点法線（量子化は全軸共通スケールなので量子化座標で計算できる）"""
+    positions = quantized.astype(np.float64)
+    faces = indices.reshape(-1, 3)
+    face_normals = np.cross(positions[faces[:, 1]] - positions[faces[:, 0]],
+                            positions[faces[:, 2]] - positions[faces[:, 0]])
+    corners = faces.reshape(-1)
+    normals = np.stack([
+        np.bincount(corners, weights=np.repeat(face_normals[:, axis], 3), minlength=len(positions))
+        for axis in range(3)
+    ], axis=1)
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    return np.divide(normals, lengths, out=np.tile([0.0, 0.0, 1.0], (len(normals), 1)), where=lengths > 0)
@@ -0,0 +1,136 @@
+"""メッシュのLOD（詳細度）生成サービス
+
+召喚完了後に model.stl を読み込み、頂点クラスタリングで三角形数を減らした
+model_lod1.stl / model_lod2.stl を同じディレクトリに書き出す。
+各LODはコンパクトな .qmesh 形式（mesh_format.py）でも書き出し、
+配信用に .gz / .br へ事前圧縮しておく。
+計算（mesh_lod_builder.py）はNumPyでベクトル化し、プロセスプールで実行して
+イベントループを塞がない。生成結果は lod.json に記録し、召喚状態APIでクライアントへ知らせる。
+"""
+
+import asyncio
+import json
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from ..core.config import settings
+
+LOD_MANIFEST = "lod.json"
+
+
+class MeshLODService:
+    """召喚獣ごとのLOD生成をプロセスプールで実行するサービス"""
+
+    def __init__(self):
+        self.assets_dir = settings.ASSETS_DIR
+        self.enabled = settings.MESH_LOD_ENABLED
+        self.ratios = settings.MESH_LOD_RATIOS
+        self.min_triangles = settings.MESH_LOD_MIN_TRIANGLES
+        self.workers = settings.MESH_LOD_WORKERS
+        self.qmesh = settings.MESH_LOD_QMESH
+        self.qmesh_normals = settings.MESH_LOD_QMESH_NORMALS
+        self.compress = settings.ASSETS_PRECOMPRESS
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._failed: Dict[str, float] = {}  # 召喚ID -> 失敗時のモデル更新時刻（同じモデルでは再試行しない）
+
+    def load_manifest(self, summon_id: str) -> Optional[Dict[str, Any]]:
+        """生成済みのLOD情報を読み込む（モデルが更新されていれば無効）"""
+        summon_dir = self.assets_dir / summon_id
+        try:
+            with open(summon_dir / LOD_MANIFEST, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get("source_mtime") != (summon_dir / "model.stl").stat().st_mtime:
+                return None
+            return manifest
+        except (OSError, ValueError):
+            return None
+
+    def get_lods(self, summon_id: str) -> Optional[List[Dict[str, Any]]]:
+        """LOD一覧を返す（未生成の場合は生成を開始してNone）"""
+        manifest = self.load_manifest(summon_id)
+        if manifest is not None:
+            return manifest["lods"]
+        self.schedule(summon_id)
+        return None
+
+    async def get_lods_async(self, summon_id: str) -> Optional[List[Dict[str, Any]]]:
+        """get_lods の非同期版（lod.json はファイルI/O用のスレッドで読み込む）"""
+        from .file_manager import async_file_manager
+
+        manifest = await async_file_manager.run(self.load_manifest, summon_id)
+        if manifest is not None:
+            return manifest["lods"]
+        self.schedule(summon_id)
+        return None
+
+    def schedule(self, summon_id: str) -> Optional[asyncio.Future]:
+        """LOD生成を開始する（実行中なら同じFutureを返す）
+
+        LODが無効でも .qmesh 変換と事前圧縮は行う。
+        """
+        future = self._in_flight.get(summon_id)
+        if future is not None:
+            return future
+        if summon_id in self._failed and self._failed[summon_id] == self._model_mtime(summon_id):
+            return None
+
+        from .mesh_lod_builder import generate_lods
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self._get_executor(),
+            generate_lods,
+            str(self.assets_dir / summon_id),
+            self.ratios if self.enabled else [],
+            self.min_triangles,
+            self.qmesh,
+            self.qmesh_normals,
+            self.compress
+        )
+        self._in_flight[summon_id] = future
+        future.add_done_callback(lambda done: self._on_done(summon_id, done))
+        return future
+
+    async def generate(self, summon_id: str) -> Optional[Dict[str, Any]]:
+        """LOD生成を完了まで待つ"""
+        future = self.schedule(summon_id)
+        if future is None:
+            return None
+        try:
+            return await future
+        except Exception:
+            return None
+
+    def shutdown(self):
+        """プロセスプールを停止する"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _model_mtime(self, summon_id: str) -> Optional[float]:
+        try:
+            return (self.assets_dir / summon_id / "model.stl").stat().st_mtime
+        except OSError:
+            return None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _on_done(self, summon_id: str, future: asyncio.Future):
+        self._in_flight.pop(summon_id, None)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            print(f"LOD生成エラー {summon_id}: {error}")
+            self._failed[summon_id] = self._model_mtime(summon_id)
+        else:
+            counts = [lod["triangles"] for lod in future.result()["lods"]]
+            print(f"LODを生成しました: {summon_id} {counts}")
+
+
+# グローバルインスタンス
+mesh_lod_service = MeshLODService()
@@ -0,0 +1,137 @@
+"""メッシュのLOD（詳細度）生成処理
+
+model.stl を読み込み、頂点クラスタリングで三角形数を減らした
+model_lod1.stl / model_lod2.stl と .qmesh を書き出して lod.json に記録する。
+MeshLODService（mesh_lod.py）がプロセスプールで実行する。NumPyを使うため、
+サーバーの起動時には読み込まず、最初のLOD生成時に読み込む。
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+from .asset_files import precompress
+from .mesh_format import encode_qmesh
+from .mesh_lod import LOD_MANIFEST
+from .mesh_metadata import STL_DTYPE, read_triangles, triangles_metadata
+
+
+def write_stl(path: Path, triangles: np.ndarray):
+    """三角形配列をバイナリSTLとして書き出す"""
+    records = np.zeros(len(triangles), STL_DTYPE)
+    records["vertices"] = triangles
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    records["normal"] = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+
+    header = b"mystic-covenant-pulse LOD".ljust(80, b"\0")
+    temp_path = path.with_suffix(".tmp")
+    with open(temp_path, 'wb') as f:
+        f.write(header)
+        f.write(np.uint32(len(records)).tobytes())
+        f.write(records.tobytes())
+    temp_path.replace(path)
+
+
+def cluster_decimate(triangles: np.ndarray, resolution: int) -> np.ndarray:
+    """頂点クラスタリングによる簡略化
+
+    バウンディングボックスを resolution^3 のグリッドに分割し、同じセルの頂点を
+    その平均位置へまとめる。潰れた三角形と重複した三角形は取り除く。
+    """
+    vertices = triangles.reshape(-1, 3)
+    low = vertices.min(axis=0)
+    extent = np.maximum(vertices.max(axis=0) - low, 1e-9)
+    cells = np.minimum(((vertices - low) / extent * resolution).astype(np.int64), resolution - 1)
+    cell_ids = (cells[:, 0] * resolution + cells[:, 1]) * resolution + cells[:, 2]
+
+    unique_ids, inverse = np.unique(cell_ids, return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(unique_ids)).astype(np.float64)
+    representatives = np.stack(
+        [np.bincount(inverse, weights=vertices[:, axis], minlength=len(unique_ids)) for axis in range(3)],
+        axis=1
+    ) / counts[:, None]
+
+    faces = inverse.reshape(-1, 3)
+    valid = (faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 0] != faces[:, 2])
+    faces = faces[valid]
+    # 向きに関係なく同じ頂点の三角形は1つにまとめる
+    _, first = np.unique(np.sort(faces, axis=1), axis=0, return_index=True)
+    faces = faces[np.sort(first)]
+    return representatives[faces].astype(np.float32)
+
+
+def decimate(triangles: np.ndarray, target: int) -> np.ndarray:
+    """三角形数が target 以下になる最も細かいグリッドで簡略化する"""
+    if len(triangles) <= target:
+        return triangles
+    # グリッド解像度を二分探索（三角形数は解像度に対しておおむね単調増加）
+    low, high = 2, 1024
+    best = cluster_decimate(triangles, low)
+    while low < high:
+        middle = (low + high + 1) // 2
+        candidate = cluster_decimate(triangles, middle)
+        if len(candidate) <= target:
+            best, low = candidate, middle
+        else:
+            high = middle - 1
+    return best
+
+
+def write_qmesh(path: Path, triangles: np.ndarray, with_normals: bool):
+    """三角形配列を .qmesh 形式で書き出す"""
+    temp_path = path.with_suffix(".tmp")
+    with open(temp_path, 'wb') as f:
+        f.write(encode_qmesh(triangles, with_normals))
+    temp_path.replace(path)
+
+
+def generate_lods(summon_dir: str, ratios: List[float], min_triangles: int,
+                  qmesh: bool = True, qmesh_normals: bool = True, compress: bool = True) -> Dict[str, Any]:
+    """model.stl からLODを生成し、lod.json を書き出す（プロセスプールで実行）"""
+    summon_path = Path(summon_dir)
+    model_path = summon_path / "model.stl"
+    triangles = read_triangles(model_path)
+    summon_id = summon_path.name
+
+    def describe(level: int, ratio: float, stl_path: Path, mesh: np.ndarray) -> Dict[str, Any]:
+        metadata = triangles_metadata(mesh)
+        lod = {
+            "level": level,
+            "ratio": ratio,
+            "path": f"assets/{summon_id}/{stl_path.name}",
+            "triangles": int(len(mesh)),
+            "bytes": stl_path.stat().st_size,
+            # ビューアーがジオメトリを走査せずに中央配置できるように
+            "bbox_min": metadata["bbox_min"],
+            "bbox_max": metadata["bbox_max"]
+        }
+        if qmesh:
+            qmesh_path = stl_path.with_suffix(".qmesh")
+            write_qmesh(qmesh_path, mesh, qmesh_normals)
+            lod["qmesh"] = f"assets/{summon_id}/{qmesh_path.name}"
+            lod["qmesh_bytes"] = qmesh_path.stat().st_size
+        return lod
+
+    lods = [describe(0, 1.0, model_path, triangles)]
+    for level, ratio in enumerate(ratios, start=1):
+        target = int(len(triangles) * ratio)
+        if target < min_triangles:
+            break
+        reduced = decimate(triangles, target)
+        lod_path = summon_path / f"model_lod{level}.stl"
+        write_stl(lod_path, reduced)
+        lods.append(describe(level, ratio, lod_path, reduced))
+
+    if compress:
+        for lod in lods:
+            for key in ("path", "qmesh"):
+                if key in lod:
+                    precompress(summon_path / Path(lod[key]).name)
+
+    manifest = {"source_mtime": model_path.stat().st_mtime, "lods": lods}
+    with open(summon_path / LOD_MANIFEST, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
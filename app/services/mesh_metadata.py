@@ -0,0 +1,223 @@
+"""STLメッシュの読み込み・検証とメタデータ（mesh.json）
+
+バイナリSTLはメモリマップで、ASCII STLはチャンク単位のストリーミングで読み込み、
+三角形数とファイルサイズの整合性を検証しながら、バウンディングボックス・
+重心・表面積・三角形数を1回のベクトル化された走査で求める。
+
+結果は assets/{summon_id}/mesh.json に保存し、召喚完了の判定と
+ビューアーのジオメトリ走査の省略に使う。
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
+
+from ..core.exceptions import MeshError
+
+MESH_SIDECAR = "mesh.json"
+
+# バイナリSTLの三角形レコード（法線・3頂点・属性）
+STL_DTYPE = np.dtype([
+    ("normal", "<f4", (3,)),
+    ("vertices", "<f4", (3, 3)),
+    ("attribute", "<u2")
+])
+STL_HEADER_SIZE = 84
+
+# 一度に処理する三角形数（メモリ使用量の上限）
+CHUNK_TRIANGLES = 1 << 20
+ASCII_CHUNK_BYTES = 8 << 20
+
+_ASCII_VERTEX = re.compile(rb"vertex\s+(\S+)\s+(\S+)\s+(\S+)")
+_ASCII_FACET = re.compile(rb"\bfacet\s+normal\b")
+
+
+def stl_format(path: Path) -> str:
+    """STLの形式を判定する（"binary" / "ascii"）
+
+    Raises:
+        MeshError: どちらの形式としても完結していない場合
+    """
+    size = path.stat().st_size
+    with open(path, 'rb') as f:
+        header = f.read(STL_HEADER_SIZE)
+        if len(header) == STL_HEADER_SIZE:
+            count = int.from_bytes(header[80:84], "little")
+            if size == STL_HEADER_SIZE + count * STL_DTYPE.itemsize:
+                return "binary"
+        if header.lstrip().startswith(b"solid"):
+            f.seek(max(0, size - 256))
+            if b"endsolid" in f.read():
+                return "ascii"
+            raise MeshError(f"ASCII STLが終端していません（書き込み途中の可能性）: {path}")
+    raise MeshError(f"STLのサイズが三角形数と一致しません（書き込み途中の可能性）: {path}")
+
+
+def iter_triangles(path: Path, chunk_triangles: int = CHUNK_TRIANGLES) -> Iterator[np.ndarray]:
+    """STLの三角形を (k, 3, 3) の float32 配列のチャンクで順に返す"""
+    if stl_format(path) == "binary":
+        count = int.from_bytes(_read_count(path), "little")
+        if count == 0:
+            return
+        records = np.memmap(path, dtype=STL_DTYPE, mode="r", offset=STL_HEADER_SIZE, shape=(count,))
+        for start in range(0, count, chunk_triangles):
+            yield np.asarray(records["vertices"][start:start + chunk_triangles], dtype=np.float32)
+        return
+
+    yield from _iter_ascii_triangles(path)
+
+
+def read_triangles(path: Path) -> np.ndarray:
+    """STL全体を (三角形数, 3, 3) の配列として読み込む"""
+    chunks = list(iter_triangles(path))
+    if not chunks:
+        return np.zeros((0, 3, 3), dtype=np.float32)
+    return np.concatenate(chunks)
+
+
+def triangles_metadata(triangles: np.ndarray) -> Dict[str, Any]:
+    """三角形配列のバウンディングボックス・重心・表面積"""
+    accumulator = _MetadataAccumulator()
+    accumulator.add(triangles)
+    return accumulator.result()
+
+
+def compute_metadata(path: Path) -> Dict[str, Any]:
+    """STLを検証しながらメタデータを計算する
+
+    Raises:
+        MeshError: ファイルが書き込み途中・破損している場合
+    """
+    stat_result = path.stat()
+    accumulator = _MetadataAccumulator()
+    for chunk in iter_triangles(path):
+        accumulator.add(chunk)
+    if accumulator.count == 0:
+        raise MeshError(f"STLに三角形がありません: {path}")
+
+    metadata = accumulator.result()
+    metadata.update({
+        "format": stl_format(path),
+        "file": path.name,
+        "size": stat_result.st_size,
+        "mtime": stat_result.st_mtime
+    })
+    return metadata
+
+
+def load_sidecar(model_path: Path) -> Optional[Dict[str, Any]]:
+    """mesh.json を読み込む（モデルが更新されていればNone）"""
+    try:
+        stat_result = model_path.stat()
+        with open(model_path.parent / MESH_SIDECAR, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if metadata.get("size") != stat_result.st_size or metadata.get("mtime") != stat_result.st_mtime:
+        return None
+    return metadata
+
+
+def ensure_sidecar(model_path: Path) -> Dict[str, Any]:
+    """有効な mesh.json があれば返し、なければ検証・計算して書き出す
+
+    Raises:
+        MeshError: モデルが書き込み途中・破損している場合
+    """
+    metadata = load_sidecar(model_path)
+    if metadata is not None:
+        return metadata
+
+    metadata = compute_metadata(model_path)
+    sidecar = model_path.parent / MESH_SIDECAR
+    temp_path = sidecar.with_suffix(".tmp")
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=2)
+    temp_path.replace(sidecar)
+    return metadata
+
+
+class _MetadataAccumulator:
+    """チャンクごとに集計するメタデータ"""
+
+    def __init__(self):
+        self.count = 0
+        self.low = np.full(3, np.inf)
+        self.high = np.full(3, -np.inf)
+        self.area = 0.0
+        self.weighted_centroid = np.zeros(3)
+
+    def add(self, triangles: np.ndarray):
+        if len(triangles) == 0:
+            return
+        vertices = triangles.reshape(-1, 3)
+        self.low = np.minimum(self.low, vertices.min(axis=0))
+        self.high = np.maximum(self.high, vertices.max(axis=0))
+
+        # 面積で重み付けした面の重心（表面の重心）
+        t = triangles.astype(np.float64)
+        areas = 0.5 * np.linalg.norm(np.cross(t[:, 1] - t[:, 0], t[:, 2] - t[:, 0]), axis=1)
+        self.area += float(areas.sum())
+        self.weighted_centroid += (t.mean(axis=1) * areas[:, None]).sum(axis=0)
+        self.count += len(triangles)
+
+    def result(self) -> Dict[str, Any]:
+        if self.count == 0:
+            zero = [0.0, 0.0, 0.0]
+            return {"triangles": 0, "bbox_min": zero, "bbox_max": zero, "center": zero,
+                    "centroid": zero, "surface_area": 0.0}
+        center = (self.low + self.high) / 2
+        centroid = self.weighted_centroid / self.area if self.area > 0 else center
+        return {
+            "triangles": self.count,
+            "bbox_min": [float(v) for v in self.low],
+            "bbox_max": [float(v) for v in self.high],
+            "center": [float(v) for v in center],
+            "centroid": [float(v) for v in centroid],
+            "surface_area": self.area
+        }
+
+
+def _read_count(path: Path) -> bytes:
+    with open(path, 'rb') as f:
+        f.seek(80)
+        return f.read(4)
+
+
+def _iter_ascii_triangles(path: Path) -> Iterator[np.ndarray]:
+    """ASCII STLをチャンク単位で読み、頂点3つごとに三角形として返す"""
+    facets = 0
+    vertex_count = 0
+    pending = np.zeros((0, 3), dtype=np.float32)
+    remainder = b""
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(ASCII_CHUNK_BYTES)
+            data = remainder + block
+            if block:
+                # 最後の行は途中で切れている可能性があるので次のチャンクへ回す
+                cut = data.rfind(b"\n") + 1
+                data, remainder = data[:cut], data[cut:]
+            else:
+                remainder = b""
+            facets += len(_ASCII_FACET.findall(data))
+            found = _ASCII_VERTEX.findall(data)
+            if found:
+                try:
+                    coords = np.array(found, dtype=np.float32)
+                except ValueError:
+                    raise MeshError(f"ASCII STLの頂点が不正です: {path}")
+                vertex_count += len(coords)
+                pending = np.concatenate([pending, coords])
+                usable = len(pending) // 3 * 3
+                if usable:
+                    yield pending[:usable].reshape(-1, 3, 3)
+                    pending = pending[usable:]
+            if not block:
+                break
+
+    if len(pending) or vertex_count != facets * 3:
+        raise MeshError(f"ASCII STLの面と頂点の数が一致しません: {path}")
@@ -0,0 +1,402 @@
+"""メタデータストア（SQLite / WALモード）
+
+召喚獣の状態・ステータス・召喚呪文と、未取得のMCP結果を1つのSQLiteデータベースに保存する。
+バイナリのモデル（model.stl など）はこれまで通り assets/ に置く。
+
+- WALモードで、読み込みはスレッドごとの接続から書き込みと並行して行う
+- 書き込みは専用スレッドが受け持ち、キューに溜まった分を1トランザクションでまとめてコミットする
+  （召喚状態などは wait=True でコミット完了を待ち、MCP結果のジャーナルは待たない）
+- SQL文は定数として固定し、sqlite3の接続ごとのステートメントキャッシュで使い回す
+"""
+
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS summons (
+    summon_id   TEXT PRIMARY KEY,
+    status      TEXT,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL,
+    stats       TEXT,
+    prompt      TEXT,
+    cloned_from TEXT,
+    details     TEXT
+);
+CREATE INDEX IF NOT EXISTS summons_status ON summons (status, updated_at);
+
+CREATE TABLE IF NOT EXISTS mcp_results (
+    execution_id   TEXT PRIMARY KEY,
+    correlation_id TEXT,
+    result_type    TEXT,
+    created_at     REAL NOT NULL,
+    data           TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS mcp_results_correlation ON mcp_results (correlation_id, created_at);
+CREATE INDEX IF NOT EXISTS mcp_results_created ON mcp_results (created_at);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# 召喚獣
+_UPSERT_STATUS = (
+    "INSERT INTO summons (summon_id, status, created_at, updated_at, details) VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT (summon_id) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at, "
+    "details = COALESCE(excluded.details, summons.details)"
+)
+_UPSERT_STATS = (
+    "INSERT INTO summons (summon_id, created_at, updated_at, stats) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT (summon_id) DO UPDATE SET stats = excluded.stats, updated_at = excluded.updated_at"
+)
+_UPSERT_PROMPT = (
+    "INSERT INTO summons (summon_id, created_at, updated_at, prompt, cloned_from) VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT (summon_id) DO UPDATE SET prompt = excluded.prompt, cloned_from = excluded.cloned_from, "
+    "updated_at = excluded.updated_at"
+)
+_IMPORT_SUMMON = (
+    "INSERT OR IGNORE INTO summons (summon_id, status, created_at, updated_at, stats, prompt, cloned_from, details) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_DELETE_SUMMON = "DELETE FROM summons WHERE summon_id = ?"
+_SELECT_SUMMON = (
+    "SELECT summon_id, status, created_at, updated_at, stats, prompt, cloned_from, details "
+    "FROM summons WHERE summon_id = ?"
+)
+_SELECT_SUMMONS = (
+    "SELECT summon_id, status, created_at, updated_at, stats, prompt, cloned_from, details FROM summons"
+)
+
+# MCP結果
+_UPSERT_RESULT = (
+    "INSERT OR REPLACE INTO mcp_results (execution_id, correlation_id, result_type, created_at, data) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+_DELETE_RESULT = "DELETE FROM mcp_results WHERE execution_id = ?"
+_DELETE_RESULTS_BEFORE = "DELETE FROM mcp_results WHERE created_at < ?"
+_SELECT_RESULTS = "SELECT created_at, data FROM mcp_results ORDER BY created_at"
+
+_SET_META = "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)"
+_GET_META = "SELECT value FROM meta WHERE key = ?"
+
+_SUMMON_COLUMNS = ("summon_id", "status", "created_at", "updated_at", "stats", "prompt", "cloned_from", "details")
+_JSON_COLUMNS = ("stats", "details")
+
+
+def _dumps(value: Optional[Dict[str, Any]]) -> Optional[str]:
+    if value is None:
+        return None
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+class _Write:
+    """書き込みスレッドへ渡す1件分の書き込み"""
+
+    __slots__ = ("sql", "params", "many", "done", "error")
+
+    def __init__(self, sql: Optional[str], params: Any, many: bool = False, wait: bool = False):
+        self.sql = sql
+        self.params = params
+        self.many = many
+        self.done = threading.Event() if wait else None
+        self.error: Optional[BaseException] = None
+
+
+class MetadataStore:
+    """召喚獣とMCP結果のメタデータを保存するSQLiteストア"""
+
+    def __init__(self, db_path: Path, batch_size: int = 256, synchronous: str = "NORMAL"):
+        self.db_path = Path(db_path)
+        self.batch_size = batch_size
+        self.synchronous = synchronous
+        self._local = threading.local()
+        self._queue: "queue.Queue[_Write]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # 接続
+    # ------------------------------------------------------------------
+    def _connect(self) -> sqlite3.Connection:
+        self._initialize()
+        connection = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None, cached_statements=64)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(f"PRAGMA synchronous={self.synchronous}")
+        return connection
+
+    def _initialize(self):
+        """データベースファイルとスキーマを作成する（初回のみ）"""
+        if self._initialized:
+            return
+        with self._init_lock:
+            if self._initialized:
+                return
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            try:
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.executescript(SCHEMA)
+            finally:
+                connection.close()
+            self._initialized = True
+
+    def _reader(self) -> sqlite3.Connection:
+        """呼び出し元スレッド専用の読み込み接続"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._connect()
+            connection.execute("PRAGMA query_only=ON")
+            self._local.connection = connection
+        return connection
+
+    # ------------------------------------------------------------------
+    # 書き込み（専用スレッドでまとめてコミット）
+    # ------------------------------------------------------------------
+    def _submit(self, sql: Optional[str], params: Any, many: bool = False, wait: bool = True):
+        write = _Write(sql, params, many, wait)
+        self._ensure_writer()
+        self._queue.put(write)
+        if write.done is not None:
+            write.done.wait()
+            if write.error is not None:
+                raise write.error
+
+    def _ensure_writer(self):
+        if self._writer is not None:
+            return
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="metadata-store-writer", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        connection = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._commit(connection, batch)
+
+    @staticmethod
+    def _commit(connection: sqlite3.Connection, batch: List[_Write]):
+        """キューに溜まった書き込みを1トランザクションで反映する"""
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            for write in batch:
+                if write.sql is None:
+                    continue
+                try:
+                    connection.execute("SAVEPOINT write")
+                    if write.many:
+                        connection.executemany(write.sql, write.params)
+                    else:
+                        connection.execute(write.sql, write.params)
+                    connection.execute("RELEASE write")
+                except sqlite3.Error as e:
+                    # 失敗した1件だけを取り消し、同じバッチの他の書き込みは残す
+                    connection.execute("ROLLBACK TO write")
+                    connection.execute("RELEASE write")
+                    write.error = e
+                    logger.error(f"メタデータ書き込みエラー: {e}")
+            connection.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.error(f"メタデータのコミットに失敗しました: {e}")
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            for write in batch:
+                write.error = write.error or e
+        for write in batch:
+            if write.done is not None:
+                write.done.set()
+
+    def flush(self, timeout: float = 5.0):
+        """キューに溜まった書き込みがコミットされるまで待つ"""
+        if self._writer is None:
+            return
+        write = _Write(None, None, wait=True)
+        self._queue.put(write)
+        write.done.wait(timeout)
+
+    # ------------------------------------------------------------------
+    # 召喚獣
+    # ------------------------------------------------------------------
+    def set_status(self, summon_id: str, status: str, details: Optional[Dict[str, Any]] = None):
+        """召喚状態を保存する"""
+        now = time.time()
+        self._submit(_UPSERT_STATUS, (summon_id, status, now, now, _dumps(details)))
+
+    def set_stats(self, summon_id: str, stats: Dict[str, Any]):
+        """ステータス（名前・HPなど）を保存する"""
+        now = time.time()
+        self._submit(_UPSERT_STATS, (summon_id, now, now, _dumps(stats)))
+
+    def set_prompt(self, summon_id: str, prompt: str, cloned_from: Optional[str] = None):
+        """召喚呪文を保存する"""
+        now = time.time()
+        self._submit(_UPSERT_PROMPT, (summon_id, now, now, prompt, cloned_from))
+
+    def delete_summon(self, summon_id: str):
+        """召喚獣のメタデータを削除する"""
+        self._submit(_DELETE_SUMMON, (summon_id,))
+
+    def get_summon(self, summon_id: str) -> Optional[Dict[str, Any]]:
+        """召喚獣のメタデータを取得する"""
+        row = self._reader().execute(_SELECT_SUMMON, (summon_id,)).fetchone()
+        return self._summon_row(row) if row is not None else None
+
+    def list_summons(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """召喚獣のメタデータを一括で取得する"""
+        if status is None:
+            rows = self._reader().execute(_SELECT_SUMMONS).fetchall()
+        else:
+            rows = self._reader().execute(_SELECT_SUMMONS + " WHERE status = ?", (status,)).fetchall()
+        return [self._summon_row(row) for row in rows]
+
+    @staticmethod
+    def _summon_row(row: Tuple) -> Dict[str, Any]:
+        summon = dict(zip(_SUMMON_COLUMNS, row))
+        for column in _JSON_COLUMNS:
+            if summon[column] is not None:
+                summon[column] = json.loads(summon[column])
+        return summon
+
+    # ------------------------------------------------------------------
+    # MCP結果（ジャーナル。コミットは待たない）
+    # ------------------------------------------------------------------
+    def put_result(self, execution_id: str, result: Dict[str, Any], created_at: Optional[float] = None):
+        """未取得のMCP結果を保存する"""
+        self._submit(_UPSERT_RESULT, (
+            execution_id,
+            result.get("correlation_id"),
+            result.get("result_type"),
+            time.time() if created_at is None else created_at,
+            _dumps(result)
+        ), wait=False)
+
+    def delete_result(self, execution_id: str):
+        """MCP結果を削除する"""
+        self._submit(_DELETE_RESULT, (execution_id,), wait=False)
+
+    def delete_results_before(self, created_at: float):
+        """指定時刻より前に保存されたMCP結果を削除する"""
+        self._submit(_DELETE_RESULTS_BEFORE, (created_at,), wait=False)
+
+    def load_results(self) -> List[Tuple[float, Dict[str, Any]]]:
+        """保存されているMCP結果を (保存時刻, 結果) のリストで古い順に返す"""
+        rows = self._reader().execute(_SELECT_RESULTS).fetchall()
+        results = []
+        for created_at, data in rows:
+            try:
+                results.append((created_at, json.loads(data)))
+            except ValueError as e:
+                logger.warning(f"MCP結果の読み込みエラー: {e}")
+        return results
+
+    # ------------------------------------------------------------------
+    # 既存の assets/ からの移行
+    # ------------------------------------------------------------------
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self._reader().execute(_GET_META, (key,)).fetchone()
+        return row[0] if row is not None else None
+
+    def needs_migration(self) -> bool:
+        """assets/ のJSONファイルをまだ取り込んでいないか"""
+        return self.get_meta("assets_imported") is None
+
+    def import_assets(self, assets_dir: Path) -> Dict[str, int]:
+        """assets/ 以下の summon_status.json / status.json / prompt.json と
+        mcp_results/*.json をデータベースへ取り込む（既存の行は上書きしない）
+
+        Returns:
+            取り込んだ件数 {"summons": n, "results": m}
+        """
+        summons = []
+        for summon_dir in sorted(p for p in Path(assets_dir).iterdir() if p.is_dir()):
+            if summon_dir.name == "mcp_results":
+                continue
+            row = self._read_summon_dir(summon_dir)
+            if row is not None:
+                summons.append(row)
+
+        results = []
+        results_dir = Path(assets_dir) / "mcp_results"
+        if results_dir.is_dir():
+            for result_file in results_dir.glob("*.json"):
+                result = self._read_json(result_file)
+                if not isinstance(result, dict) or not result.get("execution_id"):
+                    continue
+                results.append((
+                    result["execution_id"],
+                    result.get("correlation_id"),
+                    result.get("result_type"),
+                    result_file.stat().st_mtime,
+                    _dumps(result)
+                ))
+
+        self._submit(_IMPORT_SUMMON, summons, many=True)
+        self._submit(_UPSERT_RESULT.replace("OR REPLACE", "OR IGNORE"), results, many=True)
+        self._submit(_SET_META, ("assets_imported", str(time.time())))
+        return {"summons": len(summons), "results": len(results)}
+
+    def _read_summon_dir(self, summon_dir: Path) -> Optional[Tuple]:
+        status_data = self._read_json(summon_dir / "summon_status.json")
+        stats = self._read_json(summon_dir / "status.json")
+        prompt_data = self._read_json(summon_dir / "prompt.json")
+        if status_data is None and stats is None and prompt_data is None:
+            return None
+
+        status_data = status_data if isinstance(status_data, dict) else {}
+        prompt_data = prompt_data if isinstance(prompt_data, dict) else {}
+        created_at = status_data.get("created_at")
+        if not isinstance(created_at, (int, float)):
+            created_at = summon_dir.stat().st_mtime
+        details = {
+            key: value for key, value in status_data.items()
+            if key not in ("summon_id", "status", "created_at")
+        }
+        return (
+            summon_dir.name,
+            status_data.get("status"),
+            created_at,
+            summon_dir.stat().st_mtime,
+            _dumps(stats) if isinstance(stats, dict) else None,
+            prompt_data.get("prompt"),
+            prompt_data.get("cloned_from"),
+            _dumps(details) if details else None
+        )
+
+    @staticmethod
+    def _read_json(path: Path) -> Any:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"移行できないファイルをスキップしました {path}: {e}")
+            return None
+
+
+# グローバルインスタンス
+metadata_store = MetadataStore(
+    settings.METADATA_DB_PATH,
+    batch_size=settings.METADATA_BATCH_SIZE,
+    synchronous=settings.METADATA_SYNCHRONOUS
+)
@@ -0,0 +1,148 @@
+"""召喚呪文の類似検索インデックス
+
+文字n-gramのMinHash/LSHで、過去の召喚呪文から似た呪文を探す。
+単語区切りのない日本語でも使えるよう、単語ではなく文字単位でn-gramを作る。
+候補はLSHのバケットで絞り込み、n-gram集合のJaccard係数で最終判定する。
+"""
+
+import hashlib
+import random
+import threading
+import unicodedata
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from ..core.config import settings
+
+# MinHashのハッシュ関数 (a * x + b) mod P に使うメルセンヌ素数
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def normalize_prompt(prompt: str) -> str:
+    """召喚呪文を正規化する（全角半角・大文字小文字・空白・句読点の違いを無視）"""
+    text = unicodedata.normalize("NFKC", prompt).casefold()
+    return "".join(ch for ch in text if not (ch.isspace() or unicodedata.category(ch).startswith("P")))
+
+
+def char_ngrams(text: str, n: int) -> FrozenSet[str]:
+    """文字n-gramの集合（n文字未満の場合は全体を1要素とする）"""
+    if len(text) <= n:
+        return frozenset([text]) if text else frozenset()
+    return frozenset(text[i:i + n] for i in range(len(text) - n + 1))
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class PromptIndex:
+    """召喚呪文のMinHash/LSHインデックス
+
+    num_perm = bands * rows 個のハッシュでシグネチャを作り、
+    rows 個ずつのバンドが一致したものを候補とする。
+    """
+
+    def __init__(self, ngram: int = 2, bands: int = 16, rows: int = 4, seed: int = 1):
+        self.ngram = ngram
+        self.bands = bands
+        self.rows = rows
+        rng = random.Random(seed)
+        num_perm = bands * rows
+        self._perms = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+
+        self._shingles: Dict[str, FrozenSet[str]] = {}  # 召喚ID -> n-gram集合
+        self._band_keys: Dict[str, List[Tuple[int, ...]]] = {}  # 召喚ID -> バンドごとのキー
+        self._buckets: List[Dict[Tuple[int, ...], Set[str]]] = [{} for _ in range(bands)]
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._shingles)
+
+    def signature(self, shingles: FrozenSet[str]) -> List[int]:
+        """n-gram集合のMinHashシグネチャ"""
+        hashes = [
+            int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+            for s in shingles
+        ]
+        if not hashes:
+            return [_MAX_HASH] * len(self._perms)
+        return [
+            min((a * h + b) % _MERSENNE_PRIME for h in hashes) & _MAX_HASH
+            for a, b in self._perms
+        ]
+
+    def _bands_of(self, signature: List[int]) -> List[Tuple[int, ...]]:
+        return [tuple(signature[i * self.rows:(i + 1) * self.rows]) for i in range(self.bands)]
+
+    def build(self) -> int:
+        """完了済みの召喚獣の呪文（メタデータストアから file_manager.load_summon_prompt で読む）からインデックスを構築する"""
+        from ..api.models import SummonStatus
+        from .file_manager import file_manager
+        from .summon_catalog import summon_catalog
+
+        records, _ = summon_catalog.page(0, None)
+        for record in records:
+            if record.status != SummonStatus.COMPLETED:
+                continue
+            prompt = file_manager.load_summon_prompt(record.summon_id)
+            if prompt:
+                self.add(record.summon_id, prompt)
+        print(f"召喚呪文インデックスを構築しました: {len(self)}件")
+        return len(self)
+
+    def add(self, summon_id: str, prompt: str):
+        """召喚呪文を登録する（同じ召喚IDは置き換え）"""
+        shingles = char_ngrams(normalize_prompt(prompt), self.ngram)
+        if not shingles:
+            return
+        band_keys = self._bands_of(self.signature(shingles))
+        with self._lock:
+            self._remove_locked(summon_id)
+            self._shingles[summon_id] = shingles
+            self._band_keys[summon_id] = band_keys
+            for bucket, key in zip(self._buckets, band_keys):
+                bucket.setdefault(key, set()).add(summon_id)
+
+    def remove(self, summon_id: str):
+        """召喚IDを削除する"""
+        with self._lock:
+            self._remove_locked(summon_id)
+
+    def find_similar(self, prompt: str, threshold: float) -> Optional[Tuple[str, float]]:
+        """類似度がしきい値以上で最も似た召喚IDと類似度を返す"""
+        shingles = char_ngrams(normalize_prompt(prompt), self.ngram)
+        if not shingles:
+            return None
+        band_keys = self._bands_of(self.signature(shingles))
+
+        with self._lock:
+            candidates = set()
+            for bucket, key in zip(self._buckets, band_keys):
+                candidates.update(bucket.get(key, ()))
+            best: Optional[Tuple[str, float]] = None
+            for summon_id in candidates:
+                score = jaccard(shingles, self._shingles[summon_id])
+                if score >= threshold and (best is None or score > best[1]):
+                    best = (summon_id, score)
+        return best
+
+    def _remove_locked(self, summon_id: str):
+        band_keys = self._band_keys.pop(summon_id, None)
+        if band_keys is None:
+            return
+        del self._shingles[summon_id]
+        for bucket, key in zip(self._buckets, band_keys):
+            members = bucket.get(key)
+            if members is not None:
+                members.discard(summon_id)
+                if not members:
+                    del bucket[key]
+
+
+# グローバルインスタンス
+prompt_index = PromptIndex(ngram=settings.SUMMON_REUSE_NGRAM)
@@ -0,0 +1,300 @@
+"""召喚獣カタログ（インメモリインデックス）"""
+
+import asyncio
+import bisect
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from ..api.models import SummonStatus
+from ..core.config import settings
+
+
+class SummonRecord:
+    """召喚獣一覧用のコンパクトなレコード"""
+
+    __slots__ = ("summon_id", "status", "name", "description", "model_path", "mtime")
+
+    def __init__(self, summon_id: str, status: SummonStatus, name: str, description: str,
+                 model_path: Optional[str], mtime: float):
+        self.summon_id = summon_id
+        self.status = status
+        self.name = name
+        self.description = description
+        self.model_path = model_path
+        self.mtime = mtime
+
+
+class SummonCatalog:
+    """assetsディレクトリの召喚獣をメモリ上に保持するカタログ
+
+    起動時に一度だけ全件を読み込み、以降は FileManager からの更新通知と
+    ディレクトリの更新時刻に基づく差分リフレッシュで最新状態を保つ。
+    """
+
+    DEFAULT_NAME = "不明な召喚獣"
+    DEFAULT_DESCRIPTION = "説明なし"
+
+    # 一覧の1ページの既定件数
+    DEFAULT_PAGE_SIZE = 50
+
+    # 差分リフレッシュで毎回確認する（まだ確定していない）状態
+    ACTIVE_STATUSES = (SummonStatus.PENDING, SummonStatus.GENERATING)
+
+    def __init__(self):
+        self.assets_dir = settings.ASSETS_DIR
+        self._records: Dict[str, SummonRecord] = {}
+        self._order: List[str] = []  # summon_idの昇順
+        self._assets_mtime: Optional[float] = None
+        self._lock = threading.RLock()
+        self._built = False
+        self._version = 0  # レコードが変わるたびに増える（一覧レスポンスのキャッシュ無効化に使う）
+
+    # ------------------------------------------------------------------
+    # 構築・リフレッシュ
+    # ------------------------------------------------------------------
+    def build(self) -> int:
+        """assetsディレクトリを全走査してカタログを構築する"""
+        from .metadata_store import metadata_store
+
+        records = {}
+        assets_mtime = self._stat_mtime(self.assets_dir)
+        # メタデータは1回のクエリでまとめて読み込む
+        summons = {summon["summon_id"]: summon for summon in metadata_store.list_summons()}
+        for summon_id, mtime in self._scan_summon_dirs():
+            summon = summons.get(summon_id)
+            if summon is not None and summon["status"] is not None:
+                records[summon_id] = self._record_from_metadata(summon, mtime)
+            else:
+                records[summon_id] = self._load_record(summon_id, mtime)
+
+        with self._lock:
+            self._records = records
+            self._order = sorted(records)
+            self._assets_mtime = assets_mtime
+            self._built = True
+            self._version += 1
+        print(f"召喚獣カタログを構築しました: {len(records)}件")
+        return len(records)
+
+    def refresh(self) -> int:
+        """ディスク上の変更をカタログへ差分反映する
+
+        assetsディレクトリ自体の更新時刻が変わった場合のみ全ディレクトリを
+        走査し、それ以外は生成中の召喚獣のディレクトリだけを確認する。
+
+        Returns:
+            更新・追加・削除されたレコード数
+        """
+        if not self._built:
+            return self.build()
+
+        assets_mtime = self._stat_mtime(self.assets_dir)
+        with self._lock:
+            assets_changed = assets_mtime != self._assets_mtime
+            known = {summon_id: record.mtime for summon_id, record in self._records.items()}
+            active_ids = [
+                summon_id for summon_id, record in self._records.items()
+                if record.status in self.ACTIVE_STATUSES
+            ]
+
+        if assets_changed:
+            candidates = dict(self._scan_summon_dirs())
+            removed = [summon_id for summon_id in known if summon_id not in candidates]
+        else:
+            candidates = {}
+            for summon_id in active_ids:
+                mtime = self._stat_mtime(self.assets_dir / summon_id)
+                if mtime is not None:
+                    candidates[summon_id] = mtime
+            removed = [summon_id for summon_id in active_ids if summon_id not in candidates]
+
+        changed = [
+            self._load_record(summon_id, mtime)
+            for summon_id, mtime in candidates.items()
+            if known.get(summon_id) != mtime
+        ]
+
+        with self._lock:
+            for record in changed:
+                self._put(record)
+            for summon_id in removed:
+                self._drop(summon_id)
+            self._assets_mtime = assets_mtime
+
+        return len(changed) + len(removed)
+
+    async def run_refresh_loop(self, interval: float):
+        """一定間隔でディスク上の変更を取り込むバックグラウンドループ"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await loop.run_in_executor(None, self.refresh)
+            except Exception as e:
+                print(f"召喚獣カタログ更新エラー: {e}")
+
+    # ------------------------------------------------------------------
+    # FileManagerからの更新通知
+    # ------------------------------------------------------------------
+    def update_status(self, summon_id: str, status: str):
+        """召喚状態の変更を反映する"""
+        if not self._built:
+            return
+        if self._to_status(status) == SummonStatus.COMPLETED:
+            # 完了時は名前・説明・モデルパスを読み直す
+            self.reload(summon_id)
+            return
+
+        with self._lock:
+            record = self._records.get(summon_id)
+            if record is None:
+                record = SummonRecord(summon_id, SummonStatus.PENDING, self.DEFAULT_NAME,
+                                      self.DEFAULT_DESCRIPTION, None, 0.0)
+            record.status = self._to_status(status)
+            record.name = self.DEFAULT_NAME
+            record.description = self.DEFAULT_DESCRIPTION
+            record.model_path = None
+            record.mtime = self._stat_mtime(self.assets_dir / summon_id) or 0.0
+            self._put(record)
+
+    def update_stats(self, summon_id: str, stats: Dict):
+        """ステータス（名前・説明）の変更を反映する"""
+        if not self._built:
+            return
+        with self._lock:
+            record = self._records.get(summon_id)
+            if record is None or record.status != SummonStatus.COMPLETED:
+                return
+            record.name = stats.get("name", self.DEFAULT_NAME)
+            record.description = stats.get("description", self.DEFAULT_DESCRIPTION)
+            self._version += 1
+
+    def reload(self, summon_id: str):
+        """1件分のレコードをディスクから読み直す"""
+        mtime = self._stat_mtime(self.assets_dir / summon_id)
+        with self._lock:
+            if mtime is None:
+                self._drop(summon_id)
+                return
+            self._put(self._load_record(summon_id, mtime))
+
+    def remove(self, summon_id: str):
+        """レコードを削除する"""
+        with self._lock:
+            self._drop(summon_id)
+
+    # ------------------------------------------------------------------
+    # 参照
+    # ------------------------------------------------------------------
+    def page(self, offset: int = 0, limit: Optional[int] = DEFAULT_PAGE_SIZE) -> Tuple[List[SummonRecord], int]:
+        """summon_idの降順で1ページ分のレコードを返す（limit=None なら全件）
+
+        Returns:
+            (レコードリスト, 総件数)
+        """
+        with self._lock:
+            total = len(self._order)
+            end = total - offset
+            if end <= 0:
+                return [], total
+            start = 0 if limit is None else max(0, end - limit)
+            ids = self._order[start:end]
+            return [self._records[summon_id] for summon_id in reversed(ids)], total
+
+    def page_with_version(self, offset: int = 0,
+                          limit: Optional[int] = DEFAULT_PAGE_SIZE) -> Tuple[List[SummonRecord], int, int]:
+        """page と同じレコードを、取得時点のカタログのバージョンと一緒に返す"""
+        with self._lock:
+            records, total = self.page(offset, limit)
+            return records, total, self._version
+
+    @property
+    def version(self) -> int:
+        """カタログのバージョン（レコードの追加・変更・削除のたびに増える）"""
+        return self._version
+
+    def get(self, summon_id: str) -> Optional[SummonRecord]:
+        """レコードを取得する"""
+        with self._lock:
+            return self._records.get(summon_id)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._order)
+
+    # ------------------------------------------------------------------
+    # 内部処理
+    # ------------------------------------------------------------------
+    def _put(self, record: SummonRecord):
+        if record.summon_id not in self._records:
+            bisect.insort(self._order, record.summon_id)
+        self._records[record.summon_id] = record
+        self._version += 1
+
+    def _drop(self, summon_id: str):
+        if self._records.pop(summon_id, None) is not None:
+            index = bisect.bisect_left(self._order, summon_id)
+            if index < len(self._order) and self._order[index] == summon_id:
+                del self._order[index]
+            self._version += 1
+
+    def _scan_summon_dirs(self):
+        """(summon_id, ディレクトリ更新時刻) を列挙する"""
+        try:
+            with os.scandir(self.assets_dir) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir():
+                            yield entry.name, entry.stat().st_mtime
+                    except OSError:
+                        continue
+        except FileNotFoundError:
+            return
+
+    def _load_record(self, summon_id: str, mtime: float) -> SummonRecord:
+        """メタデータストア（なければディスク上のファイル）からレコードを作成する"""
+        from .file_manager import file_manager
+
+        status = self._to_status(file_manager.load_summon_status(summon_id))
+        stats = file_manager.load_stats(summon_id) if status == SummonStatus.COMPLETED else None
+        return self._make_record(summon_id, status, stats, mtime)
+
+    def _record_from_metadata(self, summon: Dict, mtime: float) -> SummonRecord:
+        """メタデータストアの行からレコードを作成する"""
+        status = self._to_status(summon["status"])
+        stats = summon["stats"]
+        if status == SummonStatus.COMPLETED and stats is None:
+            return self._load_record(summon["summon_id"], mtime)
+        return self._make_record(summon["summon_id"], status, stats, mtime)
+
+    def _make_record(self, summon_id: str, status: SummonStatus, stats: Optional[Dict],
+                     mtime: float) -> SummonRecord:
+        name = self.DEFAULT_NAME
+        description = self.DEFAULT_DESCRIPTION
+        model_path = None
+
+        if status == SummonStatus.COMPLETED and stats:
+            name = stats.get("name", name)
+            description = stats.get("description", description)
+            model_path = f"assets/{summon_id}/model.stl"
+
+        return SummonRecord(summon_id, status, name, description, model_path, mtime)
+
+    @staticmethod
+    def _to_status(status_str: str) -> SummonStatus:
+        try:
+            return SummonStatus(status_str)
+        except ValueError:
+            return SummonStatus.FAILED
+
+    @staticmethod
+    def _stat_mtime(path) -> Optional[float]:
+        try:
+            return os.stat(path).st_mtime
+        except OSError:
+            return None
+
+
+# グローバルインスタンス
+summon_catalog = SummonCatalog()
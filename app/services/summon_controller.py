@@ -1,30 +1,34 @@
 """召喚処理コントローラー"""
 
-import asyncio
 import os
+import uuid
 from typing import Optional
 
-from .claude_desktop_client import ClaudeDesktopClient
-from .file_manager import FileManager
+from .dispatch_backends import DispatchBackend, DispatchJob, get_dispatch_backend
+from .summon_watcher import summon_watcher
 from ..core.constants import Timing, PromptTemplates
-from ..core.exceptions import SummonError, ClaudeDesktopError
+from ..core.exceptions import SummonError, ClaudeDesktopError, DispatchError
 
 
 class SummonController:
     """召喚獣生成処理を行うコントローラー"""
     
-    def __init__(self):
-        self.desktop_client = ClaudeDesktopClient()
-        self.file_manager = FileManager()
+    def __init__(self, backend: Optional[DispatchBackend] = None):
+        self.backend = backend or get_dispatch_backend()
         
     async def generate_summon(self, prompt: str, summon_id: str, finish_line: Optional[str] = None) -> bool:
-        """召喚獣を生成する"""
+        """召喚獣を生成する（プロンプトを送信し、ファイルが書き込まれるまで待つ）"""
+        correlation_id = await self.send_summon(prompt, summon_id)
+        return await self.wait_for_summon(summon_id, correlation_id)
+    
+    async def send_summon(self, prompt: str, summon_id: str) -> str:
+        """召喚獣生成のプロンプトを送信する（貼り付けが終われば送信先を解放する）
+        
+        Returns:
+            status.json に書いてもらう相関ID（送信ごとに発行する）
+        """
         try:
-            position = self.desktop_client.load_claude_position()
-            if not position:
-                raise SummonError("Claude Desktopの座標が設定されていません")
-            
-            x, y = position
+            correlation_id = str(uuid.uuid4())
             
             # リポジトリのルートディレクトリを取得
             current_dir = os.getcwd()
@@ -36,35 +40,33 @@ class SummonController:
             claude_prompt = PromptTemplates.SUMMON_TEMPLATE.format(
                 prompt=prompt,
                 summon_id=summon_id,
-                repo_root=repo_root
+                repo_root=repo_root,
+                correlation_id=correlation_id
             )
             
-            # Claude Desktopにメッセージを送信
-            self.desktop_client.send_to_claude_desktop(claude_prompt, x, y)
-            
-            # ファイル生成を待機・確認
-            max_wait_time = Timing.SUMMON_MAX_WAIT_TIME
-            check_interval = Timing.SUMMON_CHECK_INTERVAL
-            elapsed_time = 0
-            
-            while elapsed_time < max_wait_time:
-                await asyncio.sleep(check_interval)
-                elapsed_time += check_interval
-                
-                # ファイルが生成されたかチェック
-                if self.file_manager.check_summon_complete(summon_id):
-                    print(f"召喚完了を確認: {summon_id}")
-                    return True
-                
-                print(f"召喚生成中... ({elapsed_time}秒経過)")
+            # 設定されたバックエンド（Claude Desktopなど）にプロンプトを送信
+            job = DispatchJob(
+                DispatchJob.SUMMON,
+                claude_prompt,
+                summon_id=summon_id,
+                correlation_id=correlation_id,
+                context={"summon_prompt": prompt}
+            )
+            await self.backend.dispatch(job)
             
-            raise SummonError(f"召喚生成タイムアウト: {summon_id}")
+            # 生成はClaude Desktop側で進むため、貼り付けが終わった時点で送信先（Claude Desktop）を解放
+            await self.backend.release(job)
+            return correlation_id
             
         except ClaudeDesktopError:
             # Claude Desktop関連エラーは再発生
             raise
-        except SummonError:
-            # Summon関連エラーは再発生
+        except (SummonError, DispatchError):
+            # Summon・送信バックエンド関連エラーは再発生
             raise
         except Exception as e:
-            raise SummonError(f"召喚生成中に予期しないエラーが発生しました: {e}")
\ No newline at end of file
+            raise SummonError(f"召喚生成中に予期しないエラーが発生しました: {e}")
+    
+    async def wait_for_summon(self, summon_id: str, correlation_id: Optional[str] = None) -> bool:
+        """ファイルの書き込み完了を監視して待機する（完了時に状態もCOMPLETEDへ更新される）"""
+        return await summon_watcher.wait_for_summon(summon_id, Timing.SUMMON_MAX_WAIT_TIME, correlation_id)
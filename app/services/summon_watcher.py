@@ -0,0 +1,286 @@
+"""召喚ファイル監視サービス
+
+召喚IDごとに asyncio.Future を用意し、model.stl と status.json が
+書き込み完了した時点で即座に解決する。Linuxでは inotify を使い、
+それ以外の環境では全召喚をまとめて確認するポーリングにフォールバックする。
+"""
+
+import asyncio
+import ctypes
+import ctypes.util
+import json
+import os
+import struct
+import sys
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from ..api.models import SummonStatus
+from ..core.config import settings
+from ..core.constants import Timing
+from ..core.exceptions import SummonError
+
+# inotify定数（linux/inotify.h）
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_IGNORED = 0x00008000
+_EVENT_HEADER = struct.Struct("iIII")
+
+MODEL_FILE = "model.stl"
+STATS_FILE = "status.json"
+
+
+def is_model_written(model_path: Path) -> bool:
+    """STLファイルが最後まで書き込まれているか判定する
+
+    バイナリSTLはヘッダーの三角形数とファイルサイズが一致すること、
+    ASCII STLは末尾に endsolid があることで判定する。
+    """
+    try:
+        size = model_path.stat().st_size
+        if size < 84:
+            return False
+        with open(model_path, 'rb') as f:
+            header = f.read(84)
+            triangle_count = struct.unpack_from("<I", header, 80)[0]
+            if size == 84 + triangle_count * 50:
+                return True
+            f.seek(max(0, size - 256))
+            return b"endsolid" in f.read()
+    except OSError:
+        return False
+
+
+def is_stats_written(stats_path: Path, correlation_id: Optional[str] = None) -> bool:
+    """status.jsonが完全なJSONとして読めるか判定する
+
+    correlation_id を指定した場合、別の相関IDが書かれたstatus.json（前の送信の結果）は
+    完了とみなさない（相関IDが書かれていなければ従来どおり完了とする）。
+    """
+    try:
+        with open(stats_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if not isinstance(data, dict):
+        return False
+    return correlation_id is None or data.get("correlation_id") in (None, correlation_id)
+
+
+class _Inotify:
+    """ctypes経由の最小限のinotifyラッパー"""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._libc = libc
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1に失敗しました")
+
+    def add_watch(self, path: Path, mask: int) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(str(path)), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watchに失敗しました: {path}")
+        return wd
+
+    def rm_watch(self, wd: int):
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self):
+        """(wd, mask, name) を列挙する"""
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(buffer):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(buffer, offset)
+            offset += _EVENT_HEADER.size
+            name = buffer[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+            offset += length
+            yield wd, mask, name
+
+    def close(self):
+        os.close(self.fd)
+
+
+class SummonWatcher:
+    """召喚の完了を検知して待機中のFutureを解決するウォッチャー"""
+
+    def __init__(self, poll_interval: float = Timing.SUMMON_WATCH_POLL_INTERVAL):
+        self.assets_dir = settings.ASSETS_DIR
+        self.poll_interval = poll_interval
+        self._waiters: Dict[str, asyncio.Future] = {}
+        self._correlation_ids: Dict[str, Optional[str]] = {}  # 召喚IDごとに待っている相関ID
+        self._verifying: Dict[str, asyncio.Task] = {}  # メッシュ検証中の召喚ID
+        self._recheck: Set[str] = set()  # 検証中にファイルが更新された召喚ID
+        self._watch_descriptors: Dict[int, str] = {}
+        self._inotify: Optional[_Inotify] = None
+        self._poll_task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def mode(self) -> str:
+        """現在の監視方式"""
+        if self._inotify is not None:
+            return "inotify"
+        if self._poll_task is not None:
+            return "polling"
+        return "stopped"
+
+    async def start(self):
+        """監視を開始する（inotifyが使えなければポーリング）"""
+        if self._loop is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        if sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify()
+                self._loop.add_reader(self._inotify.fd, self._on_inotify_readable)
+            except Exception as e:
+                print(f"inotifyを利用できないためポーリングで監視します: {e}")
+                self._inotify = None
+        if self._inotify is None:
+            self._poll_task = asyncio.create_task(self._poll_loop())
+        print(f"召喚ファイル監視を開始しました ({self.mode})")
+
+    async def stop(self):
+        """監視を停止し、待機中のFutureをキャンセルする"""
+        if self._inotify is not None:
+            self._loop.remove_reader(self._inotify.fd)
+            self._inotify.close()
+            self._inotify = None
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            self._poll_task = None
+        for future in self._waiters.values():
+            if not future.done():
+                future.cancel()
+        for task in self._verifying.values():
+            task.cancel()
+        self._waiters.clear()
+        self._correlation_ids.clear()
+        self._verifying.clear()
+        self._recheck.clear()
+        self._watch_descriptors.clear()
+        self._loop = None
+
+    def watch(self, summon_id: str, correlation_id: Optional[str] = None) -> asyncio.Future:
+        """召喚IDの監視を登録し、完了時に解決されるFutureを返す
+
+        correlation_id を指定すると、その相関IDが書かれたstatus.jsonだけを完了とする。
+        """
+        self._correlation_ids[summon_id] = correlation_id
+        future = self._waiters.get(summon_id)
+        if future is not None and not future.done():
+            return future
+
+        future = self._loop.create_future()
+        self._waiters[summon_id] = future
+
+        if self._inotify is not None:
+            summon_dir = self.assets_dir / summon_id
+            summon_dir.mkdir(parents=True, exist_ok=True)
+            wd = self._inotify.add_watch(summon_dir, IN_CLOSE_WRITE | IN_MOVED_TO)
+            self._watch_descriptors[wd] = summon_id
+
+        # 登録前に書き込みが終わっている場合に備えて即座に確認
+        self._check(summon_id)
+        return future
+
+    def unwatch(self, summon_id: str):
+        """召喚IDの監視を解除する"""
+        future = self._waiters.pop(summon_id, None)
+        self._correlation_ids.pop(summon_id, None)
+        if future is not None and not future.done():
+            future.cancel()
+        for wd, watched_id in list(self._watch_descriptors.items()):
+            if watched_id == summon_id:
+                del self._watch_descriptors[wd]
+                if self._inotify is not None:
+                    self._inotify.rm_watch(wd)
+
+    async def wait_for_summon(self, summon_id: str, timeout: float, correlation_id: Optional[str] = None) -> bool:
+        """召喚の完了を待機する（correlation_id を指定するとその送信の結果だけを待つ）
+
+        Raises:
+            SummonError: タイムアウトした場合
+        """
+        if self._loop is None:
+            await self.start()
+        future = self.watch(summon_id, correlation_id)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+            return True
+        except asyncio.TimeoutError:
+            raise SummonError(f"召喚生成タイムアウト: {summon_id}")
+        finally:
+            self.unwatch(summon_id)
+
+    def pending_count(self) -> int:
+        """完了待ちの召喚数"""
+        return len(self._waiters)
+
+    def _check(self, summon_id: str):
+        """ファイルの書き込み完了を確認し、完了していればFutureを解決する"""
+        future = self._waiters.get(summon_id)
+        if future is None or future.done():
+            return
+
+        summon_dir = self.assets_dir / summon_id
+        if not (is_model_written(summon_dir / MODEL_FILE)
+                and is_stats_written(summon_dir / STATS_FILE, self._correlation_ids.get(summon_id))):
+            return
+
+        # メッシュ全体の検証はファイルI/O用のスレッドで行う
+        if summon_id in self._verifying:
+            self._recheck.add(summon_id)
+            return
+        self._verifying[summon_id] = asyncio.ensure_future(self._complete(summon_id, future))
+
+    async def _complete(self, summon_id: str, future: asyncio.Future):
+        """メッシュ全体を検証し mesh.json を書き出してから完了とする"""
+        from .file_manager import async_file_manager
+
+        try:
+            if not await async_file_manager.check_summon_complete(summon_id):
+                return
+            # 完了を検知した時点で状態を更新する
+            await async_file_manager.save_summon_status(summon_id, SummonStatus.COMPLETED.value)
+            print(f"召喚完了を確認: {summon_id}")
+            if not future.done():
+                future.set_result(True)
+        finally:
+            self._verifying.pop(summon_id, None)
+            if summon_id in self._recheck:
+                self._recheck.discard(summon_id)
+                self._check(summon_id)
+
+    def _on_inotify_readable(self):
+        changed = set()
+        for wd, mask, name in self._inotify.read_events():
+            summon_id = self._watch_descriptors.get(wd)
+            if summon_id is None:
+                continue
+            if mask & IN_IGNORED:
+                # ディレクトリが削除された
+                del self._watch_descriptors[wd]
+                continue
+            if name in (MODEL_FILE, STATS_FILE):
+                changed.add(summon_id)
+        for summon_id in changed:
+            self._check(summon_id)
+
+    async def _poll_loop(self):
+        """ポーリングによるフォールバック監視（全召喚を1つのタスクで確認）"""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            for summon_id in list(self._waiters):
+                try:
+                    self._check(summon_id)
+                except Exception as e:
+                    print(f"召喚ファイル確認エラー {summon_id}: {e}")
+
+
+# グローバルインスタンス
+summon_watcher = SummonWatcher()
@@ -1,6 +1,36 @@
 import * as THREE from 'three';
 import { OrbitControls } from 'three/examples/jsm/controls/OrbitControls.js';
 import { STLLoader } from 'three/examples/jsm/loaders/STLLoader.js';
+import { ModelBounds } from './types.js';
+
+// .qmesh形式（app/services/mesh_format.py）の定数
+const QMESH_MAGIC = 'QMSH';
+const QMESH_VERSION = 1;
+const QMESH_HEADER_SIZE = 44;
+const QMESH_FLAG_NORMALS = 0x1;
+const QMESH_FLAG_INDEX32 = 0x2;
+
+const align4 = (size: number): number => size + ((4 - size % 4) % 4);
+
+/**
+ * オクタヘドラル符号化された法線（int8 x 2）を単位ベクトルに戻す
+ */
+function decodeOctahedralNormals(packed: Int8Array, vertexCount: number): Float32Array {
+    const normals = new Float32Array(vertexCount * 3);
+    for (let i = 0; i < vertexCount; i++) {
+        let x = packed[i * 2] / 127;
+        let y = packed[i * 2 + 1] / 127;
+        const z = 1 - Math.abs(x) - Math.abs(y);
+        const t = Math.max(-z, 0);
+        x -= x >= 0 ? t : -t;
+        y -= y >= 0 ? t : -t;
+        const length = Math.hypot(x, y, z) || 1;
+        normals[i * 3] = x / length;
+        normals[i * 3 + 1] = y / length;
+        normals[i * 3 + 2] = z / length;
+    }
+    return normals;
+}
 
 /**
  * 3Dビューアークラス
@@ -79,7 +109,103 @@ export class ThreeJSViewer {
         this.scene.add(directionalLight2);
     }
 
-    public async loadSTL(modelPath: string): Promise<void> {
+    /**
+     * モデルを読み込む（.qmeshを優先し、失敗したら同名のSTLで表示）
+     * bounds（mesh.json / lod.json のバウンディングボックス）があればジオメトリを走査しない
+     */
+    public async loadModel(modelPath: string, bounds?: ModelBounds): Promise<void> {
+        if (modelPath.endsWith('.qmesh')) {
+            try {
+                await this.loadQMesh(modelPath);
+                return;
+            } catch (error) {
+                console.warn('qmeshの読み込みに失敗したためSTLで表示します:', error);
+                return this.loadSTL(modelPath.replace(/\.qmesh$/, '.stl'), bounds);
+            }
+        }
+        return this.loadSTL(modelPath, bounds);
+    }
+
+    /**
+     * 量子化インデックス形式（.qmesh）を読み込む
+     * 各バッファは解析せずにそのまま BufferGeometry に渡し、
+     * 量子化の復元はメッシュの拡大率と位置で行う
+     */
+    public async loadQMesh(modelPath: string): Promise<void> {
+        const response = await fetch(modelPath);
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        const buffer = await response.arrayBuffer();
+        if (buffer.byteLength < QMESH_HEADER_SIZE) {
+            throw new Error('qmeshのヘッダーが不正です');
+        }
+
+        const header = new DataView(buffer, 0, QMESH_HEADER_SIZE);
+        const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+        if (magic !== QMESH_MAGIC || header.getUint16(4, true) !== QMESH_VERSION) {
+            throw new Error('qmesh形式ではありません');
+        }
+        const flags = header.getUint16(6, true);
+        const vertexCount = header.getUint32(8, true);
+        const indexCount = header.getUint32(12, true);
+        const min = [header.getFloat32(16, true), header.getFloat32(20, true), header.getFloat32(24, true)];
+        const max = [header.getFloat32(28, true), header.getFloat32(32, true), header.getFloat32(36, true)];
+        const quantScale = header.getFloat32(40, true);
+
+        const geometry = new THREE.BufferGeometry();
+        let offset = QMESH_HEADER_SIZE;
+
+        // 位置: 正規化したuint16（0〜1の範囲として扱われる）
+        const positions = new Uint16Array(buffer, offset, vertexCount * 3);
+        geometry.setAttribute('position', new THREE.BufferAttribute(positions, 3, true));
+        offset += align4(positions.byteLength);
+
+        if (flags & QMESH_FLAG_NORMALS) {
+            const packed = new Int8Array(buffer, offset, vertexCount * 2);
+            geometry.setAttribute('normal', new THREE.BufferAttribute(decodeOctahedralNormals(packed, vertexCount), 3));
+            offset += align4(packed.byteLength);
+        }
+
+        const indices = flags & QMESH_FLAG_INDEX32
+            ? new Uint32Array(buffer, offset, indexCount)
+            : new Uint16Array(buffer, offset, indexCount);
+        geometry.setIndex(new THREE.BufferAttribute(indices, 1));
+
+        if (!(flags & QMESH_FLAG_NORMALS)) {
+            // 量子化は全軸共通の刻み幅なので、正規化座標のまま法線を計算できる
+            geometry.computeVertexNormals();
+        }
+
+        // バウンディングボックスはヘッダーから求める（頂点の走査は不要）
+        const extent = new THREE.Vector3(max[0] - min[0], max[1] - min[1], max[2] - min[2]);
+        const normalizedExtent = extent.clone().divideScalar(quantScale || 1);
+        geometry.boundingBox = new THREE.Box3(new THREE.Vector3(0, 0, 0), normalizedExtent);
+        geometry.boundingSphere = new THREE.Sphere(
+            normalizedExtent.clone().multiplyScalar(0.5),
+            normalizedExtent.length() / 2
+        );
+
+        this.clearModel();
+        const material = new THREE.MeshLambertMaterial({
+            color: 0xffaa88,
+            side: THREE.DoubleSide
+        });
+        this.model = new THREE.Mesh(geometry, material);
+        this.model.castShadow = true;
+        this.model.receiveShadow = true;
+
+        // 中央配置とスケーリング（STLと同じく最大辺を30にそろえる）
+        const scale = 30 / Math.max(extent.x, extent.y, extent.z, 1e-9);
+        this.model.scale.setScalar(quantScale * scale);
+        this.model.position.copy(extent).multiplyScalar(-0.5 * scale);
+
+        if (this.scene) {
+            this.scene.add(this.model);
+        }
+    }
+
+    public async loadSTL(modelPath: string, bounds?: ModelBounds): Promise<void> {
         return new Promise((resolve, reject) => {
             const loader = new STLLoader();
             
@@ -100,7 +226,7 @@ export class ThreeJSViewer {
                     this.model.receiveShadow = true;
 
                     // モデルの中央配置とスケーリング
-                    this.centerAndScaleModel(geometry);
+                    this.centerAndScaleModel(geometry, bounds);
 
                     if (this.scene) {
                         this.scene.add(this.model);
@@ -118,9 +244,29 @@ export class ThreeJSViewer {
         });
     }
 
-    private centerAndScaleModel(geometry: THREE.BufferGeometry): void {
+    private centerAndScaleModel(geometry: THREE.BufferGeometry, bounds?: ModelBounds): void {
         if (!this.model) return;
 
+        if (bounds) {
+            // サーバーで計算済みのバウンディングボックスを使い、頂点は動かさずに
+            // メッシュの位置と拡大率で中央配置する
+            const box = new THREE.Box3(
+                new THREE.Vector3(bounds.min[0], bounds.min[1], bounds.min[2]),
+                new THREE.Vector3(bounds.max[0], bounds.max[1], bounds.max[2])
+            );
+            geometry.boundingBox = box;
+            geometry.boundingSphere = box.getBoundingSphere(new THREE.Sphere());
+
+            const center = new THREE.Vector3();
+            box.getCenter(center);
+            const size = new THREE.Vector3();
+            box.getSize(size);
+            const scale = 30 / Math.max(size.x, size.y, size.z, 1e-9);
+            this.model.scale.setScalar(scale);
+            this.model.position.copy(center).multiplyScalar(-scale);
+            return;
+        }
+
         // バウンディングボックスの計算
         geometry.computeBoundingBox();
         const box = geometry.boundingBox;
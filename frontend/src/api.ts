@@ -3,13 +3,16 @@ import {
     SummonResponse, 
     SummonStatusResponse, 
     AttackResponse, 
+    BattleState,
+    BattleAttackResponse,
     FinishResponse, 
     CreatureStats, 
     MCPResult, 
     MCPResultStatus,
+    ModelSource,
     SummonBattleAPI as ISummonBattleAPI
 } from './types.js';
-import { MCP_CONFIG } from './constants.js';
+import { MCP_CONFIG, UI_CONFIG } from './constants.js';
 
 /**
  * API通信クラス
@@ -22,11 +25,12 @@ export class SummonBattleAPI implements ISummonBattleAPI {
     }
 
     /**
-     * 召喚獣リスト取得
+     * 召喚獣リスト取得（offset から limit 件。総件数は total で返る）
      */
-    async getSummonsList(): Promise<SummonListResponse | null> {
+    async getSummonsList(offset: number = 0, limit: number = UI_CONFIG.SUMMON_LIST_PAGE_SIZE): Promise<SummonListResponse | null> {
         try {
-            const response = await fetch(`${this.baseURL}/summons`);
+            const params = new URLSearchParams({ offset: offset.toString(), limit: limit.toString() });
+            const response = await fetch(`${this.baseURL}/summons?${params.toString()}`);
             
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
@@ -52,6 +56,10 @@ export class SummonBattleAPI implements ISummonBattleAPI {
                 body: JSON.stringify({ prompt })
             });
             
+            if (response.status === 429) {
+                // 生成キューが満杯（Retry-After 秒後に再試行できる）
+                throw new Error(`召喚キューが混み合っています（${response.headers.get('Retry-After')}秒後に再試行してください）`);
+            }
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
@@ -81,17 +89,61 @@ export class SummonBattleAPI implements ISummonBattleAPI {
         }
     }
 
+    /**
+     * 生成待ち・生成中の召喚を取り消す
+     */
+    async cancelSummon(summonId: string): Promise<SummonResponse | null> {
+        try {
+            const response = await fetch(`${this.baseURL}/summons/${summonId}`, { method: 'DELETE' });
+            
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            
+            return await response.json() as SummonResponse;
+        } catch (error) {
+            console.error('召喚取り消しエラー:', error);
+            return null;
+        }
+    }
+
+    /**
+     * 表示先に合ったモデルファイルを取得
+     * （三角形数が上限以内で最も詳細なLOD。.qmeshがあればそちらを優先し、
+     *   LOD未生成なら元のSTL）。バウンディングボックスが分かれば一緒に返す
+     */
+    async getModelSource(summonId: string, maxTriangles: number = Infinity): Promise<ModelSource> {
+        const status = await this.getSummonStatus(summonId);
+        const lods = status?.lods;
+        if (!lods || lods.length === 0) {
+            const mesh = status?.mesh;
+            return {
+                path: `/assets/${summonId}/model.stl`,
+                bounds: mesh ? { min: mesh.bbox_min, max: mesh.bbox_max } : undefined
+            };
+        }
+        
+        const fitting = lods.filter(lod => lod.triangles <= maxTriangles);
+        const chosen = fitting.length > 0
+            ? fitting.reduce((best, lod) => lod.triangles > best.triangles ? lod : best)
+            : lods.reduce((best, lod) => lod.triangles < best.triangles ? lod : best);
+        return {
+            path: `/${chosen.qmesh || chosen.path}`,
+            bounds: chosen.bbox_min && chosen.bbox_max ? { min: chosen.bbox_min, max: chosen.bbox_max } : undefined
+        };
+    }
+
     /**
      * 攻撃リクエスト
      */
-    async attack(prompt: string, me: CreatureStats, enemy: CreatureStats): Promise<AttackResponse | null> {
+    async attack(prompt: string, me: CreatureStats, enemy: CreatureStats, correlationId?: string): Promise<AttackResponse | null> {
         try {
             const response = await fetch(`${this.baseURL}/battle/attack`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                 },
-                body: JSON.stringify({ prompt, me, enemy })
+                body: JSON.stringify({ prompt, me, enemy, correlationId })
             });
             
             if (!response.ok) {
@@ -105,6 +157,83 @@ export class SummonBattleAPI implements ISummonBattleAPI {
         }
     }
 
+    /**
+     * サーバー側のバトルを作成（召喚IDがあればサーバーでステータスを読み込む）
+     */
+    async createBattle(summonIds: string[] | null, creatures: CreatureStats[]): Promise<BattleState | null> {
+        try {
+            const response = await fetch(`${this.baseURL}/battles`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify(summonIds ? { summonIds } : { creatures })
+            });
+            
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            
+            return await response.json() as BattleState;
+        } catch (error) {
+            console.error('バトル作成エラー:', error);
+            return null;
+        }
+    }
+
+    /**
+     * サーバー側のバトルの状態を取得
+     */
+    async getBattle(battleId: string): Promise<BattleState | null> {
+        try {
+            const response = await fetch(`${this.baseURL}/battles/${battleId}`);
+            
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            
+            return await response.json() as BattleState;
+        } catch (error) {
+            console.error('バトル状態取得エラー:', error);
+            return null;
+        }
+    }
+
+    /**
+     * バトルIDを指定した攻撃（ダメージはサーバー側で適用される）
+     */
+    async attackInBattle(battleId: string, prompt: string, correlationId?: string): Promise<BattleAttackResponse | null> {
+        try {
+            const response = await fetch(`${this.baseURL}/battles/${battleId}/attack`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({ prompt, correlationId })
+            });
+            
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            
+            return await response.json() as BattleAttackResponse;
+        } catch (error) {
+            console.error('バトル攻撃リクエストエラー:', error);
+            return null;
+        }
+    }
+
+    /**
+     * サーバー側のバトルを削除
+     */
+    async deleteBattle(battleId: string): Promise<void> {
+        try {
+            await fetch(`${this.baseURL}/battles/${battleId}`, { method: 'DELETE' });
+        } catch (error) {
+            console.error('バトル削除エラー:', error);
+        }
+    }
+
     /**
      * 勝負決着
      */
@@ -130,42 +259,44 @@ export class SummonBattleAPI implements ISummonBattleAPI {
     }
 
     /**
-     * MCP結果をポーリング
+     * MCP結果をロングポーリングで取得
+     *
+     * サーバー側で結果が届くまで待機するため、通常は1攻撃につき1リクエストで済む。
+     * 待機時間の合計は maxAttempts × interval ミリ秒。
      */
-    async pollMCPResult(maxAttempts: number = MCP_CONFIG.MAX_ATTEMPTS, interval: number = MCP_CONFIG.POLL_INTERVAL, onProgress?: (attempt: number, maxAttempts: number) => void): Promise<MCPResult | null> {
+    async pollMCPResult(maxAttempts: number = MCP_CONFIG.MAX_ATTEMPTS, interval: number = MCP_CONFIG.POLL_INTERVAL, onProgress?: (attempt: number, maxAttempts: number) => void, correlationId?: string): Promise<MCPResult | null> {
+        const totalTime = maxAttempts * interval;
+        const startTime = Date.now();
+        const progressTimer = setInterval(() => {
+            if (onProgress) {
+                onProgress(Math.min(Math.ceil((Date.now() - startTime) / interval), maxAttempts), maxAttempts);
+            }
+        }, interval);
+
         try {
-            console.log(`MCPポーリング開始: 最大${maxAttempts}回試行、${interval}ms間隔`);
+            console.log(`MCPロングポーリング開始: 最大${totalTime}ms待機`);
             
-            for (let attempt = 0; attempt < maxAttempts; attempt++) {
-                console.log(`MCPポーリング試行 ${attempt + 1}/${maxAttempts}`);
-                
-                // プログレスコールバックを呼び出し
-                if (onProgress) {
-                    onProgress(attempt + 1, maxAttempts);
+            let remaining = totalTime;
+            while (remaining > 0) {
+                const waitSeconds = Math.max(1, Math.floor(Math.min(remaining, MCP_CONFIG.LONG_POLL_WAIT) / 1000));
+                const params = new URLSearchParams({ wait: waitSeconds.toString() });
+                if (correlationId) {
+                    params.set('correlation_id', correlationId);
                 }
                 
-                // MCP結果の状態確認
-                const statusResponse = await fetch(`${this.baseURL}/mcp/result/status`);
-                if (statusResponse.ok) {
-                    const status = await statusResponse.json() as MCPResultStatus;
-                    console.log('MCP状態:', status);
-                    
-                    if (status.has_result) {
-                        console.log('MCP結果が見つかりました。取得中...');
-                        // 結果を取得
-                        const resultResponse = await fetch(`${this.baseURL}/mcp/result`);
-                        if (resultResponse.ok) {
-                            const result = await resultResponse.json() as MCPResult;
-                            console.log('MCP結果取得成功:', result);
-                            return result;
-                        }
-                    }
+                const requestStart = Date.now();
+                const resultResponse = await fetch(`${this.baseURL}/mcp/result?${params.toString()}`);
+                if (resultResponse.ok) {
+                    const result = await resultResponse.json() as MCPResult;
+                    console.log('MCP結果取得成功:', result);
+                    return result;
                 }
                 
-                // 最後の試行でない場合のみ待機
-                if (attempt < maxAttempts - 1) {
+                // 待機せずに即座に返ってきた場合（エラー等）は間隔を空けて再試行
+                if (Date.now() - requestStart < interval) {
                     await new Promise(resolve => setTimeout(resolve, interval));
                 }
+                remaining = totalTime - (Date.now() - startTime);
             }
             
             console.log('MCPポーリングタイムアウト');
@@ -173,9 +304,84 @@ export class SummonBattleAPI implements ISummonBattleAPI {
         } catch (error) {
             console.error('MCP結果ポーリングエラー:', error);
             return null;
+        } finally {
+            clearInterval(progressTimer);
+        }
+    }
+
+    /**
+     * MCP結果をプッシュ配信（Server-Sent Events）で待機
+     *
+     * プッシュチャネルが利用できない場合は null を返さずに例外を投げるため、
+     * 呼び出し側でポーリングにフォールバックできる。
+     */
+    subscribeMCPResult(timeout: number = MCP_CONFIG.PUSH_TIMEOUT, onProgress?: (elapsed: number, total: number) => void, correlationId?: string): Promise<MCPResult | null> {
+        return new Promise((resolve, reject) => {
+            if (typeof EventSource === 'undefined') {
+                reject(new Error('EventSourceが利用できません'));
+                return;
+            }
+
+            const source = new EventSource(`${this.baseURL}/mcp/result/stream${this.correlationQuery(correlationId)}`);
+            const totalSeconds = Math.ceil(timeout / 1000);
+            let elapsed = 0;
+            let received = false;
+
+            const finish = (): void => {
+                clearInterval(progressTimer);
+                clearTimeout(timeoutTimer);
+                source.close();
+            };
+
+            const progressTimer = setInterval(() => {
+                elapsed++;
+                if (onProgress) {
+                    onProgress(Math.min(elapsed, totalSeconds), totalSeconds);
+                }
+            }, 1000);
+
+            const timeoutTimer = setTimeout(() => {
+                console.log('MCPプッシュ待機タイムアウト');
+                finish();
+                resolve(null);
+            }, timeout);
+
+            source.addEventListener('result', (event: MessageEvent) => {
+                received = true;
+                finish();
+                const result = JSON.parse(event.data) as MCPResult;
+                console.log('MCP結果プッシュ受信:', result);
+                resolve(result);
+            });
+
+            source.onerror = () => {
+                if (received) return;
+                console.warn('MCPプッシュチャネルでエラーが発生しました');
+                finish();
+                reject(new Error('MCPプッシュチャネルに接続できません'));
+            };
+        });
+    }
+
+    /**
+     * MCP結果を待機（プッシュ配信を優先し、失敗時のみポーリング）
+     */
+    async waitForMCPResult(correlationId?: string, onProgress?: (attempt: number, maxAttempts: number) => void): Promise<MCPResult | null> {
+        try {
+            return await this.subscribeMCPResult(MCP_CONFIG.PUSH_TIMEOUT, onProgress, correlationId);
+        } catch (error) {
+            console.warn('プッシュ配信が使えないためポーリングに切り替えます:', error);
+            return await this.pollMCPResult(MCP_CONFIG.MAX_ATTEMPTS, MCP_CONFIG.POLL_INTERVAL, onProgress, correlationId);
         }
     }
 
+    /**
+     * 相関IDのクエリ文字列を作成
+     */
+    private correlationQuery(correlationId?: string): string {
+        return correlationId ? `?correlation_id=${encodeURIComponent(correlationId)}` : '';
+    }
+
     /**
      * MCP結果送信（攻撃プロンプト用）
      */
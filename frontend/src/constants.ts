@@ -4,6 +4,8 @@
 export const MCP_CONFIG = {
     MAX_ATTEMPTS: 30,
     POLL_INTERVAL: 1000, // 1秒
+    PUSH_TIMEOUT: 30000, // プッシュ配信の待機上限（30秒）
+    LONG_POLL_WAIT: 25000, // ロングポーリング1リクエストあたりの待機上限（25秒）
     TIMEOUT_MESSAGE: 'MCP結果のポーリングがタイムアウトしました'
 } as const;
 
@@ -17,5 +19,12 @@ export const GAME_CONFIG = {
 // UI関連定数
 export const UI_CONFIG = {
     BATTLE_LOG_MAX_ENTRIES: 50,
-    FADE_DURATION: 300
-} as const;
\ No newline at end of file
+    FADE_DURATION: 300,
+    SUMMON_LIST_PAGE_SIZE: 50 // 召喚獣リストを1回に取得する件数
+} as const;
+
+// 3Dモデル関連定数（表示先ごとに読み込む三角形数の上限）
+export const MODEL_CONFIG = {
+    BATTLE_MAX_TRIANGLES: 50000,
+    WINNER_MAX_TRIANGLES: Infinity
+} as const;
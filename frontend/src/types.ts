@@ -11,29 +11,89 @@ export interface SummonListItem {
     summonId: string;
     name: string;
     description: string;
-    status: 'pending' | 'generating' | 'completed' | 'failed';
+    status: 'pending' | 'generating' | 'completed' | 'failed' | 'cancelled';
     models?: string;
 }
 
 export interface SummonListResponse {
     summons: SummonListItem[];
+    total: number;
 }
 
 export interface SummonResponse {
     summonId: string;
-    status: 'pending' | 'generating' | 'completed' | 'failed';
+    status: 'pending' | 'generating' | 'completed' | 'failed' | 'cancelled';
     message: string;
+    similarSummonId?: string | null;
+    similarity?: number | null;
+}
+
+export interface ModelBounds {
+    min: number[];
+    max: number[];
+}
+
+export interface ModelSource {
+    path: string;
+    bounds?: ModelBounds;
+}
+
+export interface MeshInfo {
+    triangles: number;
+    bbox_min: number[];
+    bbox_max: number[];
+    center: number[];
+    centroid: number[];
+    surface_area: number;
+}
+
+export interface ModelLOD {
+    level: number;
+    ratio: number;
+    path: string;
+    triangles: number;
+    bytes: number;
+    qmesh?: string;
+    qmesh_bytes?: number;
+    bbox_min?: number[];
+    bbox_max?: number[];
 }
 
 export interface SummonStatusResponse {
     summonId: string;
-    status: 'pending' | 'generating' | 'completed' | 'failed';
+    status: 'pending' | 'generating' | 'completed' | 'failed' | 'cancelled';
     models?: string;
     stats?: CreatureStats;
+    lods?: ModelLOD[] | null;
+    mesh?: MeshInfo | null;
+    queuePosition?: number | null;  // 生成キューの順番（0は生成中）
+    etaSeconds?: number | null;     // 生成完了までの目安時間（秒）
 }
 
 export interface AttackResponse {
     result: AttackResultData;
+    correlationId?: string;
+    pending?: boolean;
+    mcpResult?: MCPResult | null;
+}
+
+export interface BattleState {
+    battleId: string;
+    names: string[];
+    hp: number[];
+    maxHp: number[];
+    turn: number;
+    currentTurn: 1 | 2;
+    winner: 1 | 2 | null;
+    pendingCorrelationId?: string | null;
+    lastResult?: AttackResultData | null;
+}
+
+export interface BattleAttackResponse {
+    battle: BattleState;
+    result: AttackResultData;
+    correlationId: string;
+    pending: boolean;
 }
 
 export interface FinishResponse {
@@ -95,6 +155,7 @@ export interface AttackResultData {
 
 export interface MCPResult {
     execution_id: string;
+    correlation_id?: string | null;
     timestamp: string;
     result_type: string;
     data: any;
@@ -117,10 +178,12 @@ export interface GameState {
         1: string | null;
         2: string | null;
     };
+    battleId?: string | null;
 }
 
 export interface ThreeJSViewer {
-    loadSTL(path: string): Promise<void>;
+    loadModel(path: string, bounds?: ModelBounds): Promise<void>;
+    loadSTL(path: string, bounds?: ModelBounds): Promise<void>;
     setModelColor(color: number): void;
     clearModel(): void;
 }
@@ -132,12 +195,20 @@ export interface ViewerInstances {
 
 // 前方宣言
 export interface SummonBattleAPI {
-    getSummonsList(): Promise<SummonListResponse | null>;
+    getSummonsList(offset?: number, limit?: number): Promise<SummonListResponse | null>;
     createSummon(prompt: string): Promise<SummonResponse | null>;
     getSummonStatus(summonId: string): Promise<SummonStatusResponse | null>;
-    attack(prompt: string, me: CreatureStats, enemy: CreatureStats): Promise<AttackResponse | null>;
+    cancelSummon(summonId: string): Promise<SummonResponse | null>;
+    getModelSource(summonId: string, maxTriangles?: number): Promise<ModelSource>;
+    attack(prompt: string, me: CreatureStats, enemy: CreatureStats, correlationId?: string): Promise<AttackResponse | null>;
+    createBattle(summonIds: string[] | null, creatures: CreatureStats[]): Promise<BattleState | null>;
+    getBattle(battleId: string): Promise<BattleState | null>;
+    attackInBattle(battleId: string, prompt: string, correlationId?: string): Promise<BattleAttackResponse | null>;
+    deleteBattle(battleId: string): Promise<void>;
     finishBattle(summonId: string): Promise<FinishResponse | null>;
-    pollMCPResult(maxAttempts?: number, interval?: number): Promise<MCPResult | null>;
+    pollMCPResult(maxAttempts?: number, interval?: number, onProgress?: (attempt: number, maxAttempts: number) => void, correlationId?: string): Promise<MCPResult | null>;
+    subscribeMCPResult(timeout?: number, onProgress?: (elapsed: number, total: number) => void, correlationId?: string): Promise<MCPResult | null>;
+    waitForMCPResult(correlationId?: string, onProgress?: (attempt: number, maxAttempts: number) => void): Promise<MCPResult | null>;
     sendMCPResult(resultData: any): Promise<any>;
     getMCPResultStatus(): Promise<MCPResultStatus | null>;
 }
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+APIの負荷試験・レイテンシ計測スクリプト
+
+スタブバックエンド（Claude Desktopの代わり）でFastAPIアプリを起動し、
+合成した召喚獣ツリー（デフォルト: 100 / 10,000 / 100,000体）に対して
+フロントエンドと同じアクセスパターンの並行負荷をかける。
+エンドポイントごとの p50/p95/p99 レイテンシ、リクエスト/秒、メモリ使用量を
+JSONファイルに出力する。
+
+使用例:
+python scripts/benchmark_api.py
+python scripts/benchmark_api.py --sizes 100,10000 --concurrency 16 --duration 10 --output bench.json
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import socket
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import requests
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+CREATURE = {
+    "name": "ベンチマーク獣",
+    "hp": 500,
+    "specialMove": "計測の一撃",
+    "description": "負荷試験用の召喚獣"
+}
+
+
+def seed_assets(work_dir: Path, size: int) -> List[str]:
+    """合成した召喚獣ツリーを作成する"""
+    assets_dir = work_dir / "assets"
+    assets_dir.mkdir(parents=True, exist_ok=True)
+    stl = b"\0" * 80 + struct.pack("<I", 0)
+    summon_ids = []
+    for i in range(size):
+        summon_id = str(uuid.UUID(int=random.getrandbits(128)))
+        summon_dir = assets_dir / summon_id
+        summon_dir.mkdir()
+        with open(summon_dir / "summon_status.json", 'w', encoding='utf-8') as f:
+            json.dump({"summon_id": summon_id, "status": "completed", "created_at": time.time()}, f)
+        with open(summon_dir / "status.json", 'w', encoding='utf-8') as f:
+            json.dump({**CREATURE, "name": f"ベンチマーク獣{i}", "victoryComment": "計測完了！"}, f, ensure_ascii=False)
+        with open(summon_dir / "model.stl", 'wb') as f:
+            f.write(stl)
+        summon_ids.append(summon_id)
+    return summon_ids
+
+
+def write_config(work_dir: Path, attack_latency: float):
+    """スタブバックエンドを使う設定ファイルを作成する"""
+    config_dir = work_dir / "config"
+    config_dir.mkdir(exist_ok=True)
+    with open(REPO_ROOT / "config" / "app_config.json", 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    config["server"]["debug"] = False
+    config.setdefault("dispatch", {})["backend"] = "stub"
+    config["dispatch"]["stub"] = {"summon_latency": 1.0, "attack_latency": attack_latency}
+    with open(config_dir / "app_config.json", 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+
+
+def current_rss_mb() -> float:
+    """現在のプロセスの常駐メモリ（MB）"""
+    try:
+        with open("/proc/self/status", 'r') as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # /procがない環境では最大常駐メモリで代用
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def start_server(port: int):
+    """uvicornをバックグラウンドスレッドで起動する"""
+    import uvicorn
+
+    config = uvicorn.Config("app.main:app", host="127.0.0.1", port=port, log_level="warning", access_log=False)
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 120
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("サーバーの起動がタイムアウトしました")
+        time.sleep(0.05)
+    return server, thread
+
+
+def run_workload(name: str, action: Callable[[requests.Session], bool], concurrency: int,
+                 duration: float) -> Dict[str, Any]:
+    """指定した並行数で一定時間アクションを繰り返し、統計を返す"""
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    rss_before = current_rss_mb()
+    stop_at = time.perf_counter() + duration
+
+    def worker():
+        session = requests.Session()
+        local_latencies = []
+        local_errors = 0
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            try:
+                ok = action(session)
+            except requests.RequestException:
+                ok = False
+            local_latencies.append((time.perf_counter() - started) * 1000)
+            if not ok:
+                local_errors += 1
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(worker)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "endpoint": name,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mean_ms": round(statistics.fmean(latencies), 2) if latencies else 0.0,
+        "rss_mb_before": round(rss_before, 1),
+        "rss_mb_after": round(current_rss_mb(), 1)
+    }
+
+
+def build_workloads(base_url: str, summon_ids: List[str]) -> Dict[str, Callable[[requests.Session], bool]]:
+    """フロントエンドのアクセスパターンを模したワークロードを作成する"""
+
+    def summons_list(session):
+        return session.get(f"{base_url}/api/summons", timeout=60).ok
+
+    def summons_page(session):
+        return session.get(f"{base_url}/api/summons", params={"limit": 50}, timeout=60).ok
+
+    def summon_detail(session):
+        return session.get(f"{base_url}/api/summons/{random.choice(summon_ids)}", timeout=60).ok
+
+    def battle_attack(session):
+        correlation_id = str(uuid.uuid4())
+        response = session.post(f"{base_url}/api/battle/attack", json={
+            "prompt": random.choice(["炎の剣", "氷の槍", "雷撃", "回復の光"]),
+            "me": CREATURE,
+            "enemy": CREATURE,
+            "correlationId": correlation_id
+        }, timeout=120)
+        return response.ok
+
+    def battle_finish(session):
+        return session.post(f"{base_url}/api/battle/finish",
+                            json={"summon_id": random.choice(summon_ids)}, timeout=60).ok
+
+    def mcp_save_attack(session):
+        return session.post(f"{base_url}/api/mcp/results/attack", json={
+            "comment": "ベンチマーク攻撃",
+            "attacker": {"damage": 0},
+            "defender": {"damage": -10},
+            "correlation_id": str(uuid.uuid4())
+        }, timeout=60).ok
+
+    def mcp_status_poll(session):
+        # 旧フロントエンドの status → result のポーリング1回分
+        status = session.get(f"{base_url}/api/mcp/result/status", timeout=60)
+        if not status.ok:
+            return False
+        if status.json().get("has_result"):
+            session.get(f"{base_url}/api/mcp/result", timeout=60)
+        return True
+
+    def mcp_roundtrip(session):
+        # 保存した結果を相関IDで取り出す（現行フロントエンドの1攻撃分）
+        correlation_id = str(uuid.uuid4())
+        session.post(f"{base_url}/api/mcp/results/attack", json={
+            "comment": "ベンチマーク攻撃",
+            "attacker": {"damage": 0},
+            "defender": {"damage": -10},
+            "correlation_id": correlation_id
+        }, timeout=60)
+        return session.get(f"{base_url}/api/mcp/result",
+                           params={"correlation_id": correlation_id, "wait": 5}, timeout=60).ok
+
+    return {
+        "GET /api/summons": summons_list,
+        "GET /api/summons?limit=50": summons_page,
+        "GET /api/summons/{id}": summon_detail,
+        "POST /api/battle/attack": battle_attack,
+        "POST /api/battle/finish": battle_finish,
+        "POST /api/mcp/results/attack": mcp_save_attack,
+        "GET /api/mcp/result/status + result": mcp_status_poll,
+        "MCP save + GET /api/mcp/result": mcp_roundtrip
+    }
+
+
+def run_tree_size(args) -> Dict[str, Any]:
+    """1つのツリーサイズについて計測する（子プロセスで実行）"""
+    work_dir = Path(tempfile.mkdtemp(prefix=f"mcp-bench-{args.tree_size}-"))
+    try:
+        write_config(work_dir, args.attack_latency)
+        print(f"[{args.tree_size}] 召喚獣ツリーを作成中...", file=sys.stderr)
+        seed_started = time.perf_counter()
+        summon_ids = seed_assets(work_dir, args.tree_size)
+        seed_time = time.perf_counter() - seed_started
+
+        os.chdir(work_dir)
+        sys.path.insert(0, str(REPO_ROOT))
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+
+        rss_before_start = current_rss_mb()
+        startup_started = time.perf_counter()
+        server, thread = start_server(port)
+        startup_time = time.perf_counter() - startup_started
+
+        base_url = f"http://127.0.0.1:{port}"
+        workloads = build_workloads(base_url, summon_ids)
+        selected = args.endpoints.split(",") if args.endpoints else list(workloads)
+
+        results = []
+        for name in selected:
+            print(f"[{args.tree_size}] {name} を計測中...", file=sys.stderr)
+            result = run_workload(name, workloads[name], args.concurrency, args.duration)
+            result["tree_size"] = args.tree_size
+            results.append(result)
+
+        server.should_exit = True
+        thread.join(10)
+
+        return {
+            "tree_size": args.tree_size,
+            "seed_seconds": round(seed_time, 2),
+            "startup_seconds": round(startup_time, 2),
+            "rss_mb_before_startup": round(rss_before_start, 1),
+            "results": results
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(
+        description="APIの負荷試験・レイテンシ計測",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+使用例:
+  python scripts/benchmark_api.py
+  python scripts/benchmark_api.py --sizes 100 --duration 3
+  python scripts/benchmark_api.py --endpoints "GET /api/summons,GET /api/summons/{id}"
+        """
+    )
+    parser.add_argument("--sizes", default="100,10000,100000", help="召喚獣ツリーのサイズ（カンマ区切り）")
+    parser.add_argument("--concurrency", type=int, default=8, help="並行クライアント数")
+    parser.add_argument("--duration", type=float, default=10.0, help="エンドポイントごとの計測時間（秒）")
+    parser.add_argument("--attack-latency", type=float, default=0.2, help="スタブバックエンドの攻撃結果遅延（秒）")
+    parser.add_argument("--endpoints", default="", help="計測するワークロード名（カンマ区切り、省略時はすべて）")
+    parser.add_argument("--output", default="bench_output.json", help="結果の出力先JSONファイル")
+    parser.add_argument("--tree-size", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # 子プロセスモード: 1サイズ分を計測して結果ファイルにJSONを書く
+    # （アプリのログが標準出力に出るためファイル経由で受け渡す）
+    if args.tree_size is not None:
+        result = run_tree_size(args)
+        with open(args.result_file, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False)
+        return
+
+    runs = []
+    for size in [int(value) for value in args.sizes.split(",") if value]:
+        result_file = Path(tempfile.mkstemp(prefix="mcp-bench-", suffix=".json")[1])
+        command = [
+            sys.executable, str(Path(__file__).resolve()),
+            "--tree-size", str(size),
+            "--concurrency", str(args.concurrency),
+            "--duration", str(args.duration),
+            "--attack-latency", str(args.attack_latency),
+            "--endpoints", args.endpoints,
+            "--result-file", str(result_file)
+        ]
+        try:
+            subprocess.run(command, stdout=subprocess.DEVNULL, check=True)
+            with open(result_file, 'r', encoding='utf-8') as f:
+                runs.append(json.load(f))
+        finally:
+            result_file.unlink()
+
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "concurrency": args.concurrency,
+        "duration_seconds": args.duration,
+        "runs": runs
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    for run in runs:
+        print(f"\n== 召喚獣 {run['tree_size']}体 (起動 {run['startup_seconds']}秒) ==")
+        for result in run["results"]:
+            print(f"  {result['endpoint']:<40} {result['rps']:>9} req/s  "
+                  f"p50 {result['p50_ms']:>8}ms  p95 {result['p95_ms']:>8}ms  p99 {result['p99_ms']:>8}ms  "
+                  f"errors {result['errors']}")
+    print(f"\n結果を保存しました: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
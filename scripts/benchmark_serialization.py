@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+召喚獣一覧レスポンスのシリアライズ性能を比較するマイクロベンチマーク
+
+合成した召喚獣カタログ（デフォルト: 100 / 10,000体）に対して、
+GET /api/summons の本文を作る3つの方法を比較する。
+
+- pydantic: 従来の方法（SummonListItemを1件ずつ作成し、FastAPIと同じく
+  model_dump してから標準の json でエンコード）
+- fast: 辞書から直接 orjson（なければ標準 json）でエンコード
+- cached: カタログのバージョンが変わらない間のキャッシュヒット（エンコード済みの本文を返す）
+
+gzip圧縮した場合のサイズと圧縮時間も表示する。
+
+使用例:
+python scripts/benchmark_serialization.py
+python scripts/benchmark_serialization.py --sizes 1000,100000 --repeat 20 --output serialization.json
+"""
+
+import argparse
+import gzip
+import json
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+
+def build_catalog(size: int):
+    """ディスクを使わずに合成したレコードでカタログを作る"""
+    from app.api.models import SummonStatus
+    from app.services.summon_catalog import SummonCatalog, SummonRecord
+
+    catalog = SummonCatalog()
+    with catalog._lock:
+        for i in range(size):
+            summon_id = str(uuid.UUID(int=i + 1))
+            catalog._put(SummonRecord(
+                summon_id, SummonStatus.COMPLETED, f"ベンチマーク獣{i}", "負荷試験用の召喚獣",
+                f"assets/{summon_id}/model.stl", 0.0
+            ))
+        catalog._built = True
+    return catalog
+
+
+def measure(function: Callable[[], bytes], repeat: int) -> Dict[str, float]:
+    """関数の実行時間（ミリ秒）を計測する"""
+    function()  # ウォームアップ
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {"median_ms": round(statistics.median(timings), 3), "min_ms": round(min(timings), 3)}
+
+
+def run(size: int, repeat: int) -> Dict[str, Dict[str, float]]:
+    """1つのカタログサイズについて各方法を計測する"""
+    from app.api.models import SummonListItem, SummonListResponse
+    from app.api.responses import GZIP_LEVEL, EncodedPayload, orjson
+
+    catalog = build_catalog(size)
+
+    def pydantic_path() -> bytes:
+        records, total = catalog.page(0, None)
+        response = SummonListResponse(summons=[
+            SummonListItem(
+                summonId=record.summon_id,
+                name=record.name,
+                description=record.description,
+                status=record.status,
+                models=record.model_path
+            )
+            for record in records
+        ], total=total)
+        content = response.model_dump(mode="json")
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None,
+                          separators=(",", ":")).encode("utf-8")
+
+    def encode_page() -> EncodedPayload:
+        records, total, _ = catalog.page_with_version(0, None)
+        return EncodedPayload({
+            "summons": [
+                {
+                    "summonId": record.summon_id,
+                    "name": record.name,
+                    "description": record.description,
+                    "status": record.status.value,
+                    "models": record.model_path
+                }
+                for record in records
+            ],
+            "total": total
+        })
+
+    cached = {"version": catalog.version, "payload": encode_page()}
+
+    def cached_path() -> bytes:
+        if cached["version"] != catalog.version:
+            cached["payload"] = encode_page()
+        return cached["payload"].body
+
+    body = pydantic_path()
+    assert json.loads(body) == json.loads(encode_page().body), "出力が一致しません"
+
+    payload = encode_page()
+    results = {
+        "pydantic": measure(pydantic_path, repeat),
+        "fast": measure(lambda: encode_page().body, repeat),
+        "cached": measure(cached_path, repeat),
+        "gzip": measure(lambda: gzip.compress(payload.body, compresslevel=GZIP_LEVEL, mtime=0), repeat)
+    }
+    results["sizes"] = {"json_bytes": len(payload.body), "gzip_bytes": len(payload.gzipped)}
+    results["encoder"] = "orjson" if orjson is not None else "json"
+    return results
+
+
+def print_table(results: Dict[int, Dict]):
+    """結果を表形式で表示する"""
+    print(f"{'件数':>8} {'pydantic(ms)':>14} {'fast(ms)':>10} {'cached(ms)':>11} {'高速化':>8} {'JSON':>10} {'gzip':>10}")
+    for size, result in results.items():
+        speedup = result["pydantic"]["median_ms"] / max(result["fast"]["median_ms"], 1e-6)
+        print(
+            f"{size:>8} {result['pydantic']['median_ms']:>14.3f} {result['fast']['median_ms']:>10.3f} "
+            f"{result['cached']['median_ms']:>11.4f} {speedup:>7.1f}x "
+            f"{result['sizes']['json_bytes']:>10} {result['sizes']['gzip_bytes']:>10}"
+        )
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="召喚獣一覧レスポンスのシリアライズ性能比較")
+    parser.add_argument("--sizes", default="100,10000", help="カタログのサイズ（カンマ区切り）")
+    parser.add_argument("--repeat", type=int, default=10, help="計測回数")
+    parser.add_argument("--output", help="結果の出力先JSONファイル")
+    args = parser.parse_args()
+
+    sizes: List[int] = [int(size) for size in args.sizes.split(",") if size]
+    results = {size: run(size, args.repeat) for size in sizes}
+    print_table(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"結果を保存しました: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
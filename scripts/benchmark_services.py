@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+リクエストごとのサービス作成のオーバーヘッドを計測するベンチマーク
+
+POST /api/battle/attack を、スタブバックエンドでプロセス内（ASGI）から呼び出し、
+次の2つの方法で（交互に呼び出して）比較する。
+
+- per_request: 従来の方法（リクエストごとに ClaudeController を作成し、
+  召喚・バトル・MCPの各コントローラーと送信バックエンドも作り直す）
+- shared: 起動時（lifespan）に作成したサービスを Depends で注入する
+
+コントローラーの作成そのものと、依存関係の解決にかかる時間も個別に表示する。
+攻撃は非同期モード（?async=true）で呼び出し、スタブの遅延は0にして、
+フレームワークとサービス作成の時間だけを比べる。
+
+使用例:
+python scripts/benchmark_services.py
+python scripts/benchmark_services.py --requests 5000 --output services.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+CREATURE = {"name": "ベンチマーク獣", "hp": 500, "specialMove": "ベンチマーク・ブレス", "description": "負荷試験用の召喚獣"}
+
+
+def summarize(timings: List[float]) -> Dict[str, float]:
+    """計測結果（マイクロ秒）の要約"""
+    ordered = sorted(timings)
+    return {
+        "median_us": round(statistics.median(ordered), 1),
+        "p95_us": round(ordered[int(len(ordered) * 0.95) - 1], 1),
+        "mean_us": round(statistics.mean(ordered), 1)
+    }
+
+
+def measure_calls(function: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """同期関数の1回あたりの実行時間（マイクロ秒）を計測する"""
+    function()  # ウォームアップ
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1e6)
+    return summarize(timings)
+
+
+async def measure_attacks(app, requests: int, use_shared: Callable[[bool], None]) -> Dict[str, Dict[str, float]]:
+    """攻撃APIを2つの方法で交互に呼び出し、1リクエストあたりの時間（マイクロ秒）を計測する
+
+    交互に呼び出すことで、MCP結果の蓄積などによる時間の変化が両方に同じだけ乗るようにする。
+    """
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    timings = {"attack_per_request": [], "attack_shared": []}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(2 * (requests + 50)):
+            shared = i % 2 == 1
+            use_shared(shared)
+            # 呪文を毎回変えて攻撃結果キャッシュに当たらないようにする
+            body = {"prompt": f"ベンチマーク攻撃{i}", "me": CREATURE, "enemy": CREATURE}
+            started = time.perf_counter()
+            response = await client.post("/api/battle/attack?async=true", json=body)
+            elapsed = (time.perf_counter() - started) * 1e6
+            if response.status_code != 200:
+                raise RuntimeError(f"攻撃APIが失敗しました: {response.status_code} {response.text}")
+            if i >= 100:  # 最初の50件ずつはウォームアップ
+                timings["attack_shared" if shared else "attack_per_request"].append(elapsed)
+    return {name: summarize(values) for name, values in timings.items()}
+
+
+async def run(args) -> Dict[str, Dict[str, float]]:
+    from app.core.config import settings
+
+    # スタブの遅延をなくし、サービス作成とフレームワークの時間だけを計測する
+    settings.DISPATCH_BACKEND = "stub"
+    settings.DISPATCH_CONFIG = {**settings.DISPATCH_CONFIG, "stub": {"summon_latency": 0, "attack_latency": 0}}
+
+    from fastapi import Request
+
+    from app.api.deps import get_claude_controller, get_services, init_services
+    from app.main import app
+    from app.services.claude_controller import ClaudeController
+    from app.services.dispatch_backends import create_dispatch_backend
+
+    settings.prepare()
+    init_services(app)
+
+    class FakeRequest:
+        def __init__(self, application):
+            self.app = application
+
+    def per_request_controller() -> ClaudeController:
+        """従来の方法: 送信バックエンドを含めてリクエストごとに作成する"""
+        return ClaudeController(create_dispatch_backend(settings.DISPATCH_BACKEND, settings.DISPATCH_CONFIG))
+
+    request = FakeRequest(app)
+    results = {
+        "construct_controller": measure_calls(per_request_controller, args.repeat),
+        "resolve_dependency": measure_calls(lambda: get_claude_controller(request), args.repeat)
+    }
+
+    mode = {"shared": False}
+
+    def select_controller(request: Request) -> ClaudeController:
+        if mode["shared"]:
+            return get_services(request).claude_controller
+        return per_request_controller()
+
+    app.dependency_overrides[get_claude_controller] = select_controller
+    results.update(await measure_attacks(app, args.requests, lambda shared: mode.update(shared=shared)))
+    app.dependency_overrides.clear()
+
+    # 残っているスタブのMCP結果の保存を待ってから終了する
+    await asyncio.sleep(0.1)
+    return results
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="リクエストごとのサービス作成のオーバーヘッドを計測")
+    parser.add_argument("--requests", type=int, default=2000, help="攻撃APIの呼び出し回数（方法ごと）")
+    parser.add_argument("--repeat", type=int, default=10000, help="作成・依存解決の計測回数")
+    parser.add_argument("--output", help="結果の出力先JSONファイル")
+    args = parser.parse_args()
+
+    # 合成データはリポジトリを汚さないよう一時ディレクトリに作る
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        results = asyncio.run(run(args))
+        from app.services.metadata_store import metadata_store
+        metadata_store.flush()
+        os.chdir(REPO_ROOT)
+
+    print(f"{'計測対象':<22} {'中央値(us)':>12} {'p95(us)':>10} {'平均(us)':>10}")
+    for name, summary in results.items():
+        print(f"{name:<22} {summary['median_us']:>12.1f} {summary['p95_us']:>10.1f} {summary['mean_us']:>10.1f}")
+    saved = results["attack_per_request"]["mean_us"] - results["attack_shared"]["mean_us"]
+    print(f"\n1リクエストあたりの削減: {saved:.1f} us")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"結果を保存しました: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
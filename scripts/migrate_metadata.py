@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+既存の assets/ ツリーをメタデータストア（SQLite）へ移行するスクリプト
+
+召喚獣ごとの summon_status.json / status.json / prompt.json と
+assets/mcp_results/*.json を1回でデータベースへ取り込む。
+既にデータベースにある行は上書きしない。モデルファイル（model.stl など）はそのまま残す。
+
+サーバーは起動時に未移行であれば同じ処理を自動で行うため、
+このスクリプトは起動前にまとめて移行したい場合や、移行後に古いJSONを削除したい場合に使う。
+
+使用例:
+python scripts/migrate_metadata.py
+python scripts/migrate_metadata.py --assets assets --db data/metadata.db --remove-json
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+# 移行後は使われなくなるファイル（status.json はClaude Desktopの出力として残す）
+LEGACY_SUMMON_FILES = ("summon_status.json", "prompt.json")
+
+
+def remove_legacy_files(assets_dir: Path) -> int:
+    """移行済みのJSONファイルを削除する"""
+    removed = 0
+    for name in LEGACY_SUMMON_FILES:
+        for path in assets_dir.glob(f"*/{name}"):
+            path.unlink()
+            removed += 1
+    for path in (assets_dir / "mcp_results").glob("*.json"):
+        path.unlink()
+        removed += 1
+    return removed
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="assets/ のJSONメタデータをSQLiteへ移行")
+    parser.add_argument("--assets", help="assetsディレクトリ（省略時は設定ファイルの値）")
+    parser.add_argument("--db", help="データベースファイル（省略時は設定ファイルの値）")
+    parser.add_argument("--remove-json", action="store_true", help="移行後に summon_status.json / prompt.json / mcp_results/*.json を削除")
+    args = parser.parse_args()
+
+    from app.core.config import settings
+    from app.services.metadata_store import MetadataStore
+
+    assets_dir = Path(args.assets) if args.assets else settings.ASSETS_DIR
+    db_path = Path(args.db) if args.db else settings.METADATA_DB_PATH
+    if not assets_dir.is_dir():
+        print(f"assetsディレクトリが見つかりません: {assets_dir}")
+        sys.exit(1)
+
+    store = MetadataStore(db_path, batch_size=settings.METADATA_BATCH_SIZE, synchronous=settings.METADATA_SYNCHRONOUS)
+    started = time.perf_counter()
+    imported = store.import_assets(assets_dir)
+    elapsed = time.perf_counter() - started
+    print(f"移行しました: 召喚獣 {imported['summons']}件 / MCP結果 {imported['results']}件 ({elapsed:.2f}秒) -> {db_path}")
+
+    if args.remove_json:
+        print(f"古いJSONファイルを削除しました: {remove_legacy_files(assets_dir)}件")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+起動時のインポート時間を計測し、予算内に収まっているか確認するスクリプト
+
+`python -X importtime -c "import app.main"` を空の作業ディレクトリで --runs 回実行して、
+以下を確認する（CIなどで使えるよう、違反があれば終了コード1で終了する）。
+
+- app パッケージ内のモジュール自身のインポート時間の合計が予算（--budget-ms）以内であること
+  （FastAPI などの依存ライブラリの時間はマシンや負荷で大きく変わるため含めない。
+  各回の合計のうち最も小さい値で判定する）
+- app.main の累積のインポート時間（最も速かった回）が予算（--total-budget-ms、0 なら判定しない）以内であること
+- GUI自動化・クリップボード・NumPy（--forbid）がインポート時に読み込まれないこと
+- インポートしただけでディレクトリやファイルが作成されないこと
+
+インポート時間の大きいモジュールの一覧も表示する。
+
+使用例:
+python scripts/profile_import.py
+python scripts/profile_import.py --budget-ms 300 --total-budget-ms 1500 --runs 5 --top 30 --output import_profile.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+DEFAULT_FORBIDDEN = "pyautogui,pyperclip,numpy"
+DEFAULT_BUDGET_MS = 500.0
+DEFAULT_TOTAL_BUDGET_MS = 2000.0
+
+
+def profile_once(module: str) -> Tuple[List[Dict], List[str]]:
+    """空の作業ディレクトリで1回インポートし、(計測結果, 作成されたファイル) を返す"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        env = {**os.environ, "PYTHONPATH": str(REPO_ROOT), "PYTHONDONTWRITEBYTECODE": "1"}
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=work_dir, env=env, capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"{module} のインポートに失敗しました:\n{completed.stderr[-2000:]}")
+        created = sorted(os.listdir(work_dir))
+    return parse_importtime(completed.stderr), created
+
+
+def parse_importtime(output: str) -> List[Dict]:
+    """-X importtime の出力を [{"module", "self_us", "cumulative_us", "depth"}] に変換する"""
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # ヘッダー行
+        name = fields[2]
+        entries.append({
+            "module": name.strip(),
+            "self_us": int(fields[0]),
+            "cumulative_us": int(fields[1]),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2
+        })
+    return entries
+
+
+def total_us(entries: List[Dict], module: str) -> int:
+    """対象モジュールの累積インポート時間"""
+    for entry in entries:
+        if entry["module"] == module:
+            return entry["cumulative_us"]
+    return 0
+
+
+def own_us(entries: List[Dict], module: str) -> int:
+    """対象モジュールのパッケージ内のモジュール自身のインポート時間の合計"""
+    package = module.split(".")[0]
+    return sum(entry["self_us"] for entry in entries if entry["module"].split(".")[0] == package)
+
+
+def print_report(entries: List[Dict], module: str, top: int):
+    """インポート時間の大きいモジュールと、アプリケーション自身のモジュールを表示する"""
+    print(f"{module}: {total_us(entries, module) / 1000:.1f} ms（{module.split('.')[0]} パッケージ自身 "
+          f"{own_us(entries, module) / 1000:.1f} ms）")
+    print(f"\n累積時間の大きいモジュール（上位{top}件）")
+    print(f"{'累積(ms)':>10} {'自身(ms)':>10}  モジュール")
+    for entry in sorted(entries, key=lambda e: e["cumulative_us"], reverse=True)[:top]:
+        print(f"{entry['cumulative_us'] / 1000:>10.1f} {entry['self_us'] / 1000:>10.1f}  {entry['module']}")
+
+    package = module.split(".")[0]
+    own = [entry for entry in entries if entry["module"].split(".")[0] == package]
+    print(f"\n{package} パッケージ内のモジュール（自身の時間順）")
+    for entry in sorted(own, key=lambda e: e["self_us"], reverse=True)[:top]:
+        print(f"{entry['cumulative_us'] / 1000:>10.1f} {entry['self_us'] / 1000:>10.1f}  {entry['module']}")
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="起動時のインポート時間の計測と予算チェック")
+    parser.add_argument("--module", default="app.main", help="計測するモジュール")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="パッケージ内のモジュール自身のインポート時間の合計の予算（ミリ秒）")
+    parser.add_argument("--total-budget-ms", type=float, default=DEFAULT_TOTAL_BUDGET_MS,
+                        help="インポート時間（累積）の予算（ミリ秒、0 なら判定しない）")
+    parser.add_argument("--runs", type=int, default=5, help="計測回数（最も速かった回で判定する）")
+    parser.add_argument("--top", type=int, default=20, help="表示するモジュール数")
+    parser.add_argument("--forbid", default=DEFAULT_FORBIDDEN, help="インポート時に読み込んではいけないモジュール（カンマ区切り）")
+    parser.add_argument("--output", help="結果の出力先JSONファイル")
+    args = parser.parse_args()
+
+    runs = [profile_once(args.module) for _ in range(max(1, args.runs))]
+    entries, created = min(runs, key=lambda run: total_us(run[0], args.module))
+    print_report(entries, args.module, args.top)
+
+    imported = {entry["module"] for entry in entries}
+    forbidden = [name for name in args.forbid.split(",") if name and name in imported]
+    elapsed_ms = total_us(entries, args.module) / 1000
+    own_ms = min(own_us(run[0], args.module) for run in runs) / 1000
+
+    failures = []
+    if own_ms > args.budget_ms:
+        failures.append(f"パッケージ自身のインポート時間が予算を超えています: {own_ms:.1f} ms > {args.budget_ms:.1f} ms")
+    if args.total_budget_ms and elapsed_ms > args.total_budget_ms:
+        failures.append(f"インポート時間が予算を超えています: {elapsed_ms:.1f} ms > {args.total_budget_ms:.1f} ms")
+    if forbidden:
+        failures.append(f"インポート時に読み込まれたモジュールがあります: {', '.join(forbidden)}")
+    if created:
+        failures.append(f"インポート時にファイルが作成されました: {', '.join(created)}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                "module": args.module,
+                "elapsed_ms": elapsed_ms,
+                "own_ms": own_ms,
+                "budget_ms": args.budget_ms,
+                "total_budget_ms": args.total_budget_ms,
+                "runs_ms": [total_us(run[0], args.module) / 1000 for run in runs],
+                "runs_own_ms": [own_us(run[0], args.module) / 1000 for run in runs],
+                "forbidden_imported": forbidden,
+                "created_files": created,
+                "entries": entries
+            }, f, ensure_ascii=False, indent=2)
+
+    print()
+    if failures:
+        for failure in failures:
+            print(f"NG: {failure}")
+        sys.exit(1)
+    print(f"OK: パッケージ自身 {own_ms:.1f} ms（予算 {args.budget_ms:.1f} ms）、累積 {elapsed_ms:.1f} ms、"
+          f"禁止モジュールなし、ファイル作成なし")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+記録したバトルをイベントログから再生するスクリプト（分析・デバッグ・負荷試験用）
+
+イベントログ（event_log.dir のセグメント、またはサーバーの GET /api/events/export）を読み込み、
+バトルごとに次のどちらかで再生する。
+
+- ローカル再生（デフォルト）: battle_created の召喚獣からバトルを作り直し、記録した攻撃結果
+  （attack_applied）をバトルエンジン（BattleSession.apply）で順に適用する。適用後のHP・ターン・
+  勝者を記録と比較し、食い違いがあれば終了コード1
+- サーバー再生（--target）: 記録した召喚獣で POST /api/battles を行い、適用された攻撃の
+  攻撃呪文を POST /api/battles/{id}/attack へ順に送り直す。--concurrency 件のバトルを並行して
+  再生し、攻撃1回あたりのレイテンシと記録との差（ダメージ・勝者）を集計する
+
+使用例:
+python scripts/replay_battle.py --battle 3f2b...
+python scripts/replay_battle.py --all --output replay.json
+python scripts/replay_battle.py --all --source http://localhost:8000
+python scripts/replay_battle.py --all --target http://localhost:8000 --concurrency 16 --repeat 10
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from app.services.battle_events import (  # noqa: E402
+    ATTACK_APPLIED, ATTACK_REQUESTED, BATTLE_CREATED, read_events
+)
+from app.services.battle_sessions import BattleSession  # noqa: E402
+
+
+def load_events(source: str, from_seq: int) -> Iterator[Dict[str, Any]]:
+    """イベントを読み込む（source はセグメントのディレクトリかサーバーのURL）"""
+    if source.startswith(("http://", "https://")):
+        import requests
+
+        with requests.get(f"{source.rstrip('/')}/api/events/export", params={"from_seq": from_seq},
+                          stream=True, timeout=60) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+    else:
+        yield from read_events(Path(source), from_seq=from_seq)
+
+
+def group_battles(events: Iterator[Dict[str, Any]], battle_id: Optional[str]) -> "OrderedDict[str, List[Dict[str, Any]]]":
+    """バトルごとのイベント（作成順）"""
+    battles: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+    for event in events:
+        if event.get("battle_id") is None or (battle_id is not None and event["battle_id"] != battle_id):
+            continue
+        battles.setdefault(event["battle_id"], []).append(event)
+    return battles
+
+
+def replay_local(battle_id: str, events: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """記録した攻撃結果をバトルエンジンで適用し、記録した状態と比較する"""
+    created = next((event for event in events if event["type"] == BATTLE_CREATED), None)
+    report: Dict[str, Any] = {"battle_id": battle_id, "events": len(events), "complete": created is not None,
+                              "attacks": 0, "winner": None, "divergences": []}
+    if created is None:
+        # セグメントの削除などで作成イベントが残っていない
+        return report
+
+    session = BattleSession(battle_id, created["creatures"], created["summon_ids"])
+    for event in events:
+        if event["type"] != ATTACK_APPLIED:
+            continue
+        session.apply(event["result"])
+        report["attacks"] += 1
+        expected = {"hp": event["hp"], "turn": event["turn"], "current": event["current"], "winner": event["winner"]}
+        actual = {"hp": list(session.hp), "turn": session.turn, "current": session.current, "winner": session.winner}
+        if actual != expected:
+            report["divergences"].append({"seq": event["seq"], "expected": expected, "actual": actual})
+    report["winner"] = session.winner + 1 if session.winner is not None else None
+    report["hp"] = session.hp
+    return report
+
+
+def replay_target(base_url: str, battle_id: str, events: List[Dict[str, Any]], timeout: float) -> Dict[str, Any]:
+    """記録したバトルをサーバーで作り直し、適用された攻撃の攻撃呪文を順に送り直す"""
+    import requests
+
+    created = next((event for event in events if event["type"] == BATTLE_CREATED), None)
+    report: Dict[str, Any] = {"battle_id": battle_id, "complete": created is not None, "attacks": 0,
+                              "latencies_ms": [], "damage_mismatches": 0, "errors": 0, "winner": None}
+    if created is None:
+        return report
+
+    # 結果が適用された攻撃だけを送り直す（取り消された・上書きされた攻撃は除く）
+    applied = {event["correlation_id"]: event for event in events if event["type"] == ATTACK_APPLIED}
+    attacks = [(event, applied[event["correlation_id"]]) for event in events
+               if event["type"] == ATTACK_REQUESTED and event["correlation_id"] in applied]
+
+    session = requests.Session()
+    response = session.post(f"{base_url}/api/battles", json={"creatures": created["creatures"]}, timeout=timeout)
+    response.raise_for_status()
+    new_id = response.json()["battleId"]
+    try:
+        for requested, recorded in attacks:
+            started = time.perf_counter()
+            try:
+                response = session.post(f"{base_url}/api/battles/{new_id}/attack",
+                                        json={"prompt": requested["prompt"]}, timeout=timeout)
+            except requests.RequestException:
+                report["errors"] += 1
+                break
+            report["latencies_ms"].append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                report["errors"] += 1
+                break
+            body = response.json()
+            report["attacks"] += 1
+            result = body["result"]
+            if (result["attacker"]["damage"] != recorded["result"]["attacker"]["damage"]
+                    or result["defender"]["damage"] != recorded["result"]["defender"]["damage"]):
+                report["damage_mismatches"] += 1
+            report["winner"] = body["battle"]["winner"]
+            if report["winner"] is not None:
+                break
+    finally:
+        session.delete(f"{base_url}/api/battles/{new_id}", timeout=timeout)
+    recorded_winner = next((event["winner"] for event in reversed(events)
+                            if event["type"] == ATTACK_APPLIED and event["winner"] is not None), None)
+    report["recorded_winner"] = recorded_winner + 1 if recorded_winner is not None else None
+    return report
+
+
+def percentile(ordered: List[float], ratio: float) -> float:
+    return round(ordered[max(0, int(len(ordered) * ratio) - 1)], 1) if ordered else 0.0
+
+
+def summarize(reports: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    """再生結果の集計"""
+    complete = [report for report in reports if report["complete"]]
+    finished = [report for report in complete if report["winner"] is not None]
+    summary = {
+        "battles": len(reports),
+        "complete": len(complete),
+        "finished": len(finished),
+        "attacks": sum(report["attacks"] for report in reports),
+        "wins": {str(side): sum(1 for report in finished if report["winner"] == side) for side in (1, 2)},
+        "avg_turns": round(statistics.mean([report["attacks"] for report in finished]), 2) if finished else 0,
+        "elapsed_seconds": round(elapsed, 3)
+    }
+    if any("divergences" in report for report in reports):
+        summary["divergent"] = sum(1 for report in reports if report.get("divergences"))
+    if any("latencies_ms" in report for report in reports):
+        latencies = sorted(value for report in reports for value in report["latencies_ms"])
+        summary.update({
+            "errors": sum(report["errors"] for report in reports),
+            "damage_mismatches": sum(report["damage_mismatches"] for report in reports),
+            "winner_mismatches": sum(1 for report in finished if report["winner"] != report["recorded_winner"]),
+            "attacks_per_second": round(len(latencies) / elapsed, 1) if elapsed > 0 else 0,
+            "p50_ms": percentile(latencies, 0.5),
+            "p95_ms": percentile(latencies, 0.95),
+            "p99_ms": percentile(latencies, 0.99)
+        })
+    return summary
+
+
+def main():
+    """メイン処理"""
+    from app.core.config import settings
+
+    parser = argparse.ArgumentParser(
+        description="記録したバトルをイベントログから再生する",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+使用例:
+  python scripts/replay_battle.py --battle <バトルID>
+  python scripts/replay_battle.py --all --source http://localhost:8000 --output replay.json
+  python scripts/replay_battle.py --all --target http://localhost:8000 --concurrency 16 --repeat 10
+        """
+    )
+    selection = parser.add_mutually_exclusive_group(required=True)
+    selection.add_argument("--battle", help="再生するバトルID")
+    selection.add_argument("--all", action="store_true", help="記録されているすべてのバトルを再生する")
+    parser.add_argument("--source", default=str(settings.EVENT_LOG_DIR),
+                        help="イベントログのディレクトリ、またはサーバーのURL（一括エクスポートから読み込む）")
+    parser.add_argument("--from-seq", type=int, default=0, help="この seq 以降のイベントだけを読み込む")
+    parser.add_argument("--target", help="攻撃呪文を送り直すサーバーのURL（省略時はローカル再生）")
+    parser.add_argument("--concurrency", type=int, default=8, help="サーバー再生で並行して再生するバトル数")
+    parser.add_argument("--repeat", type=int, default=1, help="サーバー再生で各バトルを再生する回数")
+    parser.add_argument("--timeout", type=float, default=60.0, help="サーバー再生のリクエストのタイムアウト（秒）")
+    parser.add_argument("--output", help="バトルごとの結果と集計を書き出すJSONファイル")
+    args = parser.parse_args()
+
+    battles = group_battles(load_events(args.source, args.from_seq), args.battle)
+    if not battles:
+        print("再生できるバトルがありません")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    if args.target:
+        base_url = args.target.rstrip("/")
+        jobs = [item for item in battles.items() for _ in range(args.repeat)]
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            reports = list(executor.map(
+                lambda item: replay_target(base_url, item[0], item[1], args.timeout), jobs
+            ))
+    else:
+        reports = [replay_local(battle_id, events) for battle_id, events in battles.items()]
+    summary = summarize(reports, time.perf_counter() - started)
+
+    for report in reports:
+        if report.get("divergences"):
+            for divergence in report["divergences"]:
+                print(f"  {report['battle_id']} seq {divergence['seq']}: "
+                      f"記録 {divergence['expected']} / 再生 {divergence['actual']}")
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+    if args.output:
+        for report in reports:
+            report.pop("latencies_ms", None)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"summary": summary, "battles": reports}, f, ensure_ascii=False, indent=2)
+        print(f"結果を保存しました: {args.output}")
+
+    if summary.get("divergent"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
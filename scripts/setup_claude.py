@@ -1,35 +1,44 @@
-import pyautogui
+import argparse
 import time
 import json
 import os
-import pyperclip
+import sys
 
 # Configuration file to store Claude Desktop position
 CONFIG_FILE = "config/claude_desktop_config.json"
 
-def save_claude_position():
+def capture_position():
     """
-    Save Claude Desktop position to config file
+    Wait for the user to point at Claude Desktop's chat input and return the mouse position
     """
+    import pyautogui
+
     print("Please click on Claude Desktop's chat input area to save its position...")
     print("You have 5 seconds to click...")
-    
+
     # Countdown
     for i in range(5, 0, -1):
         print(i)
         time.sleep(1)
-    
+
     # Get current mouse position
     x, y = pyautogui.position()
-    
+    return x, y
+
+def save_claude_position():
+    """
+    Save Claude Desktop position to config file
+    """
+    x, y = capture_position()
+
     # Create config directory if it doesn't exist
     os.makedirs(os.path.dirname(CONFIG_FILE), exist_ok=True)
-    
+
     # Save to config file
     config = {"x": x, "y": y}
     with open(CONFIG_FILE, 'w') as f:
         json.dump(config, f)
-    
+
     print(f"Claude Desktop position saved: ({x}, {y})")
     return x, y
 
@@ -37,21 +46,120 @@ def load_claude_position():
     """
     Load Claude Desktop position from config file
     """
-    if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, 'r') as f:
-            config = json.load(f)
-        return config["x"], config["y"]
+    endpoints = load_endpoints()
+    for endpoint in endpoints:
+        if endpoint.get("type", "gui") == "gui":
+            return endpoint["x"], endpoint["y"]
     return None
 
+def load_endpoints():
+    """
+    Load the registered endpoints (a single legacy {"x", "y"} becomes the "default" endpoint)
+    """
+    if not os.path.exists(CONFIG_FILE):
+        return []
+    with open(CONFIG_FILE, 'r') as f:
+        config = json.load(f)
+    if "endpoints" in config:
+        return config["endpoints"]
+    return [{"id": "default", "type": "gui", "x": config["x"], "y": config["y"]}]
+
+def save_endpoints(endpoints):
+    """
+    Save the endpoint list to config file
+    """
+    os.makedirs(os.path.dirname(CONFIG_FILE), exist_ok=True)
+    with open(CONFIG_FILE, 'w') as f:
+        json.dump({"endpoints": endpoints}, f, indent=2)
+
+def add_endpoint(endpoint):
+    """
+    Add an endpoint (an existing endpoint with the same id is replaced)
+    """
+    endpoints = [e for e in load_endpoints() if e["id"] != endpoint["id"]]
+    endpoints.append(endpoint)
+    save_endpoints(endpoints)
+    print(f"Endpoint registered: {endpoint}")
+
+def add_window(endpoint_id=None):
+    """
+    Register another Claude Desktop window on this machine
+    """
+    x, y = capture_position()
+    endpoint_id = endpoint_id or f"window-{len(load_endpoints()) + 1}"
+    add_endpoint({"id": endpoint_id, "type": "gui", "x": x, "y": y})
+
+def add_agent(url, endpoint_id=None, max_jobs=1):
+    """
+    Register a remote agent host (checks GET {url}/health first)
+    """
+    import requests
+
+    try:
+        response = requests.get(f"{url.rstrip('/')}/health", timeout=5)
+        print(f"Agent health check: {response.status_code}")
+    except Exception as e:
+        print(f"Warning: agent is not reachable yet: {e}")
+    endpoint_id = endpoint_id or f"agent-{len(load_endpoints()) + 1}"
+    add_endpoint({"id": endpoint_id, "type": "agent", "url": url, "max_jobs": max_jobs})
+
+def remove_endpoint(endpoint_id):
+    """
+    Remove an endpoint by id
+    """
+    endpoints = load_endpoints()
+    remaining = [e for e in endpoints if e["id"] != endpoint_id]
+    if len(remaining) == len(endpoints):
+        print(f"Endpoint not found: {endpoint_id}")
+        sys.exit(1)
+    save_endpoints(remaining)
+    print(f"Endpoint removed: {endpoint_id}")
+
+def list_endpoints():
+    """
+    Print the registered endpoints
+    """
+    endpoints = load_endpoints()
+    if not endpoints:
+        print("No endpoints registered.")
+    for endpoint in endpoints:
+        print(json.dumps(endpoint, ensure_ascii=False))
+
+def calibrate(endpoint_id=None, trials=20):
+    """
+    Tune the paste delays against a registered window and save them to config/dispatch_timing.json
+
+    Test strings are pasted into the chat input and read back (nothing is sent);
+    the input is cleared after each trial.
+    """
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from app.services.claude_desktop_client import ClaudeDesktopClient
+
+    windows = [e for e in load_endpoints() if e.get("type", "gui") == "gui"]
+    if endpoint_id is not None:
+        windows = [e for e in windows if e["id"] == endpoint_id]
+    if not windows:
+        print("No Claude Desktop window registered. Run this script without options first.")
+        sys.exit(1)
+    window = windows[0]
+
+    print(f"Calibrating paste timing on '{window['id']}' ({window['x']}, {window['y']}) with {trials} trials.")
+    print("Do not touch the mouse or keyboard until it finishes.")
+    stats = ClaudeDesktopClient().calibrate(window["x"], window["y"], trials)
+    print(f"Calibrated delays: {stats['delays']} (success rate {stats['success_rate']})")
+
 def send_to_claude_desktop(message, x=None, y=None):
     """
     Send message to Claude Desktop chat input
-    
+
     Args:
         message (str): Message to send
         x (int): X coordinate of chat input (optional)
         y (int): Y coordinate of chat input (optional)
     """
+    import pyautogui
+    import pyperclip
+
     # If coordinates provided, click there first
     if x is not None and y is not None:
         pyautogui.click(x, y)
@@ -59,18 +167,42 @@ def send_to_claude_desktop(message, x=None, y=None):
     else:
         # Wait a bit for Claude Desktop to be active
         time.sleep(2)
-    
+
     # Use clipboard for Japanese text to avoid IME issues
     pyperclip.copy(message)
     time.sleep(0.5)  # Wait for clipboard to be set
     pyautogui.hotkey('ctrl', 'v')
     time.sleep(0.8)  # Wait for paste to complete
-    
+
     # Press Enter to send
     pyautogui.press('enter')
 
 if __name__ == "__main__":
-    # Always save Claude Desktop position (overwrites existing)
-    print("Saving Claude Desktop position...")
-    x, y = save_claude_position()
-    print("Setup complete!")
+    parser = argparse.ArgumentParser(
+        description="Register Claude Desktop endpoints (without options: save a single position, overwriting existing ones)"
+    )
+    parser.add_argument("--add-window", action="store_true", help="register another Claude Desktop window on this machine")
+    parser.add_argument("--add-agent", metavar="URL", help="register a remote agent host (e.g. http://192.168.0.10:9100)")
+    parser.add_argument("--id", help="endpoint id for --add-window / --add-agent / --calibrate")
+    parser.add_argument("--max-jobs", type=int, default=1, help="concurrent jobs for --add-agent")
+    parser.add_argument("--remove", metavar="ID", help="remove an endpoint")
+    parser.add_argument("--list", action="store_true", help="list registered endpoints")
+    parser.add_argument("--calibrate", action="store_true", help="tune paste delays on a registered window (--id to choose one)")
+    parser.add_argument("--trials", type=int, default=20, help="number of test pastes for --calibrate")
+    args = parser.parse_args()
+
+    if args.list:
+        list_endpoints()
+    elif args.calibrate:
+        calibrate(args.id, args.trials)
+    elif args.remove:
+        remove_endpoint(args.remove)
+    elif args.add_agent:
+        add_agent(args.add_agent, args.id, args.max_jobs)
+    elif args.add_window:
+        add_window(args.id)
+    else:
+        # Always save Claude Desktop position (overwrites existing)
+        print("Saving Claude Desktop position...")
+        x, y = save_claude_position()
+        print("Setup complete!")
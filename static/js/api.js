@@ -1,4 +1,4 @@
-import { MCP_CONFIG } from './constants.js';
+import { MCP_CONFIG, UI_CONFIG } from './constants.js';
 /**
  * API通信クラス
  */
@@ -7,11 +7,12 @@ export class SummonBattleAPI {
         this.baseURL = '/api';
     }
     /**
-     * 召喚獣リスト取得
+     * 召喚獣リスト取得（offset から limit 件。総件数は total で返る）
      */
-    async getSummonsList() {
+    async getSummonsList(offset = 0, limit = UI_CONFIG.SUMMON_LIST_PAGE_SIZE) {
         try {
-            const response = await fetch(`${this.baseURL}/summons`);
+            const params = new URLSearchParams({ offset: offset.toString(), limit: limit.toString() });
+            const response = await fetch(`${this.baseURL}/summons?${params.toString()}`);
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
@@ -34,6 +35,10 @@ export class SummonBattleAPI {
                 },
                 body: JSON.stringify({ prompt })
             });
+            if (response.status === 429) {
+                // 生成キューが満杯（Retry-After 秒後に再試行できる）
+                throw new Error(`召喚キューが混み合っています（${response.headers.get('Retry-After')}秒後に再試行してください）`);
+            }
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
@@ -60,17 +65,57 @@ export class SummonBattleAPI {
             return null;
         }
     }
+    /**
+     * 生成待ち・生成中の召喚を取り消す
+     */
+    async cancelSummon(summonId) {
+        try {
+            const response = await fetch(`${this.baseURL}/summons/${summonId}`, { method: 'DELETE' });
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            return await response.json();
+        }
+        catch (error) {
+            console.error('召喚取り消しエラー:', error);
+            return null;
+        }
+    }
+    /**
+     * 表示先に合ったモデルファイルを取得
+     * （三角形数が上限以内で最も詳細なLOD。.qmeshがあればそちらを優先し、
+     *   LOD未生成なら元のSTL）。バウンディングボックスが分かれば一緒に返す
+     */
+    async getModelSource(summonId, maxTriangles = Infinity) {
+        const status = await this.getSummonStatus(summonId);
+        const lods = status?.lods;
+        if (!lods || lods.length === 0) {
+            const mesh = status?.mesh;
+            return {
+                path: `/assets/${summonId}/model.stl`,
+                bounds: mesh ? { min: mesh.bbox_min, max: mesh.bbox_max } : undefined
+            };
+        }
+        const fitting = lods.filter(lod => lod.triangles <= maxTriangles);
+        const chosen = fitting.length > 0
+            ? fitting.reduce((best, lod) => lod.triangles > best.triangles ? lod : best)
+            : lods.reduce((best, lod) => lod.triangles < best.triangles ? lod : best);
+        return {
+            path: `/${chosen.qmesh || chosen.path}`,
+            bounds: chosen.bbox_min && chosen.bbox_max ? { min: chosen.bbox_min, max: chosen.bbox_max } : undefined
+        };
+    }
     /**
      * 攻撃リクエスト
      */
-    async attack(prompt, me, enemy) {
+    async attack(prompt, me, enemy, correlationId) {
         try {
             const response = await fetch(`${this.baseURL}/battle/attack`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                 },
-                body: JSON.stringify({ prompt, me, enemy })
+                body: JSON.stringify({ prompt, me, enemy, correlationId })
             });
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
@@ -82,6 +127,77 @@ export class SummonBattleAPI {
             return null;
         }
     }
+    /**
+     * サーバー側のバトルを作成（召喚IDがあればサーバーでステータスを読み込む）
+     */
+    async createBattle(summonIds, creatures) {
+        try {
+            const response = await fetch(`${this.baseURL}/battles`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify(summonIds ? { summonIds } : { creatures })
+            });
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            return await response.json();
+        }
+        catch (error) {
+            console.error('バトル作成エラー:', error);
+            return null;
+        }
+    }
+    /**
+     * サーバー側のバトルの状態を取得
+     */
+    async getBattle(battleId) {
+        try {
+            const response = await fetch(`${this.baseURL}/battles/${battleId}`);
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            return await response.json();
+        }
+        catch (error) {
+            console.error('バトル状態取得エラー:', error);
+            return null;
+        }
+    }
+    /**
+     * バトルIDを指定した攻撃（ダメージはサーバー側で適用される）
+     */
+    async attackInBattle(battleId, prompt, correlationId) {
+        try {
+            const response = await fetch(`${this.baseURL}/battles/${battleId}/attack`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({ prompt, correlationId })
+            });
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            return await response.json();
+        }
+        catch (error) {
+            console.error('バトル攻撃リクエストエラー:', error);
+            return null;
+        }
+    }
+    /**
+     * サーバー側のバトルを削除
+     */
+    async deleteBattle(battleId) {
+        try {
+            await fetch(`${this.baseURL}/battles/${battleId}`, { method: 'DELETE' });
+        }
+        catch (error) {
+            console.error('バトル削除エラー:', error);
+        }
+    }
     /**
      * 勝負決着
      */
@@ -105,37 +221,40 @@ export class SummonBattleAPI {
         }
     }
     /**
-     * MCP結果をポーリング
+     * MCP結果をロングポーリングで取得
+     *
+     * サーバー側で結果が届くまで待機するため、通常は1攻撃につき1リクエストで済む。
+     * 待機時間の合計は maxAttempts × interval ミリ秒。
      */
-    async pollMCPResult(maxAttempts = MCP_CONFIG.MAX_ATTEMPTS, interval = MCP_CONFIG.POLL_INTERVAL, onProgress) {
+    async pollMCPResult(maxAttempts = MCP_CONFIG.MAX_ATTEMPTS, interval = MCP_CONFIG.POLL_INTERVAL, onProgress, correlationId) {
+        const totalTime = maxAttempts * interval;
+        const startTime = Date.now();
+        const progressTimer = setInterval(() => {
+            if (onProgress) {
+                onProgress(Math.min(Math.ceil((Date.now() - startTime) / interval), maxAttempts), maxAttempts);
+            }
+        }, interval);
         try {
-            console.log(`MCPポーリング開始: 最大${maxAttempts}回試行、${interval}ms間隔`);
-            for (let attempt = 0; attempt < maxAttempts; attempt++) {
-                console.log(`MCPポーリング試行 ${attempt + 1}/${maxAttempts}`);
-                // プログレスコールバックを呼び出し
-                if (onProgress) {
-                    onProgress(attempt + 1, maxAttempts);
+            console.log(`MCPロングポーリング開始: 最大${totalTime}ms待機`);
+            let remaining = totalTime;
+            while (remaining > 0) {
+                const waitSeconds = Math.max(1, Math.floor(Math.min(remaining, MCP_CONFIG.LONG_POLL_WAIT) / 1000));
+                const params = new URLSearchParams({ wait: waitSeconds.toString() });
+                if (correlationId) {
+                    params.set('correlation_id', correlationId);
                 }
-                // MCP結果の状態確認
-                const statusResponse = await fetch(`${this.baseURL}/mcp/result/status`);
-                if (statusResponse.ok) {
-                    const status = await statusResponse.json();
-                    console.log('MCP状態:', status);
-                    if (status.has_result) {
-                        console.log('MCP結果が見つかりました。取得中...');
-                        // 結果を取得
-                        const resultResponse = await fetch(`${this.baseURL}/mcp/result`);
-                        if (resultResponse.ok) {
-                            const result = await resultResponse.json();
-                            console.log('MCP結果取得成功:', result);
-                            return result;
-                        }
-                    }
+                const requestStart = Date.now();
+                const resultResponse = await fetch(`${this.baseURL}/mcp/result?${params.toString()}`);
+                if (resultResponse.ok) {
+                    const result = await resultResponse.json();
+                    console.log('MCP結果取得成功:', result);
+                    return result;
                 }
-                // 最後の試行でない場合のみ待機
-                if (attempt < maxAttempts - 1) {
+                // 待機せずに即座に返ってきた場合（エラー等）は間隔を空けて再試行
+                if (Date.now() - requestStart < interval) {
                     await new Promise(resolve => setTimeout(resolve, interval));
                 }
+                remaining = totalTime - (Date.now() - startTime);
             }
             console.log('MCPポーリングタイムアウト');
             throw new Error(MCP_CONFIG.TIMEOUT_MESSAGE);
@@ -144,6 +263,75 @@ export class SummonBattleAPI {
             console.error('MCP結果ポーリングエラー:', error);
             return null;
         }
+        finally {
+            clearInterval(progressTimer);
+        }
+    }
+    /**
+     * MCP結果をプッシュ配信（Server-Sent Events）で待機
+     *
+     * プッシュチャネルが利用できない場合は null を返さずに例外を投げるため、
+     * 呼び出し側でポーリングにフォールバックできる。
+     */
+    subscribeMCPResult(timeout = MCP_CONFIG.PUSH_TIMEOUT, onProgress, correlationId) {
+        return new Promise((resolve, reject) => {
+            if (typeof EventSource === 'undefined') {
+                reject(new Error('EventSourceが利用できません'));
+                return;
+            }
+            const source = new EventSource(`${this.baseURL}/mcp/result/stream${this.correlationQuery(correlationId)}`);
+            const totalSeconds = Math.ceil(timeout / 1000);
+            let elapsed = 0;
+            let received = false;
+            const finish = () => {
+                clearInterval(progressTimer);
+                clearTimeout(timeoutTimer);
+                source.close();
+            };
+            const progressTimer = setInterval(() => {
+                elapsed++;
+                if (onProgress) {
+                    onProgress(Math.min(elapsed, totalSeconds), totalSeconds);
+                }
+            }, 1000);
+            const timeoutTimer = setTimeout(() => {
+                console.log('MCPプッシュ待機タイムアウト');
+                finish();
+                resolve(null);
+            }, timeout);
+            source.addEventListener('result', (event) => {
+                received = true;
+                finish();
+                const result = JSON.parse(event.data);
+                console.log('MCP結果プッシュ受信:', result);
+                resolve(result);
+            });
+            source.onerror = () => {
+                if (received)
+                    return;
+                console.warn('MCPプッシュチャネルでエラーが発生しました');
+                finish();
+                reject(new Error('MCPプッシュチャネルに接続できません'));
+            };
+        });
+    }
+    /**
+     * MCP結果を待機（プッシュ配信を優先し、失敗時のみポーリング）
+     */
+    async waitForMCPResult(correlationId, onProgress) {
+        try {
+            return await this.subscribeMCPResult(MCP_CONFIG.PUSH_TIMEOUT, onProgress, correlationId);
+        }
+        catch (error) {
+            console.warn('プッシュ配信が使えないためポーリングに切り替えます:', error);
+            return await this.pollMCPResult(MCP_CONFIG.MAX_ATTEMPTS, MCP_CONFIG.POLL_INTERVAL, onProgress, correlationId);
+        }
+    }
+    /**
+     * 相関IDのクエリ文字列を作成
+     */
+    correlationQuery(correlationId) {
+        return correlationId ? `?correlation_id=${encodeURIComponent(correlationId)}` : '';
     }
     /**
      * MCP結果送信（攻撃プロンプト用）
@@ -1,4 +1,5 @@
 import { api } from './api.js';
+import { MODEL_CONFIG } from './constants.js';
 /**
  * ゲームメインクラス
  */
@@ -31,9 +32,9 @@ export class SummonBattleGame {
                 ? this.gameState.summonIds[1]
                 : this.gameState.summonIds[2];
             if (winnerCreatureId) {
-                const modelPath = `/assets/${winnerCreatureId}/model.stl`;
-                console.log(`勝者のモデルを読み込み中: ${modelPath}`);
-                await winnerViewer.loadSTL(modelPath);
+                const model = await api.getModelSource(winnerCreatureId, MODEL_CONFIG.WINNER_MAX_TRIANGLES);
+                console.log(`勝者のモデルを読み込み中: ${model.path}`);
+                await winnerViewer.loadModel(model.path, model.bounds);
                 // 勝者の色を金色に
                 winnerViewer.setModelColor(0xffd700);
                 // 勝利の舞を開始
@@ -171,10 +172,20 @@ export class SummonBattleGame {
     }
     async loadSummonsList() {
         try {
-            const result = await api.getSummonsList();
-            if (result && result.summons) {
-                this.populateSummonSelects(result.summons);
+            // 総件数（total）に達するまでページ単位で取得
+            const summons = [];
+            let total = Infinity;
+            while (summons.length < total) {
+                const result = await api.getSummonsList(summons.length);
+                if (!result || !result.summons) {
+                    if (summons.length === 0)
+                        return;
+                    break;
+                }
+                summons.push(...result.summons);
+                total = result.summons.length > 0 ? result.total : summons.length;
             }
+            this.populateSummonSelects(summons);
         }
         catch (error) {
             console.error('召喚獣リスト読み込みエラー:', error);
@@ -253,6 +264,10 @@ export class SummonBattleGame {
             if (result) {
                 this.gameState.summonIds[creatureNumber] = result.summonId;
                 status.innerHTML = `<p>召喚ID: ${result.summonId}</p><p>${result.message}</p>`;
+                if (result.similarSummonId && result.status !== 'completed') {
+                    // offerモード: 生成中も似た呪文の召喚獣を案内する
+                    status.innerHTML += `<p>似た召喚獣: ${result.similarSummonId}（類似度 ${result.similarity}）</p>`;
+                }
                 this.waitForSummonComplete(creatureNumber);
             }
             else {
@@ -277,6 +292,10 @@ export class SummonBattleGame {
                 const result = await api.getSummonStatus(summonId);
                 if (result) {
                     status.innerHTML = `<p>状態: ${result.status}</p>`;
+                    if (result.queuePosition != null && result.etaSeconds != null) {
+                        const queue = result.queuePosition === 0 ? '生成中' : `${result.queuePosition}番目に待機中`;
+                        status.innerHTML += `<p>${queue}（完了まで約${Math.ceil(result.etaSeconds)}秒）</p>`;
+                    }
                     if (result.status === 'completed' && result.stats) {
                         this.gameState.creatures[creatureNumber] = result.stats;
                         status.innerHTML = `
@@ -288,8 +307,10 @@ export class SummonBattleGame {
                         this.checkBattleReady();
                         return;
                     }
-                    else if (result.status === 'failed') {
-                        status.innerHTML = '<p style="color: red;">召喚に失敗しました</p>';
+                    else if (result.status === 'failed' || result.status === 'cancelled') {
+                        status.innerHTML = result.status === 'failed'
+                            ? '<p style="color: red;">召喚に失敗しました</p>'
+                            : '<p style="color: red;">召喚が取り消されました</p>';
                         const btn = creatureNumber === 1 ? this.summon1Btn : this.summon2Btn;
                         btn.disabled = false;
                         return;
@@ -320,6 +341,21 @@ export class SummonBattleGame {
         this.load3DModels();
         this.updateTurnDisplay();
         this.addBattleLog('バトル開始！');
+        this.createBattleSession();
+    }
+    /**
+     * サーバー側のバトルを作成する（作成できなければ従来どおりブラウザ側で状態を管理する）
+     */
+    async createBattleSession() {
+        const creature1 = this.gameState.creatures[1];
+        const creature2 = this.gameState.creatures[2];
+        if (!creature1 || !creature2)
+            return;
+        const summonId1 = this.gameState.summonIds[1];
+        const summonId2 = this.gameState.summonIds[2];
+        const summonIds = summonId1 && summonId2 ? [summonId1, summonId2] : null;
+        const battle = await api.createBattle(summonIds, [creature1, creature2]);
+        this.gameState.battleId = battle ? battle.battleId : null;
     }
     displayCreatureInfo(creatureNumber) {
         const creature = this.gameState.creatures[creatureNumber];
@@ -337,16 +373,16 @@ export class SummonBattleGame {
             const summonId1 = this.gameState.summonIds[1];
             const summonId2 = this.gameState.summonIds[2];
             if (summonId1) {
-                const modelPath1 = `/assets/${summonId1}/model.stl`;
+                const model1 = await api.getModelSource(summonId1, MODEL_CONFIG.BATTLE_MAX_TRIANGLES);
                 if (globalThis.viewers.creature1) {
-                    await globalThis.viewers.creature1.loadSTL(modelPath1);
+                    await globalThis.viewers.creature1.loadModel(model1.path, model1.bounds);
                     globalThis.viewers.creature1.setModelColor(0xff6b35);
                 }
             }
             if (summonId2) {
-                const modelPath2 = `/assets/${summonId2}/model.stl`;
+                const model2 = await api.getModelSource(summonId2, MODEL_CONFIG.BATTLE_MAX_TRIANGLES);
                 if (globalThis.viewers.creature2) {
-                    await globalThis.viewers.creature2.loadSTL(modelPath2);
+                    await globalThis.viewers.creature2.loadModel(model2.path, model2.bounds);
                     globalThis.viewers.creature2.setModelColor(0x35a0ff);
                 }
             }
@@ -396,13 +432,30 @@ export class SummonBattleGame {
             if (!attacker || !defender)
                 return;
             this.addBattleLog(`${attacker.name}が「${attackPrompt}」で攻撃を開始！`);
-            this.showLoading('Claude Desktopに攻撃プロンプトを送信中...');
-            const attackResult = await api.attack(attackPrompt, attacker, defender);
-            if (attackResult && attackResult.result) {
+            this.showLoading('Claude Desktopに攻撃プロンプトを送信し、結果を待機中...');
+            // 攻撃ごとの相関IDでMCP結果を受け取る
+            const correlationId = crypto.randomUUID();
+            // サーバー側のバトルがあれば、バトルIDと攻撃呪文だけを送ってサーバーでダメージを適用する
+            if (this.gameState.battleId && await this.performSessionAttack(this.gameState.battleId, attackPrompt, correlationId)) {
+                this.resetAttackInput();
+                return;
+            }
+            const attackResult = await api.attack(attackPrompt, attacker, defender, correlationId);
+            if (attackResult && attackResult.result && !attackResult.pending) {
+                // 攻撃APIが結果の到着まで待って返した場合はそのまま処理する
+                this.showLoading('攻撃結果を処理中...');
+                if (attackResult.mcpResult) {
+                    await this.processMCPAttackResult(attackResult.mcpResult, attackPrompt);
+                }
+                else {
+                    await this.processAttackResult(attackResult.result, attackPrompt);
+                }
+            }
+            else if (attackResult && attackResult.result) {
                 this.addBattleLog('Claude Desktopに攻撃プロンプトを送信しました');
                 this.addBattleLog('Claude Desktopからの結果を待機中...');
                 this.showLoading('Claude Desktopからの攻撃結果を待機中...');
-                const mcpResult = await api.pollMCPResult(30, 1000, (attempt, maxAttempts) => {
+                const mcpResult = await api.waitForMCPResult(attackResult.correlationId || correlationId, (attempt, maxAttempts) => {
                     this.showPollingProgress(attempt, maxAttempts);
                 });
                 if (mcpResult && (mcpResult.parsed_data || mcpResult.data)) {
@@ -433,11 +486,61 @@ export class SummonBattleGame {
                 await this.performFallbackAttack(attackPrompt, attacker, defender);
             }
         }
+        this.resetAttackInput();
+    }
+    resetAttackInput() {
         this.attackInput.value = '';
         this.attackBtn.disabled = false;
         this.hideLoading();
         this.hidePollingProgress();
     }
+    /**
+     * サーバー側のバトルで攻撃する（リクエストに失敗した場合は false を返し、従来の処理で続行する）
+     */
+    async performSessionAttack(battleId, attackPrompt, correlationId) {
+        const response = await api.attackInBattle(battleId, attackPrompt, correlationId);
+        if (!response) {
+            // バトルが期限切れなどで使えない場合は、以降はブラウザ側で状態を管理する
+            this.gameState.battleId = null;
+            return false;
+        }
+        if (!response.pending) {
+            await this.applyBattleState(response.battle, response.result, attackPrompt);
+            return true;
+        }
+        // 結果が届くとサーバー側で適用されるため、届いたらバトルの状態を取得し直す
+        this.addBattleLog('Claude Desktopからの結果を待機中...');
+        this.showLoading('Claude Desktopからの攻撃結果を待機中...');
+        await api.waitForMCPResult(response.correlationId, (attempt, maxAttempts) => {
+            this.showPollingProgress(attempt, maxAttempts);
+        });
+        const battle = await api.getBattle(battleId);
+        if (!battle || battle.pendingCorrelationId === response.correlationId || !battle.lastResult) {
+            this.addBattleLog('Claude Desktopからの応答がタイムアウトしました。もう一度攻撃してください');
+            return true;
+        }
+        await this.applyBattleState(battle, battle.lastResult, attackPrompt);
+        return true;
+    }
+    /**
+     * サーバー側のバトルの状態（HP・ターン・勝者）を画面に反映する
+     */
+    async applyBattleState(battle, result, attackPrompt) {
+        this.addBattleLog(result.comment || `攻撃「${attackPrompt}」が発動！`);
+        for (const creatureNumber of [1, 2]) {
+            const creature = this.gameState.creatures[creatureNumber];
+            if (creature) {
+                creature.hp = battle.hp[creatureNumber - 1];
+                this.updateHP(creatureNumber, creature.hp, battle.maxHp[creatureNumber - 1]);
+            }
+        }
+        if (battle.winner) {
+            await this.endBattle(battle.winner);
+            return;
+        }
+        this.gameState.currentTurn = battle.currentTurn;
+        this.updateTurnDisplay();
+    }
     async processMCPAttackResult(mcpResult, attackPrompt) {
         try {
             console.log('MCP結果を処理中:', mcpResult);
@@ -738,6 +841,9 @@ export class SummonBattleGame {
         }
     }
     restart() {
+        if (this.gameState.battleId) {
+            api.deleteBattle(this.gameState.battleId);
+        }
         this.gameState = {
             phase: 'summon',
             creatures: { 1: null, 2: null },
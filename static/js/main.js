@@ -0,0 +1,17 @@
+// メインエントリーポイント
+import { SummonBattleAPI } from './api.js';
+import { ThreeJSViewer, viewers } from './3d-viewer.js';
+import { SummonBattleGame } from './game.js';
+// グローバル変数の設定
+// APIインスタンスをグローバルに設定
+const api = new SummonBattleAPI();
+globalThis.api = api;
+// Viewersをグローバルに設定
+globalThis.viewers = viewers;
+// ThreeJSViewerクラスをグローバルに設定
+globalThis.ThreeJSViewer = ThreeJSViewer;
+// ゲーム開始
+document.addEventListener('DOMContentLoaded', () => {
+    new SummonBattleGame();
+});
+//# sourceMappingURL=main.js.map
\ No newline at end of file
@@ -0,0 +1,3 @@
+// 型定義ファイル
+export {};
+//# sourceMappingURL=types.js.map
\ No newline at end of file
@@ -0,0 +1,46 @@
+"""起動時のインポート時間と副作用のテスト（scripts/profile_import.py の判定をpytestで行う）"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from profile_import import (  # noqa: E402
+    DEFAULT_BUDGET_MS, DEFAULT_FORBIDDEN, DEFAULT_TOTAL_BUDGET_MS, own_us, profile_once, total_us
+)
+
+MODULE = "app.main"
+RUNS = 3
+
+
+@pytest.fixture(scope="module")
+def runs():
+    """空の作業ディレクトリで数回インポートした結果（時間は最も速かった回で判定する）"""
+    return [profile_once(MODULE) for _ in range(RUNS)]
+
+
+def test_no_forbidden_modules(runs):
+    """GUI自動化・クリップボード・NumPyがインポート時に読み込まれない"""
+    for entries, _ in runs:
+        imported = {entry["module"] for entry in entries}
+        assert [name for name in DEFAULT_FORBIDDEN.split(",") if name in imported] == []
+
+
+def test_no_files_created(runs):
+    """インポートしただけでディレクトリやファイルが作成されない"""
+    for _, created in runs:
+        assert created == []
+
+
+def test_own_import_time_within_budget(runs):
+    """app パッケージ自身のインポート時間の合計が予算以内"""
+    own_ms = min(own_us(entries, MODULE) for entries, _ in runs) / 1000
+    assert own_ms <= DEFAULT_BUDGET_MS
+
+
+def test_total_import_time_within_budget(runs):
+    """依存ライブラリを含めた累積のインポート時間が予算以内"""
+    elapsed_ms = min(total_us(entries, MODULE) for entries, _ in runs) / 1000
+    assert 0 < elapsed_ms <= DEFAULT_TOTAL_BUDGET_MS